@@ -1,27 +1,63 @@
+import sys
+
+# --profile-startup：统计每个模块的导入耗时和启动各阶段耗时（必须在其它模块之前导入）
+from startup_profile import StartupProfiler
+PROFILER = StartupProfiler.from_argv(sys.argv)
+
 from PyQt6 import QtWidgets, QtCore, QtGui
 from PyQt6.QtWidgets import QApplication, QWidget, QMessageBox, QMainWindow, QFileDialog
-from PyQt6.uic import loadUi
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QImage, QPixmap
-import sys
-import cv2
+import numpy as np
 import os
 import time
-import pymysql
+import threading
 from threading import Thread
-import torch
 import warnings
 from pathlib import Path
 
 # 关闭YOLO调试信息
 os.environ['YOLO_VERBOSE'] = 'False'
-from ultralytics import YOLO
+
+from startup import StartupOrchestrator, lazy_import
+
+# 重型模块按需导入，登录窗口不用等它们：
+# - OpenCV第一次用到时才加载（下面各辅助模块里的 import cv2 拿到的也是这一份），登录期间由模型预加载线程先用到
+# - torch/ultralytics在模型注册表加载模型时才导入，pymysql在第一次连接数据库时才导入
+cv2 = lazy_import("cv2")
+
+from model_registry import get_registry
+from backends import DEFAULT_BACKEND
+from capture import FrameRingBuffer, CaptureThread, StreamCaptureThread, redact_url
+from decoder import open_video
+from pipeline import StageGraph, Stage
+from batch_infer import analyze_video_batched
+from tracker import AdaptiveStride, BoxTracker
+from motion_gate import MotionGate
+from zones import ZoneStore, ZoneEditor, detect_in_zones
+from cascade import CascadeDetector
+from multi_stream import MultiStreamWindow
+from video_widget import BoxOverlay, create_video_view, replace_label
+from render_scheduler import RenderScheduler
+from detection_cache import DetectionCache
+from log_sink import LogSink, create_log_panel, replace_log_panel
+from detection_events import DetectionEventEngine, ENTER
+from database import ACCOUNT_DB, get_pool, get_detection_writer, close_detection_writer
+from ui_build import load_ui_class, setup_ui
 
 
 # 共享实例类（管理登录/主窗口实例）
 class SI:
     loginWin = None
     mainWin = None
+    startup = None  # 启动预加载（登录期间后台加载模型、主界面UI、数据库连接）
+
+
+PROFILE_TIMEOUT_SECONDS = 600  # --profile-startup 最多等待后台预加载多久（首次运行要下载模型）
+
+# 设计器界面（qtdesigner目录下，启动时导入编译好的界面模块，见ui_build.py）
+LOGIN_UI_FILE = "jiance.ui"
+MAIN_UI_FILE = "main11111.ui"
+MODEL_WEIGHTS = "yolov8n.pt"
 
 
 # 1. 登录验证线程（保留原有功能，确保数据库交互稳定）
@@ -33,27 +69,20 @@ class LoginThread(QThread):
         self.username = username
         self.password = password
 
-        # 数据库连接配置（根据实际环境调整）
-        self.db_config = {
-            "host": "localhost",
-            "port": 3306,
-            "user": "root",
-            "password": "576499183",
-            "database": "detection_system",
-            "charset": "utf8mb4"
-        }
-
     def run(self):
+        import pymysql  # 用到数据库时才导入
+
         print("子线程：开始执行数据库查询...")
         try:
-            # 数据库连接（增加超时控制）
-            conn = pymysql.connect(**self.db_config, connect_timeout=10)
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            # 从共享连接池借连接（登录窗口显示时已在后台建好，不用每次重新握手认证；配置见database.py）
+            with get_pool(ACCOUNT_DB).connection(timeout=10) as conn:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
 
-            # 登录查询SQL（避免SQL注入）
-            sql = "SELECT * FROM user WHERE account = %s AND password = %s"
-            cursor.execute(sql, (self.username, self.password))
-            result = cursor.fetchone()
+                # 登录查询SQL（避免SQL注入）
+                sql = "SELECT * FROM user WHERE account = %s AND password = %s"
+                cursor.execute(sql, (self.username, self.password))
+                result = cursor.fetchone()
+                cursor.close()
 
             # 验证结果返回
             if result:
@@ -61,10 +90,6 @@ class LoginThread(QThread):
             else:
                 self.result_signal.emit(False, "账号或密码错误")
 
-            # 关闭资源
-            cursor.close()
-            conn.close()
-
         except pymysql.MySQLError as e:
             error_msg = f"数据库错误：{str(e)}"
             print(f"子线程：{error_msg}")
@@ -75,21 +100,127 @@ class LoginThread(QThread):
             self.result_signal.emit(False, error_msg)
 
 
+# 离线批量分析线程（录像文件不逐帧显示，多帧一批送入模型，速度更快）
+class OfflineAnalysisThread(QThread):
+    progress_signal = pyqtSignal(int, int, float)  # 已分析帧数、总帧数、当前帧率
+    finished_signal = pyqtSignal(object)  # 分析结果（batch_infer.VideoAnalysis）
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, file_path, models, batch_size=8, progress_interval=1.0):
+        super().__init__()
+        self.file_path = file_path
+        self.models = models  # [(模型名, 模型, 推理参数), ...]
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval  # 进度上报间隔（秒），避免刷屏
+        self.stop_event = threading.Event()
+        self._last_report = 0.0
+
+    def run(self):
+        try:
+            analysis = analyze_video_batched(
+                self.file_path, self.models, batch_size=self.batch_size,
+                on_progress=self.report_progress, stop_event=self.stop_event
+            )
+            self.finished_signal.emit(analysis)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+    def report_progress(self, done, total, fps):
+        now = time.time()
+        if now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            self.progress_signal.emit(done, total, fps)
+
+    def stop(self):
+        """中止分析并等待线程退出，返回线程是否已退出（正在推理的一批结束后才会退出）"""
+        self.stop_event.set()
+        return self.wait(3000)
+
+
+# 检测缓存补齐线程（实时检测只缓存实际检测的帧，停止播放后批量分析其余帧写入缓存）
+class CacheFillThread(OfflineAnalysisThread):
+    def __init__(self, cached_video, file_path, model, params, batch_size=8):
+        super().__init__(file_path, [("cache", model, params)], batch_size=batch_size)
+        self.cached_video = cached_video  # 由本线程写入并关闭
+        self.cancelled = False
+
+    def run(self):
+        cached_video = self.cached_video
+        try:
+            analysis = analyze_video_batched(
+                self.file_path, self.models, batch_size=self.batch_size,
+                stop_event=self.stop_event, skip=cached_video.cached_frames()
+            )
+            width, height = analysis.source_size
+            for index in analysis.indices:
+                detections = analysis.frames.get(index, {}).get("cache", [])
+                cached_video.put(index, (height, width), [det["box"] for det in detections],
+                                 [det["conf"] for det in detections], [det["cls"] for det in detections])
+            if not self.cancelled and analysis.decoded:
+                cached_video.set_frame_count(analysis.decoded)  # 读到了结尾：按实际帧数判断是否完整
+            cached_video.close()
+            self.finished_signal.emit(analysis)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+    def stop(self):
+        self.cancelled = True
+        return super().stop()
+
+
 # 2. 登录窗口类（保留原有UI逻辑，确保控件绑定正常）
 class Win_Login(QWidget):
     def __init__(self):
         super().__init__()
+        self.waiting_for_startup = False  # 登录成功但预加载还没完成，完成后自动打开主窗口
         try:
             # 加载登录UI文件
-            self.ui = loadUi("D:/qtdesigner/jiance.ui", self)
+            with PROFILER.phase("登录界面UI解析"):
+                self.ui = setup_ui(self, LOGIN_UI_FILE)
             print("登录窗口：UI文件加载成功")
             self.init_login_ui()
+            self.init_startup_status()
         except Exception as e:
             error_msg = f"UI加载失败：{str(e)}"
             print(f"登录窗口：{error_msg}")
             QMessageBox.critical(self, "错误", error_msg)
             return
 
+    def showEvent(self, event):
+        """登录窗口显示时在后台并行预加载模型、主界面UI和数据库连接（登录成功后主窗口可以马上打开）"""
+        super().showEvent(event)
+        if SI.startup is None:
+            SI.startup = create_startup()
+            SI.startup.progress_signal.connect(self.update_startup_status)
+            SI.startup.finished_signal.connect(self.handle_startup_finished)
+            SI.startup.start()
+        else:
+            get_pool(ACCOUNT_DB).prewarm()  # 退出登录后再次显示：连接池已建好，这里只补足空闲连接
+        self.update_startup_status()
+
+    def init_startup_status(self):
+        """在登录窗口底部加一行预加载状态"""
+        self.startup_label = QtWidgets.QLabel(self)
+        self.startup_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.startup_label.setStyleSheet("color: #808080;")
+        layout = self.layout()
+        if layout is not None:
+            layout.addWidget(self.startup_label)
+
+    def update_startup_status(self, name=None, success=True, detail=""):
+        """预加载任务有进展时刷新状态行"""
+        if SI.startup is None or not hasattr(self, "startup_label"):
+            return
+        if name is not None:
+            print(f"启动预加载：{name} {'完成' if success else '失败'}（{detail}）")
+        if self.waiting_for_startup:
+            pending = "、".join(SI.startup.pending_labels())
+            self.startup_label.setText(f"⏳ 登录成功，正在准备{pending}，完成后自动进入主界面…")
+        elif SI.startup.done():
+            self.startup_label.setText("✅ 系统已就绪")
+        else:
+            self.startup_label.setText(SI.startup.status_text())
+
     def init_login_ui(self):
         """初始化登录窗口控件绑定"""
         try:
@@ -134,29 +265,68 @@ class Win_Login(QWidget):
         print(f"\n收到登录结果：成功={success}, 消息={msg}")
         if success:
             QMessageBox.information(self, "成功", msg)
-            # 打开主窗口并隐藏登录窗口
-            try:
-                SI.mainWin = Win_Main()
-                SI.mainWin.show()
-                self.ui.enter_the_password.setText('')  # 清空密码
-                self.hide()
-            except Exception as e:
-                error_msg = f"打开主窗口失败：{str(e)}"
-                print(f"handle_login_result：{error_msg}")
-                QMessageBox.critical(self, "错误", error_msg)
+            # 模型/主界面还在后台预加载：显示等待提示，完成后自动打开（不在主线程里重复加载）
+            if SI.startup is not None and not SI.startup.done("model", "ui"):
+                self.waiting_for_startup = True
+                self.ui.sign_in.setEnabled(False)
+                self.update_startup_status()
+                return
+            self.open_main_window()
         else:
             QMessageBox.warning(self, "失败", msg)
 
+    def handle_startup_finished(self):
+        """预加载全部结束：登录成功后在等待的，现在打开主窗口"""
+        self.update_startup_status()
+        if self.waiting_for_startup:
+            self.open_main_window()
+
+    def open_main_window(self):
+        """打开主窗口并隐藏登录窗口"""
+        self.waiting_for_startup = False
+        self.ui.sign_in.setEnabled(True)
+        self.update_startup_status()
+        try:
+            SI.mainWin = Win_Main()
+            SI.mainWin.show()
+            self.ui.enter_the_password.setText('')  # 清空密码
+            self.hide()
+        except Exception as e:
+            error_msg = f"打开主窗口失败：{str(e)}"
+            print(f"open_main_window：{error_msg}")
+            QMessageBox.critical(self, "错误", error_msg)
+
 
 # 3. 主窗口类（核心功能：视频播放实时YOLOv8检测）
 class Win_Main(QWidget):
     # 信号定义（主线程更新UI）
     update_log_signal = pyqtSignal(str)  # 日志更新
+    plastic_video_done_signal = pyqtSignal(str)  # 视频塑料袋专项检测结束（参数：文件路径）
+
+    # 流水线各阶段的工作线程数（推理阶段共用同一个模型对象，保持1个线程）
+    PIPELINE_WORKERS = {"infer": 1, "postprocess": 2}
+    PIPELINE_QUEUE_SIZE = 4  # 阶段间队列长度（实时模式下队列满就丢帧，避免延迟累积）
+    OFFLINE_BATCH_SIZE = 8  # 离线批量分析每批帧数（CPU上8~16较合适，可用batch_infer.py测速）
+    # 推理后端：pytorch / onnx / onnx-int8 / openvino（默认取环境变量YOLO_BACKEND，可用backends.py测速对比）
+    INFERENCE_BACKEND = DEFAULT_BACKEND
+    LIVE_MAX_STRIDE = 10  # 实时检测最多每隔多少帧检测一次（中间帧由跟踪器外推检测框）
+    MOTION_SENSITIVITY = 0.5  # 运动门控灵敏度（0~1，越高越容易触发推理）
+    MOTION_REFRESH_SECONDS = 5.0  # 画面静止时也每隔多少秒强制推理一次
+    CASCADE_IMGSZ = 320  # 塑料袋专项检测先按该尺寸粗检，临界候选区域再全分辨率复检（None=每帧都按640检测）
+    DISPLAY_MAX_FPS = None  # 画面刷新帧率上限（None=屏幕刷新率；处理帧率不受影响）
+    # 检测事件：目标持续出现多久算进入（秒，可按类别单独设置），多久没再出现算离开
+    EVENT_MIN_SECONDS = 0.5
+    EVENT_CLASS_MIN_SECONDS = {"person": 1.0}
+    EVENT_EXIT_SECONDS = 2.0
+    # 跟踪框颜色（BGR），按类别号循环取色
+    TRACK_COLORS = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+                    (10, 249, 72), (23, 204, 146), (134, 219, 61), (211, 188, 0), (255, 149, 0)]
 
     def __init__(self):
         super().__init__()
-        # 信号绑定（日志更新）
+        # 信号绑定（日志更新、专项检测结束）
         self.update_log_signal.connect(self.append_log)
+        self.plastic_video_done_signal.connect(self.finish_plastic_video)
 
         # 状态标记
         self.is_stopping = False  # 停止状态标记（避免重复停止）
@@ -165,11 +335,52 @@ class Win_Main(QWidget):
         self.ui = None  # UI实例
         self.cap = None  # 视频/摄像头捕获对象
         self.timer_camera = None  # 摄像头/视频定时器
+        self.frame_buffer = FrameRingBuffer(capacity=3)  # 最新帧环形缓冲区（采集线程写，界面定时器读）
+        self.capture_thread = None  # 采集线程（独立于GUI线程读帧）
+        self.last_frame_seq = 0  # 上次处理的帧序号（避免重复处理同一帧）
+        self.frame_seq_base = 0  # 本次采集开始前的帧序号（视频文件的帧号 = 帧序号 - 它 - 1）
+        self.pipeline = None  # 帧处理流水线（预处理→推理→后处理并行）
+        self.decode_thread = None  # 专项检测的解码线程（逐帧送入流水线）
+        self.plastic_max_confidence = 0.0  # 视频专项检测的最高置信度
+        self.live_stride = None  # 实时检测的自适应检测间隔（每k帧检测一次）
+        self.live_tracker = BoxTracker()  # 非检测帧用跟踪器外推检测框
+        # 运动门控（勾选闲人入侵/动物入侵时启用）：画面静止的帧不推理，沿用上一次结果
+        self.motion_gate = MotionGate(sensitivity=self.MOTION_SENSITIVITY,
+                                      refresh_seconds=self.MOTION_REFRESH_SECONDS)
+        self.motion_gate_enabled = False
+        self.last_detect_result = None  # 单帧检测的上一次结果（门控跳过时沿用）
+        self.zone_store = ZoneStore()  # 入侵区域（按视频源保存到zones.json）
+        self.zone_source = None  # 当前视频源（摄像头编号/文件路径）
+        self.zone_editor = None  # 在原始视频标签上画区域
+        self.render_scheduler = None  # 画面刷新调度（按刷新率显示最新帧，不可见时跳过）
+        # 检测事件（逐帧类别 → 去抖动的进入/离开事件，日志/报警只处理事件）
+        self.event_engine = DetectionEventEngine(min_seconds=self.EVENT_MIN_SECONDS,
+                                                 class_min_seconds=self.EVENT_CLASS_MIN_SECONDS,
+                                                 exit_seconds=self.EVENT_EXIT_SECONDS, parent=self)
+        self.event_engine.event_signal.connect(self.handle_detection_event)
+        self.multi_stream_window = None  # 多路监控窗口（多个视频源共用一个推理池）
+        self.multi_stream_sources = "0, 1"  # 上次输入的多路视频源
+        self.stream_url = "rtsp://"  # 上次输入的网络视频流地址
+        self.offline_thread = None  # 离线批量分析线程
+        self.retiring_threads = set()  # 已要求停止、还没退出的线程（退出前保留引用）
         self.model = None  # YOLOv8全类别检测模型
         self.yolo_plastic_model = None  # 塑料袋专项检测模型
+        self.plastic_cascade = None  # 塑料袋专项的分辨率级联检测
+        self.cascade_full_resolution = False  # 当前视频走级联检测：按原图解码（复检裁剪原图像素）
+        self.detection_writer = None  # 检测结果后台批量入库（detection_system库）
+        self.detection_cache = None  # 视频检测结果缓存（同一段录像再次打开时直接用缓存的检测框）
+        self.cached_video = None  # 当前视频文件的检测缓存
+        self.cached_video_args = None  # 打开当前缓存用的 (模型, 检测参数, 是否后台补齐)，区域变化后按它重新打开
+        self.cache_fill_thread = None  # 检测缓存补齐线程（停止播放后在后台分析没有缓存的帧）
 
         # 初始化UI（优先加载设计器UI，失败则代码创建）
         self.init_ui()
+        # 检测日志（合并重复消息，定时批量刷到日志面板，后台线程写滚动日志文件）
+        self.log_sink = LogSink(self.textLog, parent=self)
+        # 入侵区域编辑（在原始视频标签上左键加点、右键闭合）
+        self.init_zone_editor()
+        # 画面刷新调度（处理结果先交给它，按屏幕刷新率显示）
+        self.init_render_scheduler()
         # 初始化核心组件（模型、资源）
         self.init_core_components()
         # 绑定事件（按钮、复选框等）
@@ -178,9 +389,10 @@ class Win_Main(QWidget):
     def init_ui(self):
         """初始化主窗口UI"""
         try:
-            # 尝试加载设计器UI
-            self.ui = loadUi("D:/qtdesigner/main11111.ui", self)
-            print("主窗口：设计器UI加载成功")
+            # 尝试加载设计器UI（登录期间已在后台取得界面类时直接创建控件）
+            ui_class = SI.startup.result("ui") if SI.startup is not None else None
+            self.ui = setup_ui(self, MAIN_UI_FILE, ui_class)
+            print(f"主窗口：设计器UI加载成功{'（使用预编译的界面）' if ui_class is not None else ''}")
             self.setup_designer_ui()
         except Exception as e:
             error_msg = f"设计器UI加载失败：{str(e)}"
@@ -192,17 +404,25 @@ class Win_Main(QWidget):
     def setup_designer_ui(self):
         """从设计器UI中获取控件并初始化"""
         try:
-            # 视频显示标签（原始+检测后）
-            self.label_ori_video = self.ui.label_ori_video
-            self.label_treated = self.ui.label_treated
-            # 日志文本框
-            self.textLog = self.ui.textLog
+            # 视频显示控件（原始+检测后）：设计器里的QLabel原位替换为视频显示控件
+            self.label_ori_video = replace_label(self.ui.label_ori_video)
+            self.label_treated = replace_label(self.ui.label_treated)
+            # 日志文本框：原位替换为限制行数的纯文本面板（长时间运行内容不会无限增长）
+            self.textLog = replace_log_panel(self.ui.textLog)
             # 功能按钮
             self.videoBtn = self.ui.videoBtn
             self.camBtn = self.ui.camBtn
             self.stopBtn = self.ui.stopBtn
+            # 网络视频流、多路监控按钮（设计器UI里没有，加在摄像头按钮下面）
+            self.streamBtn = QtWidgets.QPushButton("网络视频流")
+            self.multiStreamBtn = QtWidgets.QPushButton("多路监控")
+            self.add_button_after_camera(self.streamBtn)
+            self.add_button_after_camera(self.multiStreamBtn, after=self.streamBtn)
             # 塑料袋检测复选框
             self.detect_plastic_bag_intrusion = getattr(self.ui, "detect_plastic_bag_intrusion", None)
+            # 闲人入侵/动物入侵复选框（固定机位监控，启用运动门控）
+            self.detect_person_intrusion = getattr(self.ui, "checkBox", None)
+            self.detect_animal_intrusion = getattr(self.ui, "detect_animal_intrusion", None)
 
             # 控件有效性校验
             if not self.detect_plastic_bag_intrusion:
@@ -236,25 +456,24 @@ class Win_Main(QWidget):
         log_layout = QtWidgets.QVBoxLayout()
 
         # 1. 视频显示标签
-        self.label_ori_video = QtWidgets.QLabel("原始视频")
+        self.label_ori_video = create_video_view(placeholder="原始视频")
         self.label_ori_video.setMinimumSize(520, 400)
         self.label_ori_video.setStyleSheet('border:1px solid #D7E2F9;')
-        self.label_ori_video.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        self.label_treated = QtWidgets.QLabel("YOLOv8检测后视频")
+        self.label_treated = create_video_view(placeholder="YOLOv8检测后视频")
         self.label_treated.setMinimumSize(520, 400)
         self.label_treated.setStyleSheet('border:1px solid #D7E2F9;')
-        self.label_treated.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         # 2. 功能按钮
         self.videoBtn = QtWidgets.QPushButton("打开视频（YOLOv8检测）")
         self.camBtn = QtWidgets.QPushButton("启动摄像头（YOLOv8检测）")
         self.stopBtn = QtWidgets.QPushButton("停止")
+        self.streamBtn = QtWidgets.QPushButton("网络视频流")
+        self.multiStreamBtn = QtWidgets.QPushButton("多路监控")
         self.detect_plastic_bag_intrusion = QtWidgets.QCheckBox("塑料袋专项检测")
 
         # 3. 日志文本框
-        self.textLog = QtWidgets.QTextEdit()
-        self.textLog.setReadOnly(True)
+        self.textLog = create_log_panel()
         self.textLog.setPlaceholderText("检测日志（YOLOv8结果将显示在这里）...")
         self.textLog.setMinimumHeight(150)
 
@@ -265,6 +484,8 @@ class Win_Main(QWidget):
 
         btn_layout.addWidget(self.videoBtn)
         btn_layout.addWidget(self.camBtn)
+        btn_layout.addWidget(self.streamBtn)
+        btn_layout.addWidget(self.multiStreamBtn)
         btn_layout.addWidget(self.stopBtn)
         btn_layout.addSpacing(30)
         btn_layout.addWidget(self.detect_plastic_bag_intrusion)
@@ -276,6 +497,21 @@ class Win_Main(QWidget):
         main_layout.addLayout(btn_layout)
         main_layout.addLayout(log_layout)
 
+    def add_button_after_camera(self, button, after=None):
+        """为设计器UI补充按钮（插在摄像头按钮或after按钮所在布局里，紧跟其后）"""
+        after = after or self.camBtn
+        layouts = [self.camBtn.parentWidget().layout()]
+        while layouts:
+            layout = layouts.pop()
+            if layout is None:
+                continue
+            index = layout.indexOf(after)
+            if index >= 0:
+                layout.insertWidget(index + 1, button)
+                return
+            layouts.extend(layout.itemAt(i).layout() for i in range(layout.count()))
+        print(f"主窗口：未找到摄像头按钮所在布局，{button.text()}按钮未添加")
+
     def add_plastic_checkbox(self):
         """为设计器UI补充塑料袋检测复选框（当控件缺失时）"""
         try:
@@ -297,17 +533,25 @@ class Win_Main(QWidget):
         self.timer_camera.timeout.connect(self.show_camera_with_yolo)  # 绑定：帧显示+YOLO检测
 
         # 2. 加载YOLOv8全类别模型（视频/摄像头默认检测模型）
+        #    模型由进程级注册表共享：退出登录再登录、重建主窗口都不会重新加载和预热
+        registry = get_registry()
+        if SI.startup is not None and SI.startup.started:
+            self.append_log(f"ℹ️ 启动预加载：{SI.startup.summary()}")
         try:
-            model_path = Path("yolov8n.pt")
-            if not model_path.exists():
-                self.append_log("ℹ️ 本地未找到yolov8n.pt，将自动下载（约6MB，需网络通畅）...")
-            self.model = YOLO(model_path)  # 加载YOLOv8轻量级模型
-
-            # 模型有效性测试
-            test_frame = torch.zeros((3, 640, 640))  # 3通道640x640测试帧
-            test_result = self.model(test_frame, verbose=False)
-            if isinstance(test_result, list) and len(test_result) > 0 and hasattr(test_result[0], 'boxes'):
-                self.append_log("✅ YOLOv8模型加载成功，支持80类目标检测（如人、车、动物等）")
+            # 登录期间已在后台加载并预热的模型句柄（预加载失败时这里重新加载并提示错误）
+            self.model = SI.startup.result("model") if SI.startup is not None else None
+            if self.model is None:
+                model_path = Path(MODEL_WEIGHTS)
+                if not model_path.exists():
+                    self.append_log("ℹ️ 本地未找到yolov8n.pt，将自动下载（约6MB，需网络通畅）...")
+                self.model = registry.get(model_path, backend=self.INFERENCE_BACKEND)  # 共享的YOLOv8轻量级模型句柄
+
+            # 模型有效性测试（预热推理，每个模型加载后只执行一次，已预热时返回None）
+            test_result = self.model.warmup(imgsz=640)
+            if test_result is None:
+                self.append_log("✅ YOLOv8模型已就绪（复用已加载的模型）")
+            elif isinstance(test_result, list) and len(test_result) > 0 and hasattr(test_result[0], 'boxes'):
+                self.append_log(f"✅ YOLOv8模型加载成功（推理后端：{self.INFERENCE_BACKEND}），支持80类目标检测（如人、车、动物等）")
             else:
                 raise Exception("模型推理结果异常，无有效检测框（boxes）")
         except Exception as e:
@@ -318,7 +562,11 @@ class Win_Main(QWidget):
 
         # 3. 加载塑料袋专项检测模型（复用YOLOv8，仅检测指定类别）
         try:
-            self.yolo_plastic_model = YOLO("yolov8n.pt")  # 复用模型文件，减少内存占用
+            # 与全类别模型是同一份权重，直接共用同一个句柄，内存里只有一份模型
+            #（首次运行自动下载权重时，下载前后注册表的内容哈希不同，重新get会得到另一个句柄）
+            self.yolo_plastic_model = self.model or registry.get(MODEL_WEIGHTS, backend=self.INFERENCE_BACKEND)
+            if self.CASCADE_IMGSZ:
+                self.plastic_cascade = CascadeDetector(self.yolo_plastic_model, low_imgsz=self.CASCADE_IMGSZ)
             self.append_log("✅ 塑料袋专项模型加载成功，检测类别：24=背包、26=手提包、41=购物袋")
         except Exception as e:
             error_msg = f"塑料袋专项模型加载失败：{str(e)}"
@@ -326,6 +574,20 @@ class Win_Main(QWidget):
             QMessageBox.warning(self, "模型警告", error_msg)
             self.yolo_plastic_model = None
 
+        # 4. 检测结果入库（后台线程批量写入，数据库连不上时先存本地溢出文件，恢复后补写）
+        try:
+            self.detection_writer = get_detection_writer()
+        except Exception as e:
+            self.append_log(f"⚠️ 检测结果入库不可用：{str(e)}")
+            self.detection_writer = None
+
+        # 5. 视频检测结果缓存（打不开缓存库时照常逐帧推理）
+        try:
+            self.detection_cache = DetectionCache()
+        except Exception as e:
+            self.append_log(f"⚠️ 检测结果缓存不可用，视频将逐帧推理：{str(e)}")
+            self.detection_cache = None
+
     def bind_all_events(self):
         """绑定所有控件事件"""
         # 视频按钮：模型加载成功才启用
@@ -346,6 +608,16 @@ class Win_Main(QWidget):
                 self.camBtn.setEnabled(False)
                 self.append_log("⚠️ 摄像头按钮已禁用（YOLOv8模型未加载）")
 
+        # 网络视频流按钮：模型加载成功才启用
+        if hasattr(self, 'streamBtn'):
+            self.streamBtn.clicked.connect(self.open_stream_url)
+            self.streamBtn.setEnabled(self.model is not None)
+
+        # 多路监控按钮：模型加载成功才启用
+        if hasattr(self, 'multiStreamBtn'):
+            self.multiStreamBtn.clicked.connect(self.open_multi_stream)
+            self.multiStreamBtn.setEnabled(self.model is not None)
+
         # 停止按钮：始终启用
         if hasattr(self, 'stopBtn'):
             self.stopBtn.clicked.connect(self.stop_all)
@@ -357,6 +629,12 @@ class Win_Main(QWidget):
             self.detect_plastic_bag_intrusion.setEnabled(False)
             self.append_log("⚠️ 塑料袋检测复选框已禁用（专项模型未加载）")
 
+        # 闲人入侵/动物入侵复选框：勾选任意一个即启用运动门控
+        for checkbox in (getattr(self, "detect_person_intrusion", None),
+                         getattr(self, "detect_animal_intrusion", None)):
+            if checkbox:
+                checkbox.stateChanged.connect(self.update_motion_gate)
+
     # -------------------------- 核心功能：视频文件读取+YOLOv8实时检测 --------------------------
     def open_video_file(self):
         """打开视频文件，启用YOLOv8实时检测"""
@@ -390,25 +668,31 @@ class Win_Main(QWidget):
         except:
             pass
 
-        # 4. 打开视频（尝试FFmpeg解码器，兼容特殊编码）
-        self.cap = cv2.VideoCapture(file_path)
-        if not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(file_path, cv2.CAP_FFMPEG)
-            if not self.cap.isOpened():
-                error_msg = f"无法打开视频：{os.path.basename(file_path)}（编码不支持或文件损坏）"
-                self.append_log(f"❌ {error_msg}")
-                QMessageBox.warning(self, "视频错误", error_msg)
-                return
+        # 4. 打开视频（解码时直接缩小到显示/推理够用的分辨率，4K录像不再整帧解码后再缩放）
+        self.cap = open_video(file_path)
+        if self.cap is None:
+            error_msg = f"无法打开视频：{os.path.basename(file_path)}（编码不支持或文件损坏）"
+            self.append_log(f"❌ {error_msg}")
+            QMessageBox.warning(self, "视频错误", error_msg)
+            return
 
-        # 5. 按视频实际帧率设置定时器（避免帧丢失/过快）
+        # 5. 按视频实际帧率启动采集线程和定时器（避免帧丢失/过快）
         video_fps = self.cap.get(cv2.CAP_PROP_FPS)
         if video_fps <= 0:
             video_fps = 25  # 默认帧率（防止异常值）
+        self.set_zone_source(file_path)
+        self.cascade_full_resolution = False
+        self.update_decode_resolution()
+        self.open_detection_cache(self.model, background_fill=True, classes=None, conf=0.25)
+        self.start_capture_thread(is_file=True, fps=video_fps)
+        self.start_live_tracking(video_fps)
+        self.start_pipeline(self.infer_live_frame)
         timer_interval = int(1000 / video_fps)  # 定时器间隔（毫秒）
         self.timer_camera.start(timer_interval)
 
         # 6. 日志提示
-        self.append_log(f"✅ 视频打开成功：{os.path.basename(file_path)}（帧率：{video_fps:.1f}，已启用YOLOv8检测）")
+        self.append_log(f"✅ 视频打开成功：{os.path.basename(file_path)}（帧率：{video_fps:.1f}，"
+                        f"{self.cap.describe()}，已启用YOLOv8检测）")
 
     # -------------------------- 核心功能：摄像头启动+YOLOv8实时检测 --------------------------
     def start_camera(self):
@@ -424,8 +708,10 @@ class Win_Main(QWidget):
             self.append_log("ℹ️ 已释放旧摄像头资源")
 
         # 3. 尝试打开摄像头（支持多设备，优先设备0）
+        camera_index = 0
         self.cap = cv2.VideoCapture(0)
         if not self.cap.isOpened():
+            camera_index = 1
             self.cap = cv2.VideoCapture(1)  # 重试外接摄像头
             if not self.cap.isOpened():
                 error_msg = "摄像头无法打开（设备被占用、不存在或权限不足）"
@@ -443,47 +729,413 @@ class Win_Main(QWidget):
             QMessageBox.warning(self, "摄像头错误", error_msg)
             return
 
-        # 5. 启动定时器（摄像头默认20fps，间隔50ms）
+        # 5. 启动采集线程和定时器（摄像头默认20fps，间隔50ms）
+        self.set_zone_source(camera_index)
+        self.start_capture_thread(is_file=False)
+        self.start_live_tracking(20)
+        self.start_pipeline(self.infer_live_frame)
         self.timer_camera.start(50)
         self.append_log("✅ 摄像头启动成功，已启用YOLOv8实时检测")
 
-    # -------------------------- 核心功能：帧显示+YOLOv8实时检测 --------------------------
-    def show_camera_with_yolo(self):
-        """读取帧→显示原始视频→YOLOv8检测→显示检测后视频"""
+    # -------------------------- 网络视频流（RTSP/HTTP/UDP，断流自动重连） --------------------------
+    def open_stream_url(self):
+        """输入网络视频流地址，连接/重连在采集线程里完成（网络慢也不卡界面）"""
+        url, ok = QtWidgets.QInputDialog.getText(
+            self, "网络视频流", "视频流地址（如 rtsp://用户名:密码@192.168.1.64:554/stream1、udp://127.0.0.1:23000）：",
+            text=self.stream_url)
+        url = url.strip() if ok else ""
+        if not url:
+            return
+        self.stream_url = url
+        self.stop_all()
+        self.close_multi_stream()
+        self.append_log(f"⏳ 正在连接网络视频流：{redact_url(url)}")
+
+        self.set_zone_source(url)
+        self.last_frame_seq = 0
+        self.capture_thread = StreamCaptureThread(url, self.frame_buffer)
+        self.capture_thread.status_signal.connect(self.append_log)
+        self.capture_thread.start()
+        self.start_live_tracking(25)
+        self.start_pipeline(self.infer_live_frame)
+        self.timer_camera.start(40)
+
+    # -------------------------- 入侵区域（只在画定的多边形区域内检测） --------------------------
+    def init_zone_editor(self):
+        """在原始视频标签上启用区域编辑：左键加顶点，右键闭合；没有正在画的点时右键删除最后一个区域"""
+        self.zone_editor = ZoneEditor(self.label_ori_video)
+        self.zone_editor.zones_changed.connect(self.save_zones)
+        self.label_ori_video.setToolTip("左键添加区域顶点，右键闭合区域；右键（未在画时）删除最后一个区域")
+
+    def set_zone_source(self, source):
+        """切换视频源时载入该视频源保存的区域"""
+        self.zone_source = source
+        self.zone_editor.set_zones(self.zone_store.get(source))
+        if self.zone_editor.zone_set:
+            self.append_log(f"ℹ️ 已载入{len(self.zone_editor.zone_set)}个入侵区域，只检测区域内的目标")
+
+    def save_zones(self, zone_set):
+        """区域画完/删除后按视频源保存"""
+        if self.zone_source is None:
+            self.append_log("⚠️ 请先打开视频/摄像头再画入侵区域（区域按视频源保存）")
+            return
         try:
-            if self.is_stopping or self.cap is None or self.model is None:
-                return
+            self.zone_store.set(self.zone_source, zone_set)
+            self.append_log(f"✅ 入侵区域已保存（共{len(zone_set)}个）")
+        except OSError as e:
+            self.append_log(f"❌ 入侵区域保存失败：{str(e)}")
+        self.update_decode_resolution()
+        if self.cached_video_args is not None:
+            # 区域不同检测结果也不同：按新区域重新打开缓存
+            model, params, background_fill = self.cached_video_args
+            self.open_detection_cache(model, background_fill=background_fill, **params)
+
+    def update_decode_resolution(self):
+        """
+        区域内检测和级联复检都要裁剪原图像素：画了区域或走级联检测的视频按原图分辨率解码，否则解码时缩小
+        （级联复检从缩小后的帧上裁剪，4K录像里远处的小手提包细节就没了）
+        """
+        if not hasattr(self.cap, "request_full_resolution"):
+            return  # 摄像头/网络流
+        # 采集线程读下一帧时生效（区域坐标是相对比例，不受分辨率影响）
+        self.cap.request_full_resolution(bool(self.zone_editor.zone_set) or self.cascade_full_resolution)
+
+    # -------------------------- 视频检测结果缓存（同一段录像再次打开时不再推理） --------------------------
+    def open_detection_cache(self, model, background_fill=False, **params):
+        """
+        打开当前视频文件的检测缓存（按视频内容、模型、检测参数和入侵区域区分），已有结果的帧不再推理
+        background_fill：播放时只检测部分帧（实时检测跳帧），停止后在后台批量分析其余帧补齐缓存
+        """
+        self.close_detection_cache()
+        if self.detection_cache is None or not hasattr(self.cap, "request_full_resolution"):
+            return  # 摄像头/网络流不缓存
+        self.cached_video_args = (model, params, background_fill)
+        zones = [zone.to_dict() for zone in self.zone_editor.zone_set.zones]
+        try:
+            self.cached_video = self.detection_cache.open(
+                self.zone_source, model, frame_count=int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                zones=zones, **params)
+        except Exception as e:
+            self.append_log(f"⚠️ 检测结果缓存打开失败，本次逐帧推理：{str(e)}")
+            self.cached_video = None
+        if self.cached_video is not None and len(self.cached_video):
+            if self.cached_video.complete:
+                self.append_log(f"✅ 检测结果缓存命中：全部{len(self.cached_video)}帧直接使用缓存，不再推理")
+            else:
+                self.append_log(f"ℹ️ 检测结果缓存：已有{len(self.cached_video)}帧结果，其余帧照常检测"
+                                f"{'（停止播放后后台补齐）' if background_fill else '并写入缓存'}")
 
-            # 帧读取重试（最多3次，避免偶尔丢帧）
-            ret = False
-            frame = None
-            for _ in range(3):
-                ret, frame = self.cap.read()
-                if ret:
-                    break
+    def close_detection_cache(self):
+        """写入当前视频剩余的检测结果（超出缓存上限时淘汰最久未用的视频）"""
+        cached_video, self.cached_video = self.cached_video, None
+        if cached_video is not None:
+            try:
+                cached_video.close()
+            except Exception as e:
+                self.append_log(f"⚠️ 检测结果缓存写入失败：{str(e)}")
+
+    def start_cache_fill(self):
+        """停止播放时：把当前缓存交给补齐线程，后台批量分析没有缓存的帧（返回是否开始补齐）"""
+        cached_video, (model, params, background_fill) = self.cached_video, self.cached_video_args
+        if cached_video is None or not background_fill or cached_video.complete:
+            return False
+        if self.zone_editor.zone_set:
+            return False  # 画了区域时只裁剪区域检测，整帧批量分析的结果与之不一致，不补齐
+        self.cached_video = None  # 由补齐线程写入剩余结果并关闭
+        thread = self.cache_fill_thread = CacheFillThread(cached_video, self.zone_source, model, params,
+                                                          batch_size=self.OFFLINE_BATCH_SIZE)
+        thread.finished_signal.connect(lambda analysis: self.finish_cache_fill(thread, analysis))
+        thread.error_signal.connect(lambda msg: self.append_log(f"⚠️ 检测结果缓存补齐失败：{msg}"))
+        thread.start()
+        self.append_log("⏳ 后台补齐检测结果缓存（开始新的检测时自动中止，已分析的帧保留）")
+        return True
+
+    def finish_cache_fill(self, thread, analysis):
+        """补齐线程结束（主线程）"""
+        if thread is self.cache_fill_thread:
+            self.cache_fill_thread = None
+        state = "已完整" if thread.cached_video.complete else "未完整"
+        self.append_log(f"ℹ️ 检测结果缓存补齐：分析{analysis.frame_count}帧（{analysis.fps:.1f}帧/秒），"
+                        f"{thread.cached_video.summary()}，{state}")
+
+    def stop_cache_fill(self):
+        """中止后台补齐（要用模型做新的检测时调用，已分析的帧照常写入缓存）"""
+        if self.cache_fill_thread is not None:
+            thread, self.cache_fill_thread = self.cache_fill_thread, None
+            if not thread.stop():
+                self.retire_thread(thread)
+
+    def cached_detections(self, payload):
+        """该帧缓存的检测结果 (xyxy, conf, cls)，没有时返回None"""
+        cached_video = payload.get("cache")
+        if cached_video is None or payload.get("frame_index") is None:
+            return None
+        return cached_video.get(payload["frame_index"], payload["frame"].shape)
+
+    def store_detections(self, payload, detections):
+        """推理结果写入缓存（推理线程调用）"""
+        cached_video = payload.get("cache")
+        if cached_video is not None:
+            cached_video.put(payload.get("frame_index"), payload["frame"].shape, *detections)
+
+    # -------------------------- 多路监控（多个视频源共用一个推理池） --------------------------
+    def open_multi_stream(self):
+        """输入多个视频源（摄像头编号/文件路径/网络地址，逗号分隔），分格显示并共用一个模型推理"""
+        text, ok = QtWidgets.QInputDialog.getText(
+            self, "多路监控", "视频源（逗号分隔，摄像头填编号，如：0, 1, D:/录像/门口.mp4, rtsp://...）：",
+            text=self.multi_stream_sources)
+        sources = [item.strip() for item in text.replace("，", ",").split(",") if item.strip()] if ok else []
+        if not sources:
+            return
+        self.multi_stream_sources = text
+        self.stop_all()  # 单路检测和多路监控不同时占用摄像头
+        self.stop_cache_fill()
+        self.close_multi_stream()
+
+        self.multi_stream_window = MultiStreamWindow(self.model, sources)
+        self.multi_stream_window.show()
+        failed = self.multi_stream_window.start()
+        for stream in failed:
+            self.append_log(f"❌ 无法打开视频源：{stream.display_source}")
+        opened = len(sources) - len(failed)
+        self.append_log(f"✅ 多路监控已启动：{opened}路视频源共用一个推理池（每批最多{MultiStreamWindow.BATCH_SIZE}帧）")
+
+    def close_multi_stream(self):
+        """关闭多路监控窗口（停止所有采集线程和推理池）"""
+        if self.multi_stream_window is not None:
+            self.multi_stream_window.close()
+            self.multi_stream_window = None
+
+    # -------------------------- 采集线程（读帧不占用GUI线程） --------------------------
+    def start_capture_thread(self, is_file, fps=None):
+        """把self.cap交给采集线程，子线程读帧写入环形缓冲区"""
+        self.last_frame_seq = 0
+        self.frame_seq_base = self.frame_buffer.last_seq  # 采集线程还没启动，之后写入的第一帧序号是它+1
+        self.capture_thread = CaptureThread(self.cap, self.frame_buffer, is_file=is_file, fps=fps)
+        self.capture_thread.read_failed_signal.connect(self.append_log)
+        self.capture_thread.stream_ended_signal.connect(self.handle_stream_ended)
+        self.capture_thread.start()
+
+    def stop_capture_thread(self):
+        """停止采集线程（线程退出时会释放cap）"""
+        if self.capture_thread is not None:
+            thread, self.capture_thread = self.capture_thread, None
+            if not thread.stop():
+                # 还卡在摄像头read()里：保留引用直到线程退出（线程退出时自己释放cap）
+                self.append_log("ℹ️ 采集线程仍在等待设备返回，退出后自动释放")
+                self.retire_thread(thread)
+            self.cap = None
 
-            if not ret:
-                # 判断是否视频结束（摄像头卡顿不会触发此逻辑）
-                if self.cap.get(cv2.CAP_PROP_POS_FRAMES) >= self.cap.get(cv2.CAP_PROP_FRAME_COUNT):
-                    self.append_log("ℹ️ 视频播放结束，自动停止检测")
-                    self.stop_all()  # 视频结束后自动停止并清屏
-                else:
-                    self.append_log("⚠️ 暂时无法读取帧（设备卡顿，将重试）")
-                return
+    def retire_thread(self, thread):
+        """停止后还没退出的QThread：保留引用直到finished，避免Qt销毁仍在运行的线程（QThread: Destroyed while thread is still running）"""
+        self.retiring_threads.add(thread)
+        thread.finished.connect(self.release_retired_threads)  # 窗口的槽：在主线程执行
+        self.release_retired_threads()  # 连接信号前可能已经退出
+
+    def release_retired_threads(self):
+        """丢掉已经退出的线程的引用（主线程）"""
+        for thread in list(self.retiring_threads):
+            if thread.wait(100):  # finished发出后线程马上结束，这里等它彻底退出
+                self.retiring_threads.discard(thread)
+
+    def handle_stream_ended(self):
+        """采集线程通知视频文件播放结束"""
+        if not self.is_stopping:
+            self.append_log("ℹ️ 视频播放结束，自动停止检测")
+            self.stop_all()  # 视频结束后自动停止并清屏
+
+    # -------------------------- 帧处理流水线（推理→后处理→渲染） --------------------------
+    def start_pipeline(self, infer_func):
+        """创建并启动帧处理流水线，infer_func决定用哪个模型/参数推理"""
+        self.stop_pipeline()
+        self.stop_cache_fill()  # 模型让给新的检测
+        workers = self.PIPELINE_WORKERS
+        self.pipeline = StageGraph([
+            Stage("infer", infer_func, workers=workers["infer"]),
+            Stage("postprocess", self.postprocess_frame, workers=workers["postprocess"]),
+        ], on_result=lambda seq, payload: self.handle_pipeline_result(payload),
+            queue_size=self.PIPELINE_QUEUE_SIZE,
+            on_error=lambda stage, seq, e: self.update_log_signal.emit(f"❌ 流水线{stage}阶段出错：{str(e)}"))
+        self.pipeline.start()
+
+    def stop_pipeline(self):
+        """停止流水线（未处理完的帧直接丢弃）"""
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        self.render_scheduler.clear()  # 未显示的帧不再显示（避免清屏后又冒出旧画面）
+
+    def make_pipeline_payload(self, frame, mode, frame_index=None):
+        """打包一帧送入流水线（子线程不访问控件）"""
+        return {
+            "mode": mode,
+            "frame": frame,
+            "frame_index": frame_index,  # 视频文件的帧号（查/写检测缓存用，摄像头为None）
+            "source": self.zone_source,  # 视频源（摄像头编号/文件路径/网络地址，入库用）
+            "cache": self.cached_video,  # 与区域快照同时取，保证缓存和区域对应
+            "zones": self.zone_editor.snapshot(),  # (区域, 正在画的顶点)，子线程只用副本
+        }
 
-            # 1. 显示原始视频
-            self.show_original_video(frame)
+    def start_live_tracking(self, source_fps):
+        """实时检测开始前重置检测间隔、跟踪器和运动门控（source_fps：画面刷新帧率）"""
+        self.live_stride = AdaptiveStride(source_fps=source_fps, max_stride=self.LIVE_MAX_STRIDE)
+        self.live_tracker.reset()
+        self.motion_gate.reset()
+        self.last_detect_result = None
+
+    def update_motion_gate(self, state=None):
+        """闲人入侵/动物入侵复选框变化：任意一个勾选就启用运动门控"""
+        enabled = any(checkbox is not None and checkbox.isChecked()
+                      for checkbox in (getattr(self, "detect_person_intrusion", None),
+                                       getattr(self, "detect_animal_intrusion", None)))
+        if enabled == self.motion_gate_enabled:
+            return
+        self.motion_gate.reset()
+        self.motion_gate_enabled = enabled
+        if enabled:
+            self.append_log(f"✅ 已启用运动门控：画面静止时跳过检测（每{self.MOTION_REFRESH_SECONDS:g}秒强制检测一次）")
+        else:
+            self.append_log("ℹ️ 已关闭运动门控，恢复逐帧检测")
+
+    def infer_live_frame(self, payload):
+        """
+        推理阶段（实时检测）：每k帧运行一次YOLOv8全类别检测（置信度阈值0.25），
+        其余帧由跟踪器外推检测框；k根据推理耗时自动调整，画面突变时强制检测；
+        检测缓存里有结果的帧直接用缓存，检测帧的结果写入缓存（其余帧停止播放后由后台批量分析补齐）
+        （推理阶段只有1个线程，帧按顺序经过这里，跟踪器状态不会乱序）
+        """
+        frame = payload["frame"]
+        cached = self.cached_detections(payload)
+        if cached is not None:
+            payload["tracks"] = self.live_tracker.update(*cached)
+        elif self.motion_gate_enabled and not self.motion_gate.check(frame):
+            # 画面静止：不推理也不外推，沿用上一次的检测框
+            payload["tracks"] = self.live_tracker.hold()
+        elif self.live_stride.should_detect(frame):
+            start = time.perf_counter()
+            xyxy, conf, cls = self.detect_boxes(self.model, frame, payload["zones"][0], conf=0.25)
+            self.live_stride.record_latency(time.perf_counter() - start)
+            self.store_detections(payload, (xyxy, conf, cls))
+            payload["tracks"] = self.live_tracker.update(xyxy, conf, cls)
+        else:
+            payload["tracks"] = self.live_tracker.predict()
+        return payload
+
+    def infer_plastic_frame(self, payload):
+        """推理阶段（塑料袋专项）：仅检测指定类别，置信度阈值0.3（画了入侵区域时只检测区域内；缓存里有结果的帧不推理）"""
+        detections = self.cached_detections(payload)
+        if detections is None:
+            zone_set = payload["zones"][0]
+            if zone_set or self.plastic_cascade is None:
+                detections = self.detect_boxes(self.yolo_plastic_model, payload["frame"], zone_set, classes=[0], conf=0.3)
+            else:
+                # 低分辨率粗检，有临界候选时再全分辨率复检候选区域
+                detections = self.plastic_cascade.detect(payload["frame"], classes=[0], conf=0.3)
+            self.store_detections(payload, detections)
+        payload["detections"] = detections
+        return payload
+
+    def detect_boxes(self, model, frame, zone_set, **kwargs):
+        """检测一帧，返回 (xyxy, conf, cls)；画了入侵区域时只裁剪区域送进模型，区域外的目标直接过滤"""
+        if zone_set:
+            return detect_in_zones(model, frame, zone_set, **kwargs)
+        boxes = model(frame, verbose=False, **kwargs)[0].boxes
+        return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)
+
+    def postprocess_frame(self, payload):
+        """后处理阶段：提取类别和最高置信度，生成检测框叠加层（由显示控件矢量绘制，不在帧上画）"""
+        if "tracks" in payload:
+            # 实时检测：统一画跟踪框（检测帧和外推帧样式一致，画面不闪烁）；只有检测帧记录类别
+            tracks = payload.pop("tracks")
+            names = self.model.names
+            xyxy, conf, cls = tracks.xyxy, tracks.conf, tracks.cls
+            detected_classes = [names[int(c)] for c in cls] if tracks.detected else []
+            max_conf = float(conf.max()) if tracks.detected and len(tracks) else 0.0
+            if tracks.detected:
+                # 检测帧各类别的最高置信度（交给检测事件；外推帧不参与，跳帧检测不会被当成目标消失）
+                class_confs = {}
+                for name, score in zip(detected_classes, conf):
+                    class_confs[name] = max(float(score), class_confs.get(name, 0.0))
+                payload["class_confs"] = class_confs
+                payload["boxes"] = (xyxy, conf, detected_classes)
+        else:
+            # 塑料袋专项：整帧/区域内/级联检测或缓存的结果（都是当前帧坐标）
+            xyxy, conf, cls = payload.pop("detections")
+            names = self.yolo_plastic_model.names
+            detected_classes = [names[int(c)] for c in cls]
+            max_conf = float(conf.max()) if len(conf) else 0.0
+            payload["boxes"] = (xyxy, conf, detected_classes)
+        payload["overlay"] = self.make_box_overlay(xyxy, cls, conf, names)
+        payload["detected_classes"] = detected_classes
+        payload["max_conf"] = max_conf
+        return payload
+
+    def handle_pipeline_result(self, payload):
+        """
+        流水线出口（排序线程，按帧顺序逐帧调用）：记录日志/置信度，画面交给刷新调度
+        每帧都记录结果，但显示只按刷新率取最新帧，处理速度不受显示拖累
+        """
+        if self.is_stopping and payload["mode"] == "live":
+            return
+        if payload["mode"] == "live":
+            # 检测帧的结果交给检测事件（目标进入/离开时才记录日志）
+            if "class_confs" in payload:
+                self.event_engine.update(payload["class_confs"])
+        elif payload["mode"] == "plastic":
+            if payload["detected_classes"]:
+                self.detected_plastic_bag = True
+            if payload["max_conf"] > self.plastic_max_confidence:
+                self.plastic_max_confidence = payload["max_conf"]
+        # 有检测框的检测帧交给后台线程批量入库（不等待数据库）
+        if self.detection_writer is not None and payload.get("boxes") and len(payload["boxes"][1]):
+            xyxy, conf, class_names = payload["boxes"]
+            self.detection_writer.submit(payload["source"], payload["mode"], time.time(),
+                                         payload["frame_index"], xyxy, conf, class_names)
+        self.render_scheduler.submit("ori", payload)
+        self.render_scheduler.submit("treated", payload)
+
+    def handle_detection_event(self, event):
+        """检测事件（主线程）：目标进入/离开画面时记录日志"""
+        if event.kind == ENTER:
+            self.append_log(f"🔍 检测到：{event.describe()}")
+        else:
+            self.append_log(f"ℹ️ {event.describe()}")
+
+    # -------------------------- 画面刷新（按刷新率显示最新帧，画面不可见时跳过） --------------------------
+    def init_render_scheduler(self):
+        """两个视频画面各自注册：窗口最小化/画面被遮挡时不做任何显示转换"""
+        self.render_scheduler = RenderScheduler(max_fps=self.DISPLAY_MAX_FPS, parent=self)
+        self.render_scheduler.add_pane("ori", self.present_original_frame, self.label_ori_video)
+        self.render_scheduler.add_pane("treated", self.present_treated_frame, self.label_treated)
+        self.render_scheduler.start()
+
+    def present_original_frame(self, payload):
+        """显示原始画面（主线程）：叠加入侵区域"""
+        frame_h, frame_w = payload["frame"].shape[:2]
+        self.zone_editor.frame_size = (frame_w, frame_h)  # 画区域时按当前画面尺寸换算坐标
+        self.label_ori_video.set_frame(payload["frame"], zones=(self.zone_editor.zone_set, self.zone_editor.pending))
+
+    def present_treated_frame(self, payload):
+        """显示检测后画面（主线程）：检测框矢量叠加"""
+        self.label_treated.set_frame(payload["frame"], boxes=payload["overlay"])
 
-            # 2. YOLOv8实时检测（置信度阈值0.25，过滤低置信度结果）
-            detected_frame, detected_classes = self.yolo_detect_frame(frame)
+    # -------------------------- 核心功能：帧显示+YOLOv8实时检测 --------------------------
+    def show_camera_with_yolo(self):
+        """取最新帧→送入流水线（显示原始视频、YOLOv8检测、显示检测后视频都在流水线中完成）"""
+        try:
+            if self.is_stopping or self.capture_thread is None or self.model is None or self.pipeline is None:
+                return
 
-            # 3. 显示检测后视频（带检测框和类别标签）
-            self.show_detected_video(detected_frame)
+            # 从环形缓冲区取最新帧（没有新帧就跳过本次刷新，不阻塞界面）
+            item = self.frame_buffer.latest(after_seq=self.last_frame_seq)
+            if item is None:
+                return
+            self.last_frame_seq, _, frame = item
+            # 视频文件每帧都写入缓冲区，帧序号对应帧号（查检测缓存用）
+            frame_index = self.last_frame_seq - self.frame_seq_base - 1 if self.cached_video is not None else None
 
-            # 4. 日志记录检测结果（去重，避免重复打印）
-            if detected_classes:
-                unique_classes = list(set(detected_classes))
-                self.update_log_signal.emit(f"🔍 检测到：{', '.join(unique_classes)}")
+            # 非阻塞提交：流水线忙时直接丢弃这一帧，保证画面实时
+            self.pipeline.submit(self.make_pipeline_payload(frame, "live", frame_index), block=False)
 
         except Exception as e:
             if not self.is_stopping:
@@ -491,27 +1143,30 @@ class Win_Main(QWidget):
                 self.update_log_signal.emit(f"❌ {error_msg}")
                 print(f"show_camera_with_yolo：{error_msg}")
 
+    def make_box_overlay(self, xyxy, classes, confs, names):
+        """检测框叠加层（类别 置信度 标签 + 按类别取色），交给视频显示控件矢量绘制"""
+        labels = [f"{names[int(cls)]} {conf:.2f}" for cls, conf in zip(classes, confs)]
+        colors = [self.TRACK_COLORS[int(cls) % len(self.TRACK_COLORS)] for cls in classes]
+        return BoxOverlay(xyxy, labels, colors)
+
     def yolo_detect_frame(self, frame):
-        """单帧YOLOv8检测（返回带检测框的帧和检测到的类别列表）"""
-        detected_frame = frame.copy()  # 默认返回原始帧（避免检测失败黑屏）
+        """
+        单帧YOLOv8检测（全类别，置信度阈值0.25；画了入侵区域时只检测区域内）
+        返回检测框叠加层和检测到的类别列表；叠加层交给 set_frame(frame, boxes=...) 按显示尺寸绘制，不复制原图
+        """
+        overlay = None  # 检测失败时不画框（画面照常显示原始帧）
         detected_classes = []
+        # 运动门控：画面静止时沿用上一次检测结果
+        if self.motion_gate_enabled and self.last_detect_result is not None and not self.motion_gate.check(frame):
+            return self.last_detect_result
         try:
-            # YOLOv8检测（全类别，置信度阈值0.25）
-            results = self.model(frame, conf=0.25, verbose=False)
-
-            # 结果格式校验（避免异常崩溃）
-            if isinstance(results, list) and len(results) > 0 and hasattr(results[0], 'boxes'):
-                # 绘制检测框（line_width=2：框线宽度，font_size=10：标签字体大小）
-                detected_frame = results[0].plot(line_width=2, font_size=10)
-
-                # 提取检测到的类别名称
-                if hasattr(results[0].boxes, 'cls') and len(results[0].boxes.cls) > 0:
-                    detected_classes = [self.model.names[int(cls.item())] for cls in results[0].boxes.cls]
-            else:
-                self.update_log_signal.emit("⚠️ YOLOv8检测结果格式异常，跳过当前帧")
+            xyxy, conf, cls = self.detect_boxes(self.model, frame, self.zone_editor.zone_set, conf=0.25)
+            overlay = self.make_box_overlay(xyxy, cls, conf, self.model.names)
+            detected_classes = [self.model.names[int(c)] for c in cls]
+            self.last_detect_result = (overlay, detected_classes)
         except Exception as e:
             self.update_log_signal.emit(f"❌ YOLOv8单帧检测出错：{str(e)}")
-        return detected_frame, detected_classes
+        return overlay, detected_classes
 
     # -------------------------- 核心功能：塑料袋专项检测 --------------------------
     # def handle_plastic_intrusion(self, state):
@@ -722,53 +1377,128 @@ class Win_Main(QWidget):
             # 处理照片检测
             self.detect_plastic_in_photo(file_path)
         else:
-            # 处理视频检测
-            self.detect_plastic_in_video(file_path)
+            # 处理视频检测（录像可选离线批量分析：不逐帧显示，速度更快）
+            reply = QMessageBox.question(
+                self, "检测模式",
+                f"是否使用离线批量分析（每批{self.OFFLINE_BATCH_SIZE}帧，不逐帧显示画面，速度更快）？"
+            )
+            if reply == QMessageBox.StandardButton.Yes:
+                self.detect_plastic_in_video_offline(file_path)
+            else:
+                self.detect_plastic_in_video(file_path)
 
     def detect_plastic_in_video(self, file_path):
-        """在视频中检测塑料袋相关物品"""
+        """在视频中检测塑料袋相关物品（解码线程逐帧送入流水线，结束后提示结果）"""
         # 初始化检测状态
         self.detected_plastic_bag = False
-        max_confidence = 0.0
+        self.plastic_max_confidence = 0.0
         self.label_ori_video.clear()
         self.label_treated.clear()
         self.append_log(f"ℹ️ 开始视频塑料袋专项检测：{os.path.basename(file_path)}（仅检测背包/手提包/购物袋）")
 
-        # 打开视频
-        self.cap = cv2.VideoCapture(file_path)
-        if not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(file_path, cv2.CAP_FFMPEG)
-            if not self.cap.isOpened():
-                error_msg = f"无法打开视频：{os.path.basename(file_path)}"
-                self.append_log(f"❌ {error_msg}")
-                QMessageBox.warning(self, "视频错误", error_msg)
-                return
+        # 打开视频（解码时直接缩小分辨率）
+        self.cap = open_video(file_path)
+        if self.cap is None:
+            error_msg = f"无法打开视频：{os.path.basename(file_path)}"
+            self.append_log(f"❌ {error_msg}")
+            QMessageBox.warning(self, "视频错误", error_msg)
+            return
 
-        # 逐帧专项检测
-        while self.cap.isOpened() and not self.is_stopping:
-            ret, frame = self.cap.read()
+        # 逐帧专项检测（每一帧都要检测，所以用阻塞提交，流水线满了解码线程就等待）
+        self.set_zone_source(file_path)
+        self.cascade_full_resolution = self.plastic_cascade is not None
+        self.update_decode_resolution()
+        self.open_detection_cache(self.yolo_plastic_model, classes=[0], conf=0.3,
+                                  cascade=self.CASCADE_IMGSZ if self.plastic_cascade is not None else None)
+        self.start_pipeline(self.infer_plastic_frame)
+        self.decode_thread = Thread(
+            target=self.decode_video_into_pipeline,
+            args=(self.cap, self.pipeline, file_path, self.make_pipeline_payload(None, "plastic")),
+            daemon=True
+        )
+        self.decode_thread.start()
+
+    def decode_video_into_pipeline(self, cap, pipeline, file_path, payload_template):
+        """解码线程：逐帧读取视频送入流水线，读完后等待流水线处理完再通知主线程"""
+        # 控制播放速度（模拟25fps）
+        frame_interval = 0.04
+        next_due = time.perf_counter()
+        frame_index = 0
+        while cap.isOpened() and not self.is_stopping and pipeline is self.pipeline:
+            ret, frame = cap.read()
             if not ret:
                 break  # 视频结束
-
-            # 1. 显示原始视频
-            self.show_original_video(frame)
-            # 2. 塑料袋专项检测
-            detected_frame, current_conf = self.detect_plastic_bag_frame(frame)
-            if current_conf > max_confidence:
-                max_confidence = current_conf
-            # 3. 显示检测后视频
-            self.show_detected_video(detected_frame)
-            # 4. 处理UI事件（避免卡顿）
-            QApplication.processEvents()
-            # 5. 控制播放速度（模拟25fps）
-            time.sleep(0.04)
-
-        # 检测结束处理
-        self.cap.release()
-        self.cap = None
+            payload = dict(payload_template, frame=frame, frame_index=frame_index)
+            frame_index += 1
+            if pipeline.submit(payload) is None:
+                break  # 流水线已停止
+            next_due += frame_interval
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_due = time.perf_counter()
+        pipeline.close()
+        pipeline.join()
+        if pipeline is self.pipeline:
+            self.plastic_video_done_signal.emit(file_path)
+
+    def finish_plastic_video(self, file_path):
+        """视频专项检测结束处理（主线程）"""
+        self.stop_pipeline()
+        self.decode_thread = None
+        if self.cached_video is not None:
+            self.append_log(f"ℹ️ 检测结果缓存：{self.cached_video.summary()}")
+        self.close_detection_cache()
+        self.cached_video_args = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
         self.append_log("ℹ️ 视频塑料袋专项检测结束")
+        if self.plastic_cascade is not None and self.plastic_cascade.frames:
+            self.append_log(f"ℹ️ 分辨率级联：{self.plastic_cascade.frames}帧中"
+                            f"{self.plastic_cascade.refined}帧做了全分辨率复检（{self.plastic_cascade.refine_ratio:.0%}，"
+                            f"其中{self.plastic_cascade.full_passes}帧候选过多改为整帧推理）")
         # 结果提示
-        self.show_plastic_detection_result(file_path, max_confidence)
+        self.show_plastic_detection_result(file_path, self.plastic_max_confidence)
+
+    def detect_plastic_in_video_offline(self, file_path):
+        """离线批量分析视频中的塑料袋相关物品（后台线程，多帧一批推理）"""
+        self.detected_plastic_bag = False
+        self.label_ori_video.clear()
+        self.label_treated.clear()
+        self.append_log(f"ℹ️ 开始离线批量分析：{os.path.basename(file_path)}（每批{self.OFFLINE_BATCH_SIZE}帧）")
+
+        models = [("plastic", self.yolo_plastic_model, {"classes": [0], "conf": 0.3})]
+        self.stop_cache_fill()
+        self.offline_thread = OfflineAnalysisThread(file_path, models, batch_size=self.OFFLINE_BATCH_SIZE)
+        self.offline_thread.progress_signal.connect(self.report_offline_progress)
+        self.offline_thread.finished_signal.connect(self.finish_offline_analysis)
+        self.offline_thread.error_signal.connect(lambda msg: self.append_log(f"❌ 离线批量分析失败：{msg}"))
+        self.offline_thread.start()
+
+    def report_offline_progress(self, done, total, fps):
+        """离线分析进度（主线程）"""
+        if total > 0:
+            self.append_log(f"⏳ 离线分析进度：{done}/{total}帧（{done * 100 // total}%），{fps:.1f}帧/秒")
+        else:
+            self.append_log(f"⏳ 离线分析进度：{done}帧，{fps:.1f}帧/秒")
+
+    def finish_offline_analysis(self, analysis):
+        """离线分析结束（主线程）：汇总结果并提示"""
+        if self.offline_thread is None:
+            return  # 已被停止
+        self.offline_thread = None
+        hit_frames = analysis.hit_frames()
+        self.detected_plastic_bag = bool(hit_frames)
+        max_confidence = max(analysis.max_confidence().values(), default=0.0)
+        self.append_log(
+            f"ℹ️ 离线批量分析结束：共{analysis.frame_count}帧，耗时{analysis.elapsed:.1f}秒，"
+            f"{analysis.fps:.1f}帧/秒（批大小{analysis.batch_size}），{len(hit_frames)}帧有检测结果"
+        )
+        if hit_frames:
+            self.append_log(f"ℹ️ 首次检测到的帧号：{hit_frames[0]}")
+        self.show_plastic_detection_result(analysis.path, max_confidence)
 
     def detect_plastic_in_photo(self, file_path):
         """在照片中检测塑料袋相关物品"""
@@ -780,6 +1510,7 @@ class Win_Main(QWidget):
         self.append_log(f"ℹ️ 开始照片塑料袋专项检测：{os.path.basename(file_path)}（仅检测背包/手提包/购物袋）")
 
         # 读取照片
+        self.set_zone_source(file_path)
         frame = cv2.imread(file_path)
         if frame is None:
             error_msg = f"无法读取照片：{os.path.basename(file_path)}（格式不支持或文件损坏）"
@@ -790,9 +1521,9 @@ class Win_Main(QWidget):
         # 1. 显示原始照片
         self.show_original_video(frame)
         # 2. 塑料袋专项检测
-        detected_frame, max_confidence = self.detect_plastic_bag_frame(frame)
-        # 3. 显示检测后照片
-        self.show_detected_video(detected_frame)
+        overlay, max_confidence = self.detect_plastic_bag_frame(frame)
+        # 3. 显示检测后照片（检测框按显示尺寸矢量绘制）
+        self.show_detected_video(frame, overlay)
 
         self.append_log("ℹ️ 照片塑料袋专项检测结束")
         # 结果提示
@@ -814,71 +1545,35 @@ class Win_Main(QWidget):
             self.append_log(f"ℹ️ 专项检测结果：未发现塑料袋相关物品")
 
     def detect_plastic_bag_frame(self, frame):
-        """单帧塑料袋专项检测（视频和照片通用）"""
+        """单帧塑料袋专项检测（照片用，视频走流水线），返回检测框叠加层和最高置信度"""
         max_conf = 0.0
-        detected_frame = frame.copy()
+        overlay = None
         try:
-            # YOLOv8检测（仅24=背包、26=手提包、41=购物袋，置信度阈值0.3）
-            results = self.yolo_plastic_model(frame, classes=[0], conf=0.3, verbose=False)
-
-            # 结果格式校验
-            if isinstance(results, list) and len(results) > 0 and hasattr(results[0], 'boxes'):
-                detected_frame = results[0].plot(line_width=2, font_size=10)
-                # 更新检测状态和最高置信度
-                if len(results[0].boxes) > 0:
-                    self.detected_plastic_bag = True
-                    if hasattr(results[0].boxes, 'conf') and len(results[0].boxes.conf) > 0:
-                        max_conf = max(box.item() for box in results[0].boxes.conf)
+            zone_set = self.zone_editor.zone_set
+            if zone_set or self.plastic_cascade is None:
+                # YOLOv8检测（仅24=背包、26=手提包、41=购物袋，置信度阈值0.3；画了区域时只检测区域内）
+                xyxy, conf, cls = self.detect_boxes(self.yolo_plastic_model, frame, zone_set, classes=[0], conf=0.3)
             else:
-                self.append_log("⚠️ 塑料袋专项检测结果格式异常")
+                # 分辨率级联：低分辨率粗检，临界候选区域再全分辨率复检
+                xyxy, conf, cls = self.plastic_cascade.detect(frame, classes=[0], conf=0.3)
+            overlay = self.make_box_overlay(xyxy, cls, conf, self.yolo_plastic_model.names)
+            max_conf = float(conf.max()) if len(conf) else 0.0
+            # 更新检测状态
+            if len(cls):
+                self.detected_plastic_bag = True
         except Exception as e:
             self.append_log(f"❌ 塑料袋单帧检测出错：{str(e)}")
-        return detected_frame, max_conf
+        return overlay, max_conf
 
-    # 视频/图片显示辅助函数保持不变
+    # -------------------------- 视频/图片显示辅助函数 --------------------------
     def show_original_video(self, frame):
-        """显示原始视频/照片到label_ori_video（布满标签区域）"""
-        ori_size = self.label_ori_video.size()
-        target_w, target_h = ori_size.width(), ori_size.height()
-        if target_w <= 0 or target_h <= 0:
-            target_w, target_h = 520, 400  # 默认尺寸
-
-        # 缩放帧（保持宽高比，填满标签）
-        frame_h, frame_w = frame.shape[:2]
-        scale = max(target_w / frame_w, target_h / frame_h)
-        new_w, new_h = int(frame_w * scale), int(frame_h * scale)
-        frame_resized = cv2.resize(frame, (new_w, new_h))
-
-        # BGR转RGB（Qt显示格式）
-        frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-        # 转换为QImage并显示
-        h, w, ch = frame_rgb.shape
-        q_img = QImage(frame_rgb.data, w, h, ch * w, QImage.Format.Format_RGB888)
-        self.label_ori_video.setPixmap(QPixmap.fromImage(q_img).scaled(
-            ori_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-        ))
-
-    def show_detected_video(self, frame):
-        """显示检测后视频/照片到label_treated（布满标签区域）"""
-        treated_size = self.label_treated.size()
-        target_w, target_h = treated_size.width(), treated_size.height()
-        if target_w <= 0 or target_h <= 0:
-            target_w, target_h = 520, 400  # 默认尺寸
-
-        # 缩放帧（保持宽高比，填满标签）
-        frame_h, frame_w = frame.shape[:2]
-        scale = max(target_w / frame_w, target_h / frame_h)
-        new_w, new_h = int(frame_w * scale), int(frame_h * scale)
-        frame_resized = cv2.resize(frame, (new_w, new_h))
-
-        # BGR转RGB（Qt显示格式）
-        frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-        # 转换为QImage并显示
-        h, w, ch = frame_rgb.shape
-        q_img = QImage(frame_rgb.data, w, h, ch * w, QImage.Format.Format_RGB888)
-        self.label_treated.setPixmap(QPixmap.fromImage(q_img).scaled(
-            treated_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-        ))
+        """显示原始视频/照片到label_ori_video（保持宽高比，叠加入侵区域）"""
+        self.zone_editor.frame_size = (frame.shape[1], frame.shape[0])
+        self.label_ori_video.set_frame(frame, zones=(self.zone_editor.zone_set, self.zone_editor.pending))
+
+    def show_detected_video(self, frame, overlay=None):
+        """显示检测后视频/照片到label_treated（保持宽高比，检测框叠加层矢量绘制）"""
+        self.label_treated.set_frame(frame, boxes=overlay)
 
     # -------------------------- 停止功能（彻底释放资源+清屏） --------------------------
     def stop_all(self):
@@ -894,7 +1589,44 @@ class Win_Main(QWidget):
             self.timer_camera.stop()
             self.append_log("ℹ️ 定时器已停止")
 
-        # 2. 释放视频/摄像头资源
+        # 2. 停止流水线、采集线程并释放视频/摄像头资源
+        self.stop_pipeline()
+        if self.live_stride is not None and self.live_stride.frames:
+            stride, self.live_stride = self.live_stride, None
+            self.append_log(f"ℹ️ 实时检测共{stride.frames}帧，模型运行{stride.detections}帧"
+                            f"（{stride.detect_ratio:.0%}），最终检测间隔{stride.stride}帧")
+        if self.decode_thread is not None:
+            self.decode_thread.join(2)
+            self.decode_thread = None
+        if self.cached_video is not None:
+            # 流水线和解码线程都已停止，不会再有写入
+            self.append_log(f"ℹ️ 检测结果缓存：{self.cached_video.summary()}")
+            self.start_cache_fill()
+        self.close_detection_cache()
+        self.cached_video_args = None
+        # 仍在画面里的目标发出离开事件（结束时间为最后一次检测到的时间）
+        self.event_engine.flush()
+        if self.event_engine.frames:
+            self.append_log(f"ℹ️ 检测事件：{self.event_engine.summary()}")
+            self.event_engine.reset()
+        if self.detection_writer is not None and (self.detection_writer.written or self.detection_writer.spilled):
+            self.append_log(f"ℹ️ 检测结果入库：{self.detection_writer.summary()}")
+        if self.render_scheduler.submitted:
+            self.append_log(f"ℹ️ 画面刷新：{self.render_scheduler.summary()}")
+            self.render_scheduler.reset_stats()
+        if self.motion_gate_enabled and self.motion_gate.frames:
+            self.append_log(f"ℹ️ 运动门控：{self.motion_gate.frames}帧中跳过{self.motion_gate.saved}次推理"
+                            f"（节省{self.motion_gate.saved_ratio:.0%}）")
+        if self.offline_thread is not None:
+            offline_thread, self.offline_thread = self.offline_thread, None
+            if not offline_thread.stop():
+                self.retire_thread(offline_thread)
+            self.append_log("ℹ️ 离线批量分析已中止")
+        if isinstance(self.capture_thread, StreamCaptureThread):
+            self.append_log(f"ℹ️ 网络视频流：{self.capture_thread.health.summary()}")
+        if self.capture_thread is not None:
+            self.stop_capture_thread()
+            self.append_log("ℹ️ 采集线程已停止")
         if self.cap and self.cap.isOpened():
             self.cap.release()
             self.cap = None
@@ -914,15 +1646,13 @@ class Win_Main(QWidget):
 
     # -------------------------- 辅助功能 --------------------------
     def append_log(self, text):
-        """添加带时间戳的日志，并自动滚动到最新行"""
-        current_time = time.strftime("%H:%M:%S", time.localtime())
-        self.textLog.append(f"[{current_time}] {text}")
-        # 自动滚动到日志底部
-        self.textLog.verticalScrollBar().setValue(self.textLog.verticalScrollBar().maximum())
+        """添加日志（任意线程可调用，不阻塞）：时间戳在提交时记录，由日志定时批量显示并写入日志文件"""
+        self.log_sink.post(text)
 
     def logout(self):
         """退出登录，返回登录窗口"""
         self.stop_all()
+        self.close_multi_stream()
         self.hide()
         if SI.loginWin:
             SI.loginWin.show()
@@ -933,14 +1663,75 @@ class Win_Main(QWidget):
     def closeEvent(self, event):
         """窗口关闭事件（确保资源彻底释放）"""
         self.stop_all()
+        self.stop_cache_fill()
+        self.close_multi_stream()
+        self.close_detection_cache()
+        if self.detection_cache is not None:
+            self.detection_cache.close()
+            self.detection_cache = None
+        self.log_sink.close()  # 剩余日志写入日志文件
         event.accept()
 
 
+def preload_models():
+    """启动预加载：加载并预热YOLOv8模型（后台线程），返回已预热的共享句柄"""
+    model = get_registry().get(MODEL_WEIGHTS, backend=Win_Main.INFERENCE_BACKEND)
+    with PROFILER.phase("模型加载"):
+        model.model  # 访问底层模型时加载权重
+    with PROFILER.phase("预热推理"):
+        results = model.warmup(imgsz=640)
+    if results is not None and not (isinstance(results, list) and results and hasattr(results[0], 'boxes')):
+        raise Exception("模型推理结果异常，无有效检测框（boxes）")
+    return model
+
+
+def preload_database():
+    """启动预加载：连接池建好一个连接（后台线程）"""
+    pool = get_pool(ACCOUNT_DB)
+    with PROFILER.phase("数据库连接"), pool.connection(timeout=10):
+        pass
+    return pool
+
+
+def preload_main_ui():
+    """启动预加载：取得编译好的主界面类（后台线程）"""
+    with PROFILER.phase("主界面UI解析"):
+        return load_ui_class(MAIN_UI_FILE)
+
+
+def create_startup():
+    """登录期间并行执行的预加载任务：模型加载+预热、主界面UI编译、数据库连接"""
+    startup = StartupOrchestrator()
+    startup.add("model", "模型", preload_models)
+    startup.add("ui", "主界面", preload_main_ui)
+    startup.add("db", "数据库", preload_database)
+    return startup
+
+
+def profile_startup(app):
+    """--profile-startup：后台预加载全部结束（或超时）后退出事件循环，由入口输出耗时分析"""
+    def finish():
+        PROFILER.mark("预加载完成")
+        app.quit()
+    SI.startup.finished_signal.connect(finish)
+    if SI.startup.done():
+        QtCore.QTimer.singleShot(0, finish)
+    QtCore.QTimer.singleShot(PROFILE_TIMEOUT_SECONDS * 1000, app.quit)
+
+
 # 程序入口（适配高DPI，确保UI显示正常）
 if __name__ == "__main__":
+    PROFILER.mark("模块导入完成")
     app = QApplication(sys.argv)
     # 初始化登录窗口
     SI.loginWin = Win_Login()
     SI.loginWin.show()
-    # 启动应用
-    sys.exit(app.exec())
+    PROFILER.mark("登录窗口显示")
+    if PROFILER.enabled:
+        profile_startup(app)
+    # 启动应用（退出前把还没入库的检测结果写完）
+    exit_code = app.exec()
+    if PROFILER.enabled:
+        PROFILER.write()
+    close_detection_writer()
+    sys.exit(exit_code)
@@ -0,0 +1,252 @@
+"""
+CPU推理后端：PyTorch / ONNX Runtime / ONNX Runtime INT8 / OpenVINO
+
+生产机没有显卡，PyTorch在CPU上并不是最快的运行时。这里把 .pt 权重自动导出成
+ONNX / OpenVINO 模型并缓存到 model_cache/（按权重内容哈希命名，权重变了自动重新导出），
+再交给 ultralytics 的 YOLO 加载——调用方式不变，仍然是 model(frame, conf=..., classes=...)。
+
+- onnx：ONNX Runtime（CPU）
+- onnx-int8：在 onnx 基础上做静态INT8量化，用本地样本帧（照片/视频）校准
+- openvino：Intel OpenVINO（Intel CPU上通常最快）
+
+选择后端：环境变量 YOLO_BACKEND（默认 pytorch），或 get_registry().get(权重, backend="onnx")
+INT8校准样本目录：环境变量 YOLO_CALIBRATION_DIR（默认 calibration/，放一些现场照片或录像）
+
+测速：
+    python backends.py yolov8n.pt --backends pytorch onnx onnx-int8 openvino --source 录像.mp4
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8", "openvino")
+DEFAULT_BACKEND = os.environ.get("YOLO_BACKEND", "pytorch")
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(MODULE_DIR, "model_cache")
+CALIBRATION_DIR = os.environ.get("YOLO_CALIBRATION_DIR", os.path.join(MODULE_DIR, "calibration"))
+EXPORT_IMGSZ = 640
+
+_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+_VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.ts'}
+
+
+def check_backend(backend):
+    """校验后端名称，返回规范化后的名称"""
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的推理后端：{backend}（可选：{', '.join(BACKENDS)}）")
+    return backend
+
+
+def _cache_path(weights, content_hash, backend):
+    """导出模型的缓存路径：model_cache/<权重名>-<哈希前12位>[-int8].onnx 或 ..._openvino_model/"""
+    stem = f"{os.path.splitext(os.path.basename(weights))[0]}-{content_hash[:12]}"
+    if backend == "onnx":
+        return os.path.join(CACHE_DIR, f"{stem}.onnx")
+    if backend == "onnx-int8":
+        return os.path.join(CACHE_DIR, f"{stem}-int8.onnx")
+    return os.path.join(CACHE_DIR, f"{stem}_openvino_model")
+
+
+def _export(weights, fmt):
+    """用ultralytics导出模型（动态输入尺寸，批量推理和区域裁剪推理都能用），返回导出文件路径"""
+    from ultralytics import YOLO
+
+    return YOLO(weights).export(format=fmt, imgsz=EXPORT_IMGSZ, dynamic=True, simplify=fmt == "onnx")
+
+
+def sample_frames(source=None, count=64, imgsz=EXPORT_IMGSZ):
+    """
+    从本地照片/录像中均匀取count帧作为校准/测速样本（BGR原图）
+    source：目录、单个文件或通配符，默认 CALIBRATION_DIR
+    """
+    source = source or CALIBRATION_DIR
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, "**", "*"), recursive=True))
+    else:
+        files = sorted(glob.glob(source))
+    images = [f for f in files if os.path.splitext(f)[1].lower() in _IMAGE_EXTENSIONS]
+    videos = [f for f in files if os.path.splitext(f)[1].lower() in _VIDEO_EXTENSIONS]
+
+    frames = [frame for frame in (cv2.imread(path) for path in images[:count]) if frame is not None]
+    per_video = (count - len(frames)) // len(videos) + 1 if videos else 0
+    for path in videos:
+        if len(frames) >= count:
+            break
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or per_video
+        for index in np.linspace(0, max(total - 1, 0), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    if not frames:
+        raise FileNotFoundError(f"没有找到校准样本（请在 {source} 放入现场照片或录像）")
+    return frames[:count]
+
+
+def _to_input(frame, imgsz=EXPORT_IMGSZ):
+    """与YOLO一致的预处理：letterbox → RGB → NCHW float32（0~1）"""
+    from multi_model import letterbox
+
+    image, _, _ = letterbox(frame, imgsz)
+    return np.ascontiguousarray(image[:, :, ::-1].transpose(2, 0, 1))[None].astype(np.float32) / 255.0
+
+
+def quantize_onnx_int8(fp32_path, int8_path, frames):
+    """
+    ONNX静态INT8量化（QDQ格式），用本地样本帧校准激活值范围
+    检测头（最后的解码/拼接部分）保持FP32，避免框坐标精度下降
+    """
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class _FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self._inputs = iter({input_name: _to_input(frame)} for frame in frames)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    model = onnx.load(fp32_path)
+    input_name = model.graph.input[0].name
+    # YOLOv8的检测头节点名形如 /model.22/...（最后一层），这一层不量化
+    last_layer = max((node.name.split("/")[1] for node in model.graph.node
+                      if node.name.startswith("/model.") and node.name.count("/") > 1),
+                     key=lambda name: int(name.split(".")[1]) if name.split(".")[1].isdigit() else -1,
+                     default=None)
+    exclude = [node.name for node in model.graph.node if last_layer and node.name.startswith(f"/{last_layer}/")]
+    quantize_static(fp32_path, int8_path, _FrameReader(input_name), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    per_channel=True, nodes_to_exclude=exclude)
+    return int8_path
+
+
+def _publish(path, target):
+    """把生成好的文件/目录原子地换到缓存路径；其它进程已经放好同一个模型时丢弃自己的这份"""
+    try:
+        os.replace(path, target)
+    except OSError:
+        if not os.path.exists(target):
+            raise
+
+
+def prepare_backend(weights, backend, content_hash, calibration_source=None):
+    """
+    准备某个后端的模型文件（已缓存直接返回），返回交给 YOLO() 加载的路径
+    pytorch 直接返回原权重
+    """
+    backend = check_backend(backend)
+    if backend == "pytorch":
+        return weights
+    target = _cache_path(weights, content_hash, backend)
+    if os.path.exists(target):
+        return target
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # 在缓存目录下的临时目录里生成，完成后再 os.replace 到最终路径（按内容哈希命名，权重更新后不会误用旧模型）：
+    # 多个进程同时准备同一个模型时互不覆盖，也不会有进程读到写了一半的文件
+    work_dir = tempfile.mkdtemp(prefix=".export-", dir=CACHE_DIR)
+    try:
+        if backend == "onnx-int8":
+            fp32_path = prepare_backend(weights, "onnx", content_hash)
+            print(f"⏳ 正在用本地样本帧校准INT8量化模型：{os.path.basename(target)}")
+            generated = quantize_onnx_int8(fp32_path, os.path.join(work_dir, os.path.basename(target)),
+                                           sample_frames(calibration_source))
+        else:
+            print(f"⏳ 首次使用{backend}后端，正在导出模型：{os.path.basename(weights)}（只需一次）")
+            # ultralytics把导出文件放在权重旁边：先把权重复制到临时目录，导出结果也就在临时目录里
+            local_weights = shutil.copy2(weights, work_dir)
+            generated = _export(local_weights, "onnx" if backend == "onnx" else "openvino")
+        _publish(str(generated), target)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return target
+
+
+def ensure_backend_model(weights, backend, content_hash=None, calibration_source=None):
+    """
+    准备后端模型文件（本地还没有权重时先让ultralytics下载），返回交给 YOLO() 加载的路径
+    content_hash 为空时按权重文件计算
+    """
+    backend = check_backend(backend)
+    if backend == "pytorch":
+        return weights
+    if content_hash is None or content_hash == "pending-download":
+        if not os.path.isfile(weights):
+            from ultralytics import YOLO
+
+            YOLO(weights)  # 权重还没下载：先让ultralytics下载下来再导出
+        from model_registry import file_sha256
+        content_hash = file_sha256(weights)
+    return prepare_backend(weights, backend, content_hash, calibration_source)
+
+
+def load_backend_model(weights, device="cpu", backend=None, content_hash=None):
+    """
+    按后端加载模型，返回可直接调用的ultralytics YOLO对象
+    导出/量化失败时退回PyTorch（打印警告，不影响检测功能）
+    """
+    os.environ['YOLO_VERBOSE'] = 'False'
+    from ultralytics import YOLO
+
+    backend = check_backend(backend)
+    if backend != "pytorch":
+        try:
+            return YOLO(ensure_backend_model(weights, backend, content_hash), task="detect")
+        except Exception as e:
+            print(f"⚠️ {backend}后端不可用，改用PyTorch：{e}")
+    model = YOLO(weights)
+    if device and device != "cpu":
+        model.to(device)
+    return model
+
+
+def benchmark_backends(weights, backends=BACKENDS, frames=None, runs=50, imgsz=EXPORT_IMGSZ):
+    """
+    各后端测速：加载耗时、单帧平均推理耗时和帧率，返回 [(后端, 加载秒数, 毫秒/帧, 帧率), ...]
+    frames 为空时用 sample_frames() 取本地样本，没有样本就用随机图像
+    """
+    from model_registry import file_sha256
+
+    if frames is None:
+        try:
+            frames = sample_frames(count=16)
+        except FileNotFoundError:
+            frames = [np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(4)]
+    content_hash = file_sha256(weights) if os.path.exists(weights) else None
+    report = []
+    for backend in backends:
+        start = time.perf_counter()
+        model = load_backend_model(weights, backend=backend, content_hash=content_hash)
+        model(frames[0], imgsz=imgsz, verbose=False)  # 预热
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(runs):
+            model(frames[i % len(frames)], imgsz=imgsz, verbose=False)
+        per_frame = (time.perf_counter() - start) / runs
+        report.append((backend, load_time, per_frame * 1000, 1.0 / per_frame))
+        print(f"{backend:>10}：加载 {load_time:6.2f} 秒，推理 {per_frame * 1000:7.1f} 毫秒/帧，{1.0 / per_frame:6.1f} 帧/秒")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU推理后端测速（首次运行会自动导出/量化并缓存）")
+    parser.add_argument("weights", nargs="?", default="yolov8n.pt", help="模型权重（默认yolov8n.pt）")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS, help="要测试的后端")
+    parser.add_argument("--source", default=None, help="测速/校准样本：目录、照片或录像（默认calibration/）")
+    parser.add_argument("--runs", type=int, default=50, help="每个后端推理次数")
+    args = parser.parse_args()
+
+    if args.source:
+        CALIBRATION_DIR = args.source
+    benchmark_backends(args.weights, args.backends, runs=args.runs)
@@ -0,0 +1,294 @@
+"""
+无界面批量检测命令行（不依赖Qt，可在无显示器的服务器上跑）
+
+把目录/通配符/文件列表里的视频和照片分发到进程池，每个工作进程只加载一次模型，
+结果写入JSONL（每个文件一行，含逐帧命中）和/或CSV（每个文件一行汇总 + 可选逐帧命中表）。
+
+示例：
+    python batch_cli.py D:/录像/2024-05 "D:/抓拍/*.jpg" --task plastic --jsonl 结果.jsonl --csv 结果.csv
+    python batch_cli.py 录像目录 --task helmet --helmet-weights D:/yolov5/helmet_head_person_s.pt --workers 8
+    python batch_cli.py 录像目录 --jsonl 结果.jsonl --resume   # 跳过JSONL里已有结果的文件（中断后续跑）
+    python batch_cli.py 录像目录 --csv 结果.csv --backend openvino   # 用OpenVINO推理（首次自动导出）
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from backends import BACKENDS, DEFAULT_BACKEND, ensure_backend_model
+from batch_infer import analyze_video_batched, results_to_detections
+from model_registry import get_registry
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.rmvb', '.mpg', '.mpeg',
+                    '.3gp', '.webm', '.ts', '.m4v', '.f4v', '.asf'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
+
+# 检测任务：[(模型名, 权重文件, 推理参数), ...]，与界面里的检测逻辑保持一致
+TASKS = {
+    # 塑料袋专项（24=背包、26=手提包、41=购物袋）
+    "plastic": [("bag", "yolov8n.pt", {"classes": [24, 26, 41], "conf": 0.3})],
+    # 塑料袋 + 头盔/人头/人体双模型（找文件.py）
+    "helmet": [
+        ("bag", "yolov8n.pt", {"classes": [24, 26, 41], "conf": 0.3}),
+        ("helmet", "helmet_head_person_s.pt", {"conf": 0.3}),
+    ],
+    # YOLOv8全类别
+    "all": [("model", "yolov8n.pt", {"conf": 0.25})],
+}
+
+# 工作进程内的模型（每个进程初始化时加载一次）
+_worker_models = None
+
+
+def collect_files(inputs):
+    """展开目录（递归）/通配符/单个文件，返回去重后的视频和照片路径（保持输入顺序）"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(glob.glob(os.path.join(item, "**", "*"), recursive=True))
+        elif any(ch in item for ch in "*?["):
+            candidates = sorted(glob.glob(item, recursive=True))
+        else:
+            candidates = [item]
+        for path in candidates:
+            ext = os.path.splitext(path)[1].lower()
+            if os.path.isfile(path) and (ext in VIDEO_EXTENSIONS or ext in IMAGE_EXTENSIONS):
+                files.append(os.path.abspath(path))
+    return list(dict.fromkeys(files))
+
+
+def check_weights(model_specs):
+    """
+    主进程里检查权重文件（在启动进程池之前）：本地没有的先让ultralytics下载（只有官方模型能下载），
+    返回 {权重: 错误信息}；工作进程初始化失败会让整个进程池不可用，所以要先在这里发现
+    """
+    errors = {}
+    for weights in dict.fromkeys(weights for _, weights, _ in model_specs):
+        if os.path.isfile(weights):
+            continue
+        try:
+            os.environ['YOLO_VERBOSE'] = 'False'
+            from ultralytics import YOLO
+
+            YOLO(weights)  # 官方模型名：下载到本地，工作进程直接加载
+        except Exception as e:
+            errors[weights] = f"模型权重不可用：{weights}（{str(e)}）"
+    return errors
+
+
+def _new_record(path, error=None):
+    """一个文件的结果记录（error不为空时就是出错记录）"""
+    return {"file": path, "type": None, "verdict": "error", "frame_count": 0,
+            "hit_frame_count": 0, "max_conf": {}, "hits": [], "elapsed": 0.0, "error": error}
+
+
+def _init_worker(model_specs, torch_threads, backend=None):
+    """工作进程初始化：限制每个进程的推理线程数，加载一次模型"""
+    global _worker_models
+    import torch
+
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    cv2.setNumThreads(1)  # 解码/缩放不再额外开线程，核数交给进程池
+    # 同一任务里重复的权重（如两个任务都用yolov8n.pt）在进程内只加载一次
+    registry = get_registry()
+    _worker_models = [(name, registry.get(weights, backend=backend), kwargs) for name, weights, kwargs in model_specs]
+    for _, handle, _ in _worker_models:
+        handle.warmup()  # 初始化时就加载并预热，第一个文件不用等
+
+
+def _analyze_file(path, batch_size):
+    """在工作进程中分析一个文件，返回一条可JSON序列化的结果"""
+    record = _new_record(path)
+    start = time.perf_counter()
+    try:
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTENSIONS:
+            record["type"] = "photo"
+            frame = cv2.imread(path)
+            if frame is None:
+                raise IOError(f"无法读取照片：{os.path.basename(path)}")
+            record["frame_count"] = 1
+            per_model = {}
+            for name, model, kwargs in _worker_models:
+                detections = results_to_detections(model(frame, verbose=False, **kwargs)[0])
+                if detections:
+                    per_model[name] = detections
+            frames = {0: per_model} if per_model else {}
+        else:
+            record["type"] = "video"
+            analysis = analyze_video_batched(path, _worker_models, batch_size=batch_size)
+            record["frame_count"] = analysis.frame_count
+            record["fps"] = round(analysis.fps, 2)
+            frames = analysis.frames
+
+        # 逐帧命中 + 每个类别最高置信度（类别名加模型名前缀，避免双模型同名类别混在一起）
+        for index in sorted(frames):
+            for name, detections in frames[index].items():
+                record["hits"].append({"frame": index, "model": name, "detections": detections})
+                for det in detections:
+                    key = f"{name}:{det['name']}"
+                    record["max_conf"][key] = max(record["max_conf"].get(key, 0.0), det["conf"])
+        record["hit_frame_count"] = len(frames)
+        record["verdict"] = "detected" if frames else "clear"
+    except Exception as e:
+        record["error"] = str(e)
+    record["elapsed"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+class ResultWriter:
+    """结果输出：JSONL逐行追加 + CSV汇总/逐帧命中（每写一条立即刷新，中途中断也不丢已完成的结果）"""
+
+    SUMMARY_FIELDS = ["file", "type", "verdict", "frame_count", "hit_frame_count", "max_conf", "elapsed", "error"]
+    HIT_FIELDS = ["file", "frame", "model", "class", "conf", "x1", "y1", "x2", "y2"]
+
+    def __init__(self, jsonl_path=None, csv_path=None, hits_csv_path=None, append=False):
+        mode = "a" if append else "w"
+        self._jsonl = open(jsonl_path, mode, encoding="utf-8") if jsonl_path else None
+        self._csv_file = self._csv = self._hits_file = self._hits = None
+        if csv_path:
+            new_file = not (append and os.path.exists(csv_path))
+            self._csv_file = open(csv_path, mode, encoding="utf-8-sig", newline="")
+            self._csv = csv.DictWriter(self._csv_file, fieldnames=self.SUMMARY_FIELDS)
+            if new_file:
+                self._csv.writeheader()
+        if hits_csv_path:
+            new_file = not (append and os.path.exists(hits_csv_path))
+            self._hits_file = open(hits_csv_path, mode, encoding="utf-8-sig", newline="")
+            self._hits = csv.writer(self._hits_file)
+            if new_file:
+                self._hits.writerow(self.HIT_FIELDS)
+
+    def write(self, record):
+        if self._jsonl:
+            self._jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._jsonl.flush()
+        if self._csv:
+            row = {key: record.get(key) for key in self.SUMMARY_FIELDS}
+            row["max_conf"] = json.dumps(record["max_conf"], ensure_ascii=False)
+            self._csv.writerow(row)
+            self._csv_file.flush()
+        if self._hits:
+            for hit in record["hits"]:
+                for det in hit["detections"]:
+                    self._hits.writerow([record["file"], hit["frame"], hit["model"], det["name"], det["conf"], *det["box"]])
+            self._hits_file.flush()
+
+    def close(self):
+        for f in (self._jsonl, self._csv_file, self._hits_file):
+            if f:
+                f.close()
+
+
+def load_finished_files(jsonl_path):
+    """读取已有JSONL中已成功分析的文件（--resume用）"""
+    finished = set()
+    if jsonl_path and os.path.exists(jsonl_path):
+        with open(jsonl_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("verdict") != "error":
+                    finished.add(record["file"])
+    return finished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="塑料袋/头盔批量检测（无界面，多进程）")
+    parser.add_argument("inputs", nargs="+", help="视频/照片文件、目录（递归）或通配符")
+    parser.add_argument("--task", choices=sorted(TASKS), default="plastic", help="检测任务（默认plastic）")
+    parser.add_argument("--weights", default=None, help="替换yolov8n.pt的权重路径")
+    parser.add_argument("--helmet-weights", default=None, help="头盔模型权重路径（task=helmet时使用）")
+    parser.add_argument("--conf", type=float, default=None, help="覆盖所有模型的置信度阈值")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"推理后端（默认{DEFAULT_BACKEND}，可用环境变量YOLO_BACKEND修改）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数（默认CPU核数）")
+    parser.add_argument("--batch-size", type=int, default=8, help="视频离线批量推理的批大小")
+    parser.add_argument("--jsonl", default=None, help="JSONL结果文件（每个文件一行，含逐帧命中）")
+    parser.add_argument("--csv", default=None, help="CSV汇总文件（每个文件一行）")
+    parser.add_argument("--hits-csv", default=None, help="CSV逐帧命中文件（每个检测框一行）")
+    parser.add_argument("--resume", action="store_true", help="跳过JSONL中已有结果的文件，结果追加写入")
+    args = parser.parse_args(argv)
+
+    if not (args.jsonl or args.csv or args.hits_csv):
+        parser.error("至少指定一个输出：--jsonl / --csv / --hits-csv")
+
+    model_specs = []
+    for name, weights, kwargs in TASKS[args.task]:
+        kwargs = dict(kwargs)
+        if args.conf is not None:
+            kwargs["conf"] = args.conf
+        if weights == "yolov8n.pt" and args.weights:
+            weights = args.weights
+        if name == "helmet" and args.helmet_weights:
+            weights = args.helmet_weights
+        model_specs.append((name, weights, kwargs))
+
+    files = collect_files(args.inputs)
+    if args.resume:
+        finished = load_finished_files(args.jsonl)
+        files = [path for path in files if path not in finished]
+    if not files:
+        print("没有需要分析的视频/照片文件")
+        return 0
+
+    workers = max(1, min(args.workers, len(files)))
+    # 每个进程分到的推理线程数，避免进程数×线程数远超核数
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"共{len(files)}个文件，{workers}个工作进程（每进程{torch_threads}个推理线程），"
+          f"任务：{args.task}，推理后端：{args.backend}")
+
+    weight_errors = check_weights(model_specs)
+    for message in weight_errors.values():
+        print(f"❌ {message}")
+
+    if args.backend != "pytorch" and not weight_errors:
+        # 导出/量化只在主进程做一次，工作进程直接加载缓存（多个进程同时导出同一个模型会互相覆盖）
+        for weights in dict.fromkeys(weights for _, weights, _ in model_specs):
+            try:
+                ensure_backend_model(weights, args.backend)
+            except Exception as e:
+                print(f"⚠️ {os.path.basename(weights)} 的{args.backend}模型准备失败，工作进程将改用PyTorch：{e}")
+
+    writer = ResultWriter(args.jsonl, args.csv, args.hits_csv, append=args.resume)
+    start = time.perf_counter()
+    counts = {"detected": 0, "clear": 0, "error": 0}
+    try:
+        if weight_errors:
+            # 模型加载不了：不启动进程池，每个文件写一条出错记录
+            message = "；".join(weight_errors.values())
+            for path in files:
+                writer.write(_new_record(path, message))
+            counts["error"] = len(files)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_specs, torch_threads, args.backend)) as pool:
+                futures = {pool.submit(_analyze_file, path, args.batch_size): path for path in files}
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        # 工作进程崩溃/初始化失败（BrokenProcessPool）等：记为该文件出错，继续处理其它结果
+                        record = _new_record(futures[future], f"工作进程出错：{type(e).__name__}: {str(e)}")
+                    writer.write(record)
+                    counts[record["verdict"]] += 1
+                    status = record["error"] or f"{record['verdict']}（{record['hit_frame_count']}/{record['frame_count']}帧命中）"
+                    print(f"[{done}/{len(files)}] {os.path.basename(record['file'])}：{status}")
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"完成：发现{counts['detected']}个，未发现{counts['clear']}个，出错{counts['error']}个，耗时{elapsed:.1f}秒")
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+离线视频批量推理（不依赖Qt，可在界面/命令行/子进程中使用）
+
+录像文件不需要实时显示，逐帧调用模型会浪费大部分吞吐。
+这里用一个解码线程提前读帧，把若干帧（如8或16帧）拼成一批一次送进模型，
+每帧的检测结果再按帧号对应回去，并统计每个批大小下的处理帧率。
+4K录像在解码时直接缩到长边1280（见decoder.py），检测框坐标换算回原图。
+
+用法：
+    analysis = analyze_video_batched("a.mp4", [("bag", model, {"classes": [24, 26, 41], "conf": 0.3})], batch_size=8)
+    analysis.frames[120]["bag"]   # 第120帧的检测结果列表
+    analysis.max_confidence("bag")  # {类别名: 最高置信度}
+
+命令行测速：
+    python batch_infer.py 视频.mp4 --batch-sizes 1 8 16 --max-frames 256
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+
+from decoder import DECODE_MAX_SIDE, open_video
+
+# 解码线程结束标记
+_END = object()
+
+
+def results_to_detections(result, scale=1.0):
+    """
+    把单帧YOLO结果转为可序列化的检测列表 [{cls, name, conf, box:[x1,y1,x2,y2]}]
+    scale：推理帧相对原图的缩放比例，框坐标除以它换算回原图
+    """
+    boxes = getattr(result, "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        return []
+    xyxy = boxes.xyxy.cpu().numpy() / scale
+    confs = boxes.conf.cpu().numpy()
+    classes = boxes.cls.cpu().numpy().astype(int)
+    return [
+        {
+            "cls": int(cls),
+            "name": result.names[int(cls)],
+            "conf": round(float(conf), 4),
+            "box": [round(float(v), 1) for v in box],
+        }
+        for box, conf, cls in zip(xyxy, confs, classes)
+    ]
+
+
+class VideoAnalysis:
+    """一个视频的离线分析结果：逐帧检测 + 耗时统计"""
+
+    def __init__(self, path, batch_size):
+        self.path = path
+        self.batch_size = batch_size
+        self.frames = {}  # {帧号: {模型名: [检测结果, ...]}}，只记录有检测结果的帧
+        self.indices = []  # 实际分析过的帧号（没有检测结果的帧也在内）
+        self.frame_count = 0  # 实际分析的帧数
+        self.decoded = 0  # 解码的帧数（含skip跳过的帧；读到结尾时即视频实际帧数）
+        self.source_size = (0, 0)  # 原图 (宽, 高)，检测框坐标以它为准
+        self.decode_time = 0.0  # 解码线程累计耗时（与推理重叠）
+        self.infer_time = 0.0  # 推理累计耗时
+        self.elapsed = 0.0  # 总耗时
+
+    @property
+    def fps(self):
+        """整体处理帧率（帧/秒）"""
+        return self.frame_count / self.elapsed if self.elapsed > 0 else 0.0
+
+    def max_confidence(self, model_name=None):
+        """每个类别的最高置信度 {类别名: 置信度}，model_name为空时统计所有模型"""
+        best = {}
+        for per_model in self.frames.values():
+            for name, detections in per_model.items():
+                if model_name is not None and name != model_name:
+                    continue
+                for det in detections:
+                    if det["conf"] > best.get(det["name"], 0.0):
+                        best[det["name"]] = det["conf"]
+        return best
+
+    def hit_frames(self, model_name=None):
+        """有检测结果的帧号列表（升序）"""
+        return sorted(
+            index for index, per_model in self.frames.items()
+            if any(dets for name, dets in per_model.items() if model_name is None or name == model_name)
+        )
+
+
+def _decode_ahead(path, frame_queue, stop_event, stats, max_frames=None, max_side=DECODE_MAX_SIDE, skip=()):
+    """解码线程：提前读帧放进有界队列（队列满时等待，形成背压）；skip里的帧号只解码不送入"""
+    start = time.perf_counter()
+    cap = open_video(path, max_side)
+    index = 0
+    try:
+        if cap is None:
+            stats["error"] = f"无法打开视频：{os.path.basename(path)}"
+            return
+        stats["total"] = cap.frame_count
+        stats["source_fps"] = cap.fps
+        stats["scale"] = cap.scale
+        stats["source_size"] = cap.source_size
+        while not stop_event.is_set():
+            if max_frames is not None and index >= max_frames:
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index in skip:
+                index += 1
+                continue
+            while not stop_event.is_set():
+                try:
+                    frame_queue.put((index, frame), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            index += 1
+    finally:
+        if cap is not None:
+            cap.release()
+        stats["decoded"] = index
+        stats["decode_time"] = time.perf_counter() - start
+        frame_queue.put(_END)
+
+
+def analyze_video_batched(path, models, batch_size=8, max_frames=None, on_progress=None, stop_event=None,
+                          max_side=DECODE_MAX_SIDE, skip=None):
+    """
+    离线批量分析一个视频
+    - models：[(模型名, 模型对象, 推理参数dict), ...]，同一批帧依次送入每个模型
+    - batch_size：每次送入模型的帧数
+    - max_side：解码输出的长边上限（None为原图分辨率），检测框坐标始终是原图坐标
+    - on_progress(已分析帧数, 总帧数, 当前帧率)：每批处理完调用一次，返回False可中止
+    - stop_event：外部中止信号（threading.Event）
+    - skip：不需要分析的帧号集合（例如已有缓存结果的帧），这些帧只解码不推理
+    出错（如视频打不开）抛出IOError
+    """
+    batch_size = max(1, int(batch_size))
+    stop_event = stop_event or threading.Event()
+    analysis = VideoAnalysis(path, batch_size)
+    stats = {}
+    # 解码队列容纳几批帧，让解码和推理重叠进行
+    frame_queue = queue.Queue(maxsize=batch_size * 3)
+    decoder = threading.Thread(
+        target=_decode_ahead, args=(path, frame_queue, stop_event, stats, max_frames, max_side, skip or ()),
+        daemon=True
+    )
+    start = time.perf_counter()
+    decoder.start()
+
+    def run_batch(batch):
+        indices = [index for index, _ in batch]
+        frames = [frame for _, frame in batch]
+        infer_start = time.perf_counter()
+        for name, model, kwargs in models:
+            results = model(frames, verbose=False, **kwargs)
+            # 模型按输入顺序返回每帧结果，逐一对应回帧号
+            for index, result in zip(indices, results):
+                detections = results_to_detections(result, stats.get("scale", 1.0))
+                if detections:
+                    analysis.frames.setdefault(index, {})[name] = detections
+        analysis.infer_time += time.perf_counter() - infer_start
+        analysis.indices.extend(indices)
+        analysis.frame_count += len(batch)
+
+    batch = []
+    try:
+        while True:
+            item = frame_queue.get()
+            if item is _END:
+                break
+            batch.append(item)
+            if len(batch) < batch_size:
+                continue
+            run_batch(batch)
+            batch = []
+            if on_progress is not None:
+                elapsed = time.perf_counter() - start
+                fps = analysis.frame_count / elapsed if elapsed > 0 else 0.0
+                if on_progress(analysis.frame_count, stats.get("total", 0), fps) is False:
+                    stop_event.set()
+            if stop_event.is_set():
+                break
+        if batch and not stop_event.is_set():
+            run_batch(batch)
+    finally:
+        stop_event.set()
+        # 清空队列，让可能阻塞的解码线程尽快退出
+        while decoder.is_alive():
+            try:
+                frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        decoder.join()
+
+    if "error" in stats:
+        raise IOError(stats["error"])
+    analysis.decode_time = stats.get("decode_time", 0.0)
+    analysis.source_size = stats.get("source_size", (0, 0))
+    analysis.decoded = stats.get("decoded", 0)
+    analysis.elapsed = time.perf_counter() - start
+    return analysis
+
+
+def benchmark_batch_sizes(path, models, batch_sizes=(1, 8, 16), max_frames=256):
+    """用同一段视频测试不同批大小的处理帧率，返回 [(批大小, 帧率), ...]"""
+    report = []
+    for batch_size in batch_sizes:
+        analysis = analyze_video_batched(path, models, batch_size=batch_size, max_frames=max_frames)
+        report.append((batch_size, analysis.fps))
+        print(f"批大小 {batch_size:>3}：{analysis.frame_count} 帧，{analysis.elapsed:.2f} 秒，{analysis.fps:.1f} 帧/秒")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线视频批量推理测速")
+    parser.add_argument("video", help="视频文件路径")
+    parser.add_argument("--weights", default="yolov8n.pt", help="模型权重（默认yolov8n.pt）")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16], help="要测试的批大小")
+    parser.add_argument("--max-frames", type=int, default=256, help="每个批大小最多分析的帧数")
+    parser.add_argument("--conf", type=float, default=0.3, help="置信度阈值")
+    parser.add_argument("--classes", type=int, nargs="*", default=None, help="只检测这些类别")
+    args = parser.parse_args()
+
+    # 关闭YOLO调试信息
+    os.environ['YOLO_VERBOSE'] = 'False'
+    from ultralytics import YOLO
+
+    model = YOLO(args.weights)
+    benchmark_batch_sizes(
+        args.video, [("model", model, {"conf": args.conf, "classes": args.classes})],
+        batch_sizes=args.batch_sizes, max_frames=args.max_frames
+    )
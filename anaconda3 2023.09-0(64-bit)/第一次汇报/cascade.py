@@ -0,0 +1,129 @@
+"""
+分辨率级联：先用低分辨率（如320）快速过一遍，只有出现候选目标时才在候选区域上用全分辨率复检
+
+现场录像大部分帧什么都没有，每帧都按640推理很浪费：
+1. 低分辨率粗检（候选阈值很低，远处的小手提包也能留下候选框）
+2. 没有候选 → 直接返回（绝大多数帧到这里就结束，计算量约为640的1/4）
+3. 置信度足够高的候选直接采用；置信度处于临界区间的候选，
+   把周围区域从原图上裁剪下来（原图像素，不缩小）再推理一次，按正常阈值决定取舍
+4. 杂乱画面里临界候选很多时，复检区域太多/太大反而比整帧推理还慢：
+   区域数超过max_regions、覆盖面积超过max_area_ratio，或估算的裁剪推理量不小于一次整帧推理时，
+   改为按high_imgsz整帧推理一次
+
+用法：
+    cascade = CascadeDetector(model, low_imgsz=320)
+    xyxy, conf, cls = cascade.detect(frame, classes=[24, 26, 41], conf=0.3)
+    print(cascade.refine_ratio)   # 需要复检的帧占比
+"""
+import numpy as np
+
+from tracker import iou_matrix
+from zones import detect_in_regions, merge_rects, regions_imgsz
+
+_EMPTY = (np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int))
+
+
+def nms(xyxy, conf, cls, iou_threshold=0.5):
+    """同类别非极大值抑制（按置信度从高到低保留），返回保留的下标"""
+    order = np.argsort(-np.asarray(conf))
+    if len(order) == 0:
+        return order
+    iou = iou_matrix(xyxy, xyxy)
+    same_class = np.asarray(cls)[:, None] == np.asarray(cls)[None, :]
+    suppressed = np.zeros(len(order), dtype=bool)
+    keep = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= (iou[i] > iou_threshold) & same_class[i]
+    return np.array(keep, dtype=int)
+
+
+def candidate_regions(xyxy, frame_w, frame_h, margin=0.5, min_size=96):
+    """候选框外扩margin倍（至少min_size像素）作为复检区域，重叠的区域合并"""
+    rects = []
+    for x1, y1, x2, y2 in np.asarray(xyxy, dtype=np.float64).reshape(-1, 4):
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w = max((x2 - x1) * (1 + margin), min_size) / 2
+        half_h = max((y2 - y1) * (1 + margin), min_size) / 2
+        rects.append([max(0, int(cx - half_w)), max(0, int(cy - half_h)),
+                      min(frame_w, int(np.ceil(cx + half_w))), min(frame_h, int(np.ceil(cy + half_h)))])
+    return merge_rects(rects)
+
+
+class CascadeDetector:
+    """两级分辨率级联检测（包装任意 model(frame, imgsz=..., conf=...) 形式的模型）"""
+
+    def __init__(self, model, low_imgsz=320, high_imgsz=640, candidate_conf=0.05, accept_conf=0.6,
+                 margin=0.5, min_size=96, max_regions=4, max_area_ratio=0.25):
+        self.model = model
+        self.low_imgsz = low_imgsz
+        self.high_imgsz = high_imgsz  # 复检时裁剪区域的最大推理尺寸
+        self.candidate_conf = candidate_conf  # 低分辨率粗检的候选阈值
+        self.accept_conf = accept_conf  # 低分辨率下置信度达到该值直接采用，不复检
+        self.margin = margin
+        self.min_size = min_size
+        self.max_regions = max_regions  # 复检区域超过该数量时改为整帧推理
+        self.max_area_ratio = max_area_ratio  # 复检区域覆盖画面超过该比例时改为整帧推理
+        self.frames = 0  # 检测过的帧数
+        self.refined = 0  # 需要高分辨率复检的帧数
+        self.full_passes = 0  # 其中改为整帧推理的帧数
+
+    @property
+    def refine_ratio(self):
+        return self.refined / self.frames if self.frames else 0.0
+
+    def too_costly(self, regions, frame_w, frame_h):
+        """复检区域是否不如整帧推理划算（区域过多、覆盖面积过大，或裁剪推理的像素量不少于整帧）"""
+        if len(regions) > self.max_regions:
+            return True
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        if area > self.max_area_ratio * frame_w * frame_h:
+            return True
+        return len(regions) * regions_imgsz(regions, self.high_imgsz) ** 2 >= self.high_imgsz ** 2
+
+    def detect(self, frame, conf=0.25, **kwargs):
+        """级联检测一帧，返回 (xyxy, conf, cls)（原图坐标）"""
+        boxes = self.model(frame, imgsz=self.low_imgsz, conf=min(conf, self.candidate_conf),
+                           verbose=False, **kwargs)[0].boxes
+        if boxes is None or len(boxes) == 0:
+            self.frames += 1
+            return _EMPTY
+        return self.refine(frame, boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                           boxes.cls.cpu().numpy().astype(int), conf=conf, **kwargs)
+
+    def refine(self, frame, xyxy, confs, classes, conf=0.25, **kwargs):
+        """
+        对低分辨率结果做第二级处理：高置信度直接采用，临界置信度的候选区域裁剪后全分辨率复检
+        （低分辨率推理已在别处完成时可以直接调用，如多模型共享预处理）
+        """
+        self.frames += 1
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        confs = np.asarray(confs, dtype=np.float32).reshape(-1)
+        classes = np.asarray(classes, dtype=int).reshape(-1)
+        if len(confs) == 0:
+            return _EMPTY
+        sure = confs >= max(conf, self.accept_conf)
+        borderline = ~sure
+        if borderline.any():
+            self.refined += 1
+            frame_h, frame_w = frame.shape[:2]
+            regions = candidate_regions(xyxy[borderline], frame_w, frame_h, self.margin, self.min_size)
+            if self.too_costly(regions, frame_w, frame_h):
+                # 复检区域太多/太大：整帧推理一次（结果已包含直接采用的目标，不用再合并）
+                self.full_passes += 1
+                boxes = self.model(frame, imgsz=self.high_imgsz, conf=conf, verbose=False, **kwargs)[0].boxes
+                if boxes is None or len(boxes) == 0:
+                    return _EMPTY
+                return (boxes.xyxy.cpu().numpy().astype(np.float32), boxes.conf.cpu().numpy().astype(np.float32),
+                        boxes.cls.cpu().numpy().astype(int))
+            rx, rc, rk = detect_in_regions(self.model, frame, regions, self.high_imgsz, conf=conf, **kwargs)
+            xyxy = np.concatenate([xyxy[sure], rx])
+            confs = np.concatenate([confs[sure], rc])
+            classes = np.concatenate([classes[sure], rk])
+            # 复检框可能与直接采用的框重复（同一目标），按置信度去重
+            keep = nms(xyxy, confs, classes)
+            xyxy, confs, classes = xyxy[keep], confs[keep], classes[keep]
+        keep = confs >= conf
+        return xyxy[keep], confs[keep], classes[keep]
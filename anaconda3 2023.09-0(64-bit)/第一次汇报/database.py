@@ -0,0 +1,487 @@
+"""
+detection_system 数据库：连接配置 + 共享连接池 + 检测结果后台批量写入
+
+连接池 ConnectionPool（每个数据库在进程内共用一个，get_pool(spec)）：
+- 登录窗口一显示就在后台预先建好连接（prewarm），点登录时不用再等TCP握手和认证
+- 取连接时，空闲超过 HEALTH_CHECK_SECONDS 的连接先用 SELECT 1 检查，断开的自动重连
+- 用完放回池里（先回滚未提交的事务），出错的连接直接丢弃
+- 登录查询的user表只在MySQL里，固定用 get_pool(ACCOUNT_DB)；检测结果入库用 DETECTION_DB 对应的池
+  （两者都是mysql时是同一个池，DETECTION_DB=sqlite:... 测试时登录照常走MySQL）
+    with get_pool(ACCOUNT_DB).connection() as conn:
+        cursor = conn.cursor()
+
+检测结果原来不入库；逐帧同步写库会拖慢流水线。DetectionWriter 的做法：
+- submit() 任意线程调用，只把行放进有界队列，不等待数据库
+- 后台写线程攒够一批（或到时间）用 executemany 一个事务写入 detection_frame / detection 两张表，
+  写线程从连接池借一个连接长期使用，出错时丢弃并按间隔重新借
+- 反压：队列满（数据库跟不上）时新结果直接追加到本地溢出文件；数据库连不上时整批写入溢出文件，
+  恢复后再从溢出文件补写入库，不丢数据，也不阻塞检测
+- close() 时把队列里剩余的结果写完（写不进数据库的落到溢出文件，下次启动补写）
+可以连本地MySQL/MariaDB，也可以用SQLite代替做测试（环境变量 DETECTION_DB=sqlite:路径）：
+    python database.py --db sqlite:detections.db --frames 20000    # 写入模拟检测结果并统计速度
+
+表结构（一次检测一行 detection_frame，每个检测框一行 detection，按 (session, seq) 关联）：
+    detection_frame(session, seq, source, frame_index, captured_at, mode, box_count, max_conf)
+    detection(session, seq, captured_at, class_name, conf, x1, y1, x2, y2)
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# 数据库连接配置（根据实际环境调整）
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3306,
+    "user": "root",
+    "password": "576499183",
+    "database": "detection_system",
+    "charset": "utf8mb4"
+}
+DETECTION_DB = os.environ.get("DETECTION_DB", "mysql")  # mysql 或 sqlite:路径
+ACCOUNT_DB = "mysql"  # 登录/账号查询用的数据库（SQL按MySQL写，不随DETECTION_DB切换）
+SPILL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detection_spill.jsonl")
+POOL_SIZE = 4  # 连接池最多同时打开的连接数
+HEALTH_CHECK_SECONDS = 30.0  # 空闲超过多久的连接取出前先检查
+
+_pools = {}  # 数据库（mysql / sqlite:路径）-> 连接池
+_pool_lock = threading.Lock()
+_writer = None
+_writer_lock = threading.Lock()
+
+_SCHEMA = {
+    "mysql": [
+        """CREATE TABLE IF NOT EXISTS detection_frame (
+            session CHAR(32) NOT NULL,
+            seq INT NOT NULL,
+            source VARCHAR(512) NOT NULL,
+            frame_index INT NULL,
+            captured_at DOUBLE NOT NULL,
+            mode VARCHAR(16) NOT NULL,
+            box_count INT NOT NULL,
+            max_conf FLOAT NOT NULL,
+            PRIMARY KEY (session, seq),
+            INDEX idx_frame_time (captured_at)
+        ) DEFAULT CHARSET=utf8mb4""",
+        """CREATE TABLE IF NOT EXISTS detection (
+            session CHAR(32) NOT NULL,
+            seq INT NOT NULL,
+            captured_at DOUBLE NOT NULL,
+            class_name VARCHAR(64) NOT NULL,
+            conf FLOAT NOT NULL,
+            x1 FLOAT NOT NULL,
+            y1 FLOAT NOT NULL,
+            x2 FLOAT NOT NULL,
+            y2 FLOAT NOT NULL,
+            INDEX idx_detection_frame (session, seq),
+            INDEX idx_detection_class (class_name, captured_at)
+        ) DEFAULT CHARSET=utf8mb4""",
+    ],
+    "sqlite": [
+        """CREATE TABLE IF NOT EXISTS detection_frame (
+            session CHAR(32) NOT NULL,
+            seq INTEGER NOT NULL,
+            source VARCHAR(512) NOT NULL,
+            frame_index INTEGER,
+            captured_at DOUBLE NOT NULL,
+            mode VARCHAR(16) NOT NULL,
+            box_count INTEGER NOT NULL,
+            max_conf FLOAT NOT NULL,
+            PRIMARY KEY (session, seq)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_frame_time ON detection_frame (captured_at)",
+        """CREATE TABLE IF NOT EXISTS detection (
+            session CHAR(32) NOT NULL,
+            seq INTEGER NOT NULL,
+            captured_at DOUBLE NOT NULL,
+            class_name VARCHAR(64) NOT NULL,
+            conf FLOAT NOT NULL,
+            x1 FLOAT NOT NULL,
+            y1 FLOAT NOT NULL,
+            x2 FLOAT NOT NULL,
+            y2 FLOAT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_detection_frame ON detection (session, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_detection_class ON detection (class_name, captured_at)",
+    ],
+}
+_INSERT_FRAME = ("INSERT INTO detection_frame (session, seq, source, frame_index, captured_at, mode, box_count, max_conf) "
+                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)")
+_INSERT_DETECTION = ("INSERT INTO detection (session, seq, captured_at, class_name, conf, x1, y1, x2, y2) "
+                     "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)")
+
+
+def connect_mysql(config=None, connect_timeout=10):
+    """连接 detection_system（MySQL/MariaDB）"""
+    import pymysql  # 第一次连接时才导入（程序启动、用SQLite时都不用加载）
+
+    return pymysql.connect(**(config or DB_CONFIG), connect_timeout=connect_timeout)
+
+
+def connect_sqlite(path):
+    """SQLite代替MySQL（本地测试用）"""
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+def database_target(spec=None):
+    """按 "mysql" / "sqlite:路径" 返回 (连接函数, 方言)"""
+    spec = spec or DETECTION_DB
+    if spec.startswith("sqlite:"):
+        path = spec[len("sqlite:"):]
+        return (lambda: connect_sqlite(path)), "sqlite"
+    return connect_mysql, "mysql"
+
+
+class ConnectionPool:
+    """线程安全的数据库连接池（取连接时做健康检查，断开的连接自动重建）"""
+
+    def __init__(self, connect, size=POOL_SIZE, health_check_seconds=HEALTH_CHECK_SECONDS):
+        self.connect = connect
+        self.size = size
+        self.health_check_seconds = health_check_seconds
+        self._idle = deque()  # (连接, 放回时间)
+        self._opened = 0  # 已打开（空闲+借出）的连接数
+        self._cond = threading.Condition()
+        self.created = 0  # 新建连接次数
+        self.reconnects = 0  # 健康检查失败后重建的次数
+        self.last_error = ""
+
+    def _open(self):
+        try:
+            conn = self.connect()
+        except Exception as e:
+            self.last_error = str(e)
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+        self.created += 1
+        return conn
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """借一个连接（池满时最多等timeout秒，超时抛TimeoutError；连不上数据库时抛出连接异常）"""
+        with self._cond:
+            while not self._idle and self._opened >= self.size:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("数据库连接池已满，等待超时")
+            if self._idle:
+                conn, released_at = self._idle.pop()
+            else:
+                conn, released_at = None, None
+                self._opened += 1
+        if conn is None:
+            return self._open()
+        if time.monotonic() - released_at > self.health_check_seconds and not self._healthy(conn):
+            # 空闲太久被服务器断开（或网络中断过）：丢弃重连
+            self._discard(conn)
+            self.reconnects += 1
+            return self._open()
+        return conn
+
+    def release(self, conn, broken=False):
+        """归还连接；broken=True（执行出错）时直接关闭，不放回池里"""
+        if not broken:
+            try:
+                conn.rollback()  # 不把未结束的事务（和其中的读快照）留给下一个使用者
+            except Exception:
+                broken = True
+        with self._cond:
+            if broken:
+                self._opened -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if broken:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """with pool.connection() as conn：用完自动归还，出异常时丢弃该连接"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        self.release(conn)
+
+    def prewarm(self, count=1):
+        """后台线程预先建好count个连接（连不上时只记录错误，等真正使用时再报）"""
+        def warm():
+            conns = []
+            try:
+                for _ in range(count):
+                    conns.append(self.acquire(timeout=0))
+            except Exception:
+                pass
+            for conn in conns:
+                self.release(conn)
+        with self._cond:
+            if len(self._idle) >= count:
+                return None
+        thread = threading.Thread(target=warm, name="db-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._opened -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def summary(self):
+        return f"连接池：打开{self._opened}/{self.size}个，新建{self.created}次，断线重连{self.reconnects}次"
+
+
+def get_pool(spec=None):
+    """进程级共享的连接池，每个数据库一个（spec为 "mysql" / "sqlite:路径"，默认取 DETECTION_DB）"""
+    spec = spec or DETECTION_DB
+    with _pool_lock:
+        pool = _pools.get(spec)
+        if pool is None:
+            connect, _ = database_target(spec)
+            pool = _pools[spec] = ConnectionPool(connect)
+        return pool
+
+
+class DetectionWriter:
+    """检测结果后台批量写库（submit不阻塞；数据库慢或断开时溢出到本地文件，恢复后补写）"""
+
+    def __init__(self, pool, dialect="mysql", batch_size=200, flush_seconds=1.0, max_queue=5000,
+                 spill_file=SPILL_FILE, retry_seconds=5.0):
+        self.pool = pool  # 写线程从连接池借一个连接长期使用
+        self.dialect = dialect
+        self.batch_size = batch_size  # 每批最多多少帧
+        self.flush_seconds = flush_seconds  # 不满一批时最长等待多久写一次
+        self.spill_file = spill_file
+        self.retry_seconds = retry_seconds  # 数据库不可用时多久重试一次
+        self.session = uuid.uuid4().hex  # 本次运行的会话号（和帧序号一起作为帧的主键）
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._conn = None
+        self._schema_ready = False
+        self._retry_at = 0.0
+        self._stop = threading.Event()
+        self.written = 0  # 已写入数据库的帧数
+        self.spilled = 0  # 写入溢出文件的帧数
+        self.replayed = 0  # 从溢出文件补写入库的帧数
+        self.last_error = ""
+        self._thread = threading.Thread(target=self._run, name="detection-writer", daemon=True)
+        self._thread.start()
+
+    def _sql(self, sql):
+        return sql.replace("%s", "?") if self.dialect == "sqlite" else sql
+
+    @property
+    def backlog(self):
+        """队列里等待写入的帧数"""
+        return self._queue.qsize()
+
+    def submit(self, source, mode, captured_at, frame_index, xyxy, conf, class_names):
+        """提交一帧的检测结果（任意线程，不阻塞；队列满时直接追加到溢出文件）"""
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+        boxes = [(name, float(c), *map(float, box)) for name, c, box in zip(class_names, conf, xyxy)]
+        item = (self.session, seq, str(source), frame_index, float(captured_at), mode,
+                len(boxes), max((box[1] for box in boxes), default=0.0), boxes)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._spill([item])
+
+    # -------------------- 写线程 --------------------
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._take_batch()
+            if batch:
+                self._write_or_spill(batch)
+            elif not self._stop.is_set():
+                self._replay_spill()
+        self._close_connection()
+
+    def _take_batch(self):
+        """取一批：先阻塞等第一帧，再在flush_seconds内尽量凑满batch_size"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_or_spill(self, batch):
+        if self._write(batch):
+            self.written += len(batch)
+        else:
+            self._spill(batch)
+
+    def _connection(self):
+        """写线程借用的连接（出错后按retry_seconds间隔重新借，借不到返回None）"""
+        if self._conn is not None:
+            return self._conn
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            conn = self.pool.acquire(timeout=self.retry_seconds)
+        except Exception as e:
+            self.last_error = str(e)
+            self._retry_at = time.monotonic() + self.retry_seconds
+            return None
+        self._conn = conn
+        if not self._schema_ready:
+            try:
+                cursor = conn.cursor()
+                for statement in _SCHEMA[self.dialect]:
+                    cursor.execute(statement)
+                conn.commit()
+                cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                self.last_error = str(e)
+                self._close_connection(broken=True)
+                self._retry_at = time.monotonic() + self.retry_seconds
+        return self._conn
+
+    def _close_connection(self, broken=False):
+        """把连接还给连接池（出错的连接由池关闭）"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self.pool.release(conn, broken=broken)
+
+    def _write(self, batch):
+        """一批帧用两条executemany在一个事务里写入，失败返回False"""
+        conn = self._connection()
+        if conn is None:
+            return False
+        frames = [item[:8] for item in batch]
+        detections = [(item[0], item[1], item[4], *box) for item in batch for box in item[8]]
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(self._sql(_INSERT_FRAME), frames)
+            if detections:
+                cursor.executemany(self._sql(_INSERT_DETECTION), detections)
+            conn.commit()
+            cursor.close()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self._close_connection(broken=True)  # 下次重新借连接
+            self._retry_at = time.monotonic() + self.retry_seconds
+            return False
+
+    # -------------------- 溢出文件 --------------------
+    def _spill(self, items):
+        """写不进数据库/队列的帧追加到溢出文件（每行一帧JSON）"""
+        with self._spill_lock:
+            with open(self.spill_file, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            self.spilled += len(items)
+
+    def _replay_spill(self):
+        """空闲且数据库可用时，把溢出文件里的帧补写入库"""
+        if not os.path.exists(self.spill_file) or self._connection() is None:
+            return
+        replay_file = self.spill_file + ".replay"
+        with self._spill_lock:
+            if not os.path.exists(replay_file):
+                os.replace(self.spill_file, replay_file)
+        with open(replay_file, encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        for start in range(0, len(items), self.batch_size):
+            batch = [tuple(item[:8]) + ([tuple(box) for box in item[8]],) for item in items[start:start + self.batch_size]]
+            if not self._write(batch):
+                # 数据库又断开：没写进去的放回溢出文件
+                self._spill(items[start:])
+                break
+            self.replayed += len(batch)
+        os.remove(replay_file)
+
+    def close(self, timeout=10.0):
+        """停止写线程：队列里剩余的帧写入数据库（写不进去的落到溢出文件）"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def summary(self):
+        text = f"写入{self.written}帧，溢出到本地文件{self.spilled}帧，补写{self.replayed}帧，待写{self.backlog}帧"
+        return text + (f"（最近错误：{self.last_error}）" if self.last_error else "")
+
+
+def open_detection_writer(spec=None, **kwargs):
+    """按 DETECTION_DB（mysql 或 sqlite:路径）创建检测结果写入器"""
+    _, dialect = database_target(spec)
+    return DetectionWriter(get_pool(spec), dialect, **kwargs)
+
+
+def get_detection_writer():
+    """进程级共享的检测结果写入器（重建主窗口不会再开一个写线程和溢出文件）"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = open_detection_writer()
+        return _writer
+
+
+def close_detection_writer(timeout=10.0):
+    """退出程序前调用：写完剩余结果"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
+    return writer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检测结果批量入库测试（写入模拟检测结果）")
+    parser.add_argument("--db", default=DETECTION_DB, help="mysql 或 sqlite:路径（默认取环境变量DETECTION_DB）")
+    parser.add_argument("--frames", type=int, default=10000, help="模拟的检测帧数")
+    parser.add_argument("--boxes", type=int, default=3, help="每帧检测框数")
+    args = parser.parse_args()
+
+    writer = open_detection_writer(args.db)
+    start = time.perf_counter()
+    slowest = 0.0
+    for i in range(args.frames):
+        t = time.perf_counter()
+        writer.submit("测试视频.mp4", "live", time.time(), i, [(10, 20, 110, 220)] * args.boxes,
+                      [0.8] * args.boxes, ["person"] * args.boxes)
+        slowest = max(slowest, time.perf_counter() - t)
+    submitted = time.perf_counter() - start
+    writer.close(timeout=60)
+    print(f"提交{args.frames}帧耗时{submitted:.2f}秒（单次最长{slowest * 1000:.2f}ms），"
+          f"全部写完{time.perf_counter() - start:.2f}秒")
+    print(writer.summary())
@@ -0,0 +1,324 @@
+"""
+视频解码层：解码时直接缩放到目标分辨率（多线程解码），需要时才输出原图分辨率
+
+4K录像逐帧解码成原图再 cv2.resize 到界面标签（约520×400），模型又会缩到640，
+大部分像素解码出来就被丢掉了。这里在解码器内部完成缩放和像素格式转换：
+- pyav：PyAV（libavcodec多线程解码 + swscale缩放，直接输出BGR）
+- ffmpeg：ffmpeg子进程管道（-threads + scale滤镜，输出rawvideo BGR）
+- opencv：cv2.VideoCapture（多线程解码）+ cv2.resize（没有前两者时的兜底）
+
+默认输出长边不超过 DECODE_MAX_SIDE（1280，是模型输入640的2倍，级联复检/区域裁剪仍有细节）。
+区域裁剪这类需要原图像素的环节调用 request_full_resolution(True)，之后解码的帧恢复原图分辨率。
+
+接口与 cv2.VideoCapture 一致（isOpened/read/get/release），可以直接交给 CaptureThread：
+    decoder = open_video("4K录像.mp4")
+    ret, frame = decoder.read()        # 长边1280的BGR帧
+    decoder.scale                      # 输出/原图 的缩放比例（坐标换算回原图用）
+选择解码后端：环境变量 VIDEO_DECODER（pyav / ffmpeg / opencv，默认按此顺序自动选择）
+"""
+import os
+import shutil
+import subprocess
+import threading
+
+import cv2
+import numpy as np
+
+DECODERS = ("pyav", "ffmpeg", "opencv")
+DEFAULT_DECODER = os.environ.get("VIDEO_DECODER")
+DECODE_MAX_SIDE = 1280
+
+
+def fit_size(width, height, max_side=DECODE_MAX_SIDE):
+    """等比缩放到长边不超过max_side（宽高取偶数，YUV420缩放要求），不放大"""
+    if not max_side or max(width, height) <= max_side:
+        return int(width), int(height)
+    ratio = max_side / max(width, height)
+    return max(2, int(width * ratio) // 2 * 2), max(2, int(height * ratio) // 2 * 2)
+
+
+def available_decoders():
+    """当前环境可用的解码后端（按优先级）"""
+    found = []
+    try:
+        import av  # noqa: F401
+        found.append("pyav")
+    except ImportError:
+        pass
+    if shutil.which("ffmpeg"):
+        found.append("ffmpeg")
+    found.append("opencv")
+    return found
+
+
+def _probe(path):
+    """用OpenCV读取视频基本信息 (宽, 高, 帧率, 总帧数)，打不开返回None"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+    try:
+        if not cap.isOpened():
+            return None
+        return (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    finally:
+        cap.release()
+
+
+class VideoDecoder:
+    """解码器基类：统一 cv2.VideoCapture 风格的接口和输出分辨率切换"""
+    name = ""
+
+    def __init__(self, path, max_side=DECODE_MAX_SIDE, threads=0):
+        self.path = path
+        self.max_side = max_side
+        self.threads = threads  # 解码线程数，0表示自动（按CPU核数）
+        self.source_size = (0, 0)  # 原图 (宽, 高)
+        self.fps = 0.0
+        self.frame_count = 0  # 探测/估算的总帧数（PyAV按时长×帧率估算，可能与实际不符）
+        self.position = 0  # 已解码帧数
+        self.eof = False  # 已读到文件结尾（解码器自己知道，不依赖估算的总帧数）
+        self.pos_msec = 0.0
+        self._full_resolution = False
+        self._want_full_resolution = False
+        self._lock = threading.Lock()
+
+    # -------------------- 输出分辨率 --------------------
+    @property
+    def full_resolution(self):
+        return self._full_resolution
+
+    def request_full_resolution(self, enabled=True):
+        """请求原图分辨率（可在任意线程调用，下一帧生效）"""
+        self._want_full_resolution = bool(enabled)
+
+    @property
+    def output_size(self):
+        if self._full_resolution:
+            return self.source_size
+        return fit_size(*self.source_size, self.max_side)
+
+    @property
+    def scale(self):
+        """输出帧相对原图的缩放比例（<=1）"""
+        return self.output_size[0] / self.source_size[0] if self.source_size[0] else 1.0
+
+    def describe(self):
+        (sw, sh), (ow, oh) = self.source_size, self.output_size
+        return f"{self.name}解码 {sw}×{sh}" + (f"→{ow}×{oh}" if (ow, oh) != (sw, sh) else "")
+
+    # -------------------- cv2.VideoCapture 兼容接口 --------------------
+    def read(self):
+        with self._lock:
+            if self._want_full_resolution != self._full_resolution:
+                self._full_resolution = self._want_full_resolution
+                self._on_resize()
+            frame = self._read_frame()
+            if frame is None:
+                self.eof = True  # 本地文件读不出帧即结尾（PyAV读完/ffmpeg管道读尽/OpenCV读取失败）
+                return False, None
+            self.position += 1
+            return True, frame
+
+    def get(self, prop):
+        values = {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_COUNT: self.frame_count,
+            cv2.CAP_PROP_POS_FRAMES: self.position,
+            cv2.CAP_PROP_POS_MSEC: self.pos_msec,
+            cv2.CAP_PROP_FRAME_WIDTH: self.output_size[0],
+            cv2.CAP_PROP_FRAME_HEIGHT: self.output_size[1],
+        }
+        return float(values.get(prop, 0.0))
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def _read_frame(self):
+        raise NotImplementedError
+
+    def _on_resize(self):
+        """输出分辨率切换（子类按需重建缩放器/管道）"""
+
+
+class PyAVDecoder(VideoDecoder):
+    """PyAV解码：多线程解码，swscale一步完成缩放和YUV→BGR"""
+    name = "pyav"
+
+    def __init__(self, path, max_side=DECODE_MAX_SIDE, threads=0):
+        super().__init__(path, max_side, threads)
+        import av
+
+        self._container = av.open(path)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"  # 帧级+片级多线程
+        self._stream.codec_context.thread_count = threads
+        self._frames = self._container.decode(self._stream)
+        self.source_size = (self._stream.codec_context.width, self._stream.codec_context.height)
+        rate = self._stream.average_rate or self._stream.guessed_rate
+        self.fps = float(rate) if rate else 0.0
+        self.frame_count = self._stream.frames or (
+            int(float(self._stream.duration * self._stream.time_base) * self.fps) if self._stream.duration else 0)
+
+    def isOpened(self):
+        return self._container is not None
+
+    def _read_frame(self):
+        if self._container is None:
+            return None
+        try:
+            frame = next(self._frames)
+        except Exception:  # 读完（StopIteration）或文件损坏解码出错，都按视频结束处理
+            return None
+        if frame.time is not None:
+            self.pos_msec = frame.time * 1000.0
+        width, height = self.output_size
+        return frame.reformat(width=width, height=height, format="bgr24", interpolation="AREA").to_ndarray()
+
+    def release(self):
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+
+
+class FFmpegPipeDecoder(VideoDecoder):
+    """ffmpeg子进程解码：scale滤镜缩放后以rawvideo BGR从管道读出"""
+    name = "ffmpeg"
+
+    def __init__(self, path, max_side=DECODE_MAX_SIDE, threads=0, info=None):
+        super().__init__(path, max_side, threads)
+        info = info or _probe(path)
+        if info is None:
+            raise IOError(f"无法打开视频：{os.path.basename(path)}")
+        width, height, self.fps, self.frame_count = info
+        self.source_size = (width, height)
+        self._process = None
+        self._start(0.0)
+
+    def _start(self, start_seconds):
+        width, height = self.output_size
+        command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-threads", str(self.threads)]
+        if start_seconds > 0:
+            command += ["-ss", f"{start_seconds:.3f}"]
+        command += ["-i", self.path, "-an", "-sn", "-vf", f"scale={width}:{height}:flags=area",
+                    "-pix_fmt", "bgr24", "-f", "rawvideo", "-"]
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=width * height * 3 * 2)
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.stdout.close()
+            self._process.wait()
+            self._process = None
+
+    def _on_resize(self):
+        # 管道输出尺寸固定，从当前位置重启ffmpeg
+        self._stop()
+        self._start(self.position / self.fps if self.fps else 0.0)
+
+    def isOpened(self):
+        return self._process is not None
+
+    def _read_frame(self):
+        if self._process is None:
+            return None
+        width, height = self.output_size
+        size = width * height * 3
+        data = self._process.stdout.read(size)
+        if len(data) < size:
+            return None
+        if self.fps:
+            self.pos_msec = (self.position + 1) / self.fps * 1000.0
+        return np.frombuffer(data, np.uint8).reshape(height, width, 3).copy()
+
+    def release(self):
+        self._stop()
+
+
+class OpenCVDecoder(VideoDecoder):
+    """OpenCV解码（多线程）+ INTER_AREA缩放：解码量不变，但后续显示/推理只搬运小图"""
+    name = "opencv"
+
+    def __init__(self, path, max_side=DECODE_MAX_SIDE, threads=0):
+        super().__init__(path, max_side, threads)
+        params = [cv2.CAP_PROP_N_THREADS, threads] if threads else []
+        self._cap = cv2.VideoCapture(path, cv2.CAP_ANY, params)
+        if not self._cap.isOpened():
+            self._cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, params)
+        self.source_size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def _read_frame(self):
+        ret, frame = self._cap.read()
+        if not ret:
+            return None
+        self.pos_msec = self._cap.get(cv2.CAP_PROP_POS_MSEC)
+        size = self.output_size
+        if size != (frame.shape[1], frame.shape[0]):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def release(self):
+        self._cap.release()
+
+
+_DECODER_CLASSES = {"pyav": PyAVDecoder, "ffmpeg": FFmpegPipeDecoder, "opencv": OpenCVDecoder}
+
+
+def open_video(path, max_side=DECODE_MAX_SIDE, threads=0, decoder=None):
+    """
+    打开视频文件，返回解码器（打不开返回None）
+    decoder 为空时用环境变量 VIDEO_DECODER，再为空按 pyav → ffmpeg → opencv 自动选择；
+    某个后端打开失败会自动尝试下一个
+    """
+    preferred = decoder or DEFAULT_DECODER
+    if preferred and preferred not in DECODERS:
+        raise ValueError(f"不支持的解码后端：{preferred}（可选：{', '.join(DECODERS)}）")
+    candidates = available_decoders()
+    if preferred in candidates:
+        candidates.remove(preferred)
+        candidates.insert(0, preferred)
+    for name in candidates:
+        try:
+            video = _DECODER_CLASSES[name](path, max_side, threads)
+        except Exception as e:
+            print(f"⚠️ {name}解码器无法打开视频，尝试下一个：{e}")
+            continue
+        if video.isOpened() and video.source_size[0] > 0:
+            return video
+        video.release()
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="解码测速：各解码后端在原图/缩放输出下的帧率")
+    parser.add_argument("video", help="视频文件路径")
+    parser.add_argument("--max-side", type=int, default=DECODE_MAX_SIDE, help="输出长边（默认1280）")
+    parser.add_argument("--frames", type=int, default=300, help="每项测试解码的帧数")
+    args = parser.parse_args()
+
+    for name in available_decoders():
+        for full in (True, False):
+            video = open_video(args.video, args.max_side, decoder=name)
+            if video is None or video.name != name:
+                print(f"{name:>7}：无法打开")
+                break
+            video.request_full_resolution(full)
+            start = time.perf_counter()
+            count = 0
+            while count < args.frames and video.read()[0]:
+                count += 1
+            elapsed = time.perf_counter() - start
+            print(f"{name:>7} {'原图' if full else '缩放'}：{video.describe()}，{count / elapsed:7.1f} 帧/秒")
+            video.release()
@@ -0,0 +1,250 @@
+"""
+视频检测结果缓存：同一段录像再次打开时直接用缓存的检测框，不再逐帧跑模型
+
+复核时同一段证据录像经常要反复打开，每次都重新推理全部帧。这里把每帧的检测框存进
+SQLite（detection_cache.sqlite3），按以下内容区分一份缓存：
+- 视频内容指纹：文件大小 + 开头/中间/结尾各一块数据的SHA256（与路径无关，改名/挪目录仍命中；
+  几GB的录像不必整个读一遍）
+- 模型内容哈希（模型注册表按权重文件内容计算的哈希）
+- 检测参数：类别过滤、置信度阈值，以及其它影响结果的参数（入侵区域、级联粗检尺寸等）
+检测框按帧宽高归一化保存，解码分辨率变化（例如画了区域后改为原图解码）不影响命中。
+播放时只缓存实际检测过的帧（跳帧外推的帧不缓存），停止播放后由后台批量分析补齐其余帧，
+所有帧都有结果后标记为完整。
+缓存总大小超过上限（默认256MB，环境变量 DETECTION_CACHE_MB）时，按最近使用时间淘汰最久未用的视频。
+
+用法：
+    cache = DetectionCache()
+    video = cache.open("录像.mp4", model, classes=[0], conf=0.3)   # 没有模型哈希时返回None
+    cached = video.get(frame_index, frame.shape)                    # (xyxy, conf, cls) 或 None
+    video.put(frame_index, frame.shape, xyxy, conf, cls)            # 推理后写入
+    video.close()                                                   # 写入剩余结果
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from model_registry import file_sha256
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detection_cache.sqlite3")
+MAX_CACHE_MB = float(os.environ.get("DETECTION_CACHE_MB", 256))
+FINGERPRINT_BLOCK = 1 << 20  # 内容指纹每块读取的字节数
+FLUSH_EVERY = 100  # 攒够多少帧写一次数据库
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    key TEXT PRIMARY KEY,
+    video TEXT NOT NULL,
+    frame_count INTEGER NOT NULL,
+    stored INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    key TEXT NOT NULL,
+    frame INTEGER NOT NULL,
+    boxes BLOB NOT NULL,
+    PRIMARY KEY (key, frame)
+) WITHOUT ROWID;
+"""
+
+
+def video_fingerprint(path, block=FINGERPRINT_BLOCK):
+    """视频内容指纹：文件大小 + 开头/中间/结尾各block字节的SHA256"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= block * 3:
+            digest.update(f.read())
+        else:
+            for offset in (0, (size - block) // 2, size - block):
+                f.seek(offset)
+                digest.update(f.read(block))
+    return digest.hexdigest()
+
+
+def model_fingerprint(model):
+    """模型内容哈希：注册表句柄直接用其内容哈希，其它模型按权重文件计算；取不到时返回None"""
+    key = getattr(model, "key", None)
+    if key is not None and len(key) > 1 and key[1] != "pending-download":
+        return key[1]
+    weights = getattr(model, "ckpt_path", None) or getattr(model, "weights", None)
+    if weights and os.path.isfile(str(weights)):
+        return file_sha256(str(weights))
+    return None
+
+
+def encode_boxes(frame_shape, xyxy, conf, cls):
+    """检测框编码为float32数组（每行 x1 y1 x2 y2 归一化坐标, 置信度, 类别号）"""
+    height, width = frame_shape[:2]
+    rows = np.empty((len(conf), 6), dtype=np.float32)
+    rows[:, :4] = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4) / (width, height, width, height)
+    rows[:, 4] = conf
+    rows[:, 5] = cls
+    return rows.tobytes()
+
+
+def decode_boxes(frame_shape, blob):
+    """编码的检测框还原为当前帧尺寸下的 (xyxy, conf, cls)"""
+    height, width = frame_shape[:2]
+    rows = np.frombuffer(blob, dtype=np.float32).reshape(-1, 6)
+    xyxy = rows[:, :4] * (width, height, width, height)
+    return xyxy, rows[:, 4].copy(), rows[:, 5].astype(int)
+
+
+class CachedVideo:
+    """一个（视频, 模型, 参数）组合的逐帧检测结果；get/put可在推理线程调用"""
+
+    def __init__(self, cache, key, frame_count, frames):
+        self.cache = cache
+        self.key = key
+        self.frame_count = frame_count  # 视频总帧数（0=未知）
+        self._frames = frames  # 帧号 -> 编码后的检测框（打开时一次性读入内存）
+        self._pending = []  # 还没写入数据库的 (帧号, 编码)
+        self._lock = threading.Lock()
+        self.hits = 0  # 命中缓存的帧数
+        self.stored = 0  # 本次新写入的帧数
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def complete(self):
+        """所有帧都有检测结果"""
+        return self.frame_count > 0 and len(self._frames) >= self.frame_count
+
+    def cached_frames(self):
+        """已有检测结果的帧号集合"""
+        with self._lock:
+            return set(self._frames)
+
+    def set_frame_count(self, frame_count):
+        """按实际解码到的帧数更正总帧数（探测的帧数只是估计，可能偏多）"""
+        self.frame_count = frame_count
+        self.cache._set_frame_count(self.key, frame_count)
+
+    def get(self, index, frame_shape):
+        """取一帧的检测结果 (xyxy, conf, cls)，没有缓存返回None"""
+        blob = self._frames.get(index)
+        if blob is None:
+            return None
+        self.hits += 1
+        return decode_boxes(frame_shape, blob)
+
+    def put(self, index, frame_shape, xyxy, conf, cls):
+        """写入一帧的检测结果（攒够一批再写数据库）"""
+        if index is None or index < 0:
+            return
+        blob = encode_boxes(frame_shape, xyxy, conf, cls)
+        with self._lock:
+            if index in self._frames:
+                return
+            self._frames[index] = blob
+            self._pending.append((self.key, index, blob))
+            self.stored += 1
+            flush = len(self._pending) >= FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self.cache._store(self.key, pending)
+
+    def close(self):
+        """写入剩余结果，超出大小上限时淘汰最久未用的视频"""
+        self.flush()
+        self.cache.evict(keep=self.key)
+
+    def summary(self):
+        total = f"/{self.frame_count}" if self.frame_count else ""
+        return f"命中{self.hits}帧，新写入{self.stored}帧，已缓存{len(self._frames)}{total}帧"
+
+
+class DetectionCache:
+    """检测结果缓存库（SQLite，线程安全）"""
+
+    def __init__(self, path=CACHE_FILE, max_mb=MAX_CACHE_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._fingerprints = {}  # (路径, 大小, 修改时间) -> 内容指纹
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def _video_fingerprint(self, path):
+        stat = os.stat(path)
+        cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        if cache_key not in self._fingerprints:
+            self._fingerprints[cache_key] = video_fingerprint(path)
+        return self._fingerprints[cache_key]
+
+    def open(self, video_path, model, frame_count=0, **params):
+        """
+        打开一段视频的检测缓存；params为影响检测结果的参数（classes、conf、区域等）
+        取不到模型哈希或读不了视频文件时返回None（不使用缓存）
+        """
+        model_hash = model_fingerprint(model)
+        if model_hash is None or not os.path.isfile(video_path):
+            return None
+        video_hash = self._video_fingerprint(video_path)
+        digest = hashlib.sha256(json.dumps([video_hash, model_hash, params], sort_keys=True).encode())
+        key = digest.hexdigest()
+        with self._lock:
+            row = self._conn.execute("SELECT frame_count FROM videos WHERE key = ?", (key,)).fetchone()
+            # 记录过的帧数优先（可能已按实际解码帧数更正过），没有时用探测到的帧数
+            frame_count = row[0] if row and row[0] else int(frame_count or 0)
+            self._conn.execute(
+                "INSERT INTO videos (key, video, frame_count, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET frame_count = excluded.frame_count, last_used = excluded.last_used",
+                (key, os.path.basename(video_path), frame_count, time.time()))
+            self._conn.commit()
+            frames = dict(self._conn.execute("SELECT frame, boxes FROM frames WHERE key = ?", (key,)))
+        return CachedVideo(self, key, frame_count, frames)
+
+    def _store(self, key, rows):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO frames (key, frame, boxes) VALUES (?, ?, ?)", rows)
+            self._conn.execute(
+                "UPDATE videos SET stored = (SELECT COUNT(*) FROM frames WHERE key = ?), "
+                "bytes = (SELECT COALESCE(SUM(LENGTH(boxes)), 0) + COUNT(*) * 16 FROM frames WHERE key = ?), "
+                "last_used = ? WHERE key = ?", (key, key, time.time(), key))
+            self._conn.commit()
+
+    def _set_frame_count(self, key, frame_count):
+        with self._lock:
+            self._conn.execute("UPDATE videos SET frame_count = ? WHERE key = ?", (frame_count, key))
+            self._conn.commit()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM videos").fetchone()[0]
+
+    def evict(self, keep=None):
+        """总大小超过上限时按最近使用时间淘汰（keep：正在使用的缓存不淘汰），返回淘汰的视频数"""
+        evicted = 0
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM videos").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            rows = self._conn.execute("SELECT key, bytes FROM videos ORDER BY last_used").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                self._conn.execute("DELETE FROM frames WHERE key = ?", (key,))
+                self._conn.execute("DELETE FROM videos WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+            self._conn.commit()
+        return evicted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
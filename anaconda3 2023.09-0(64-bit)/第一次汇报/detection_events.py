@@ -0,0 +1,151 @@
+"""
+检测事件：把逐帧的检测类别变成去抖动的"进入/离开"事件
+
+原来每一帧有检测结果就输出一条"检测到：xxx"，一个人在画面里站一分钟就是上千条消息，
+报警和入库都没法直接用。DetectionEventEngine 按类别跟踪目标是否在场：
+- 进入：某类别连续出现达到最短持续时间（可按类别设置）才算进入，一闪而过的误检不产生事件
+- 迟滞：未在场时置信度要达到 enter_conf 才算出现，在场后只要不低于 stay_conf 就算仍在
+  （置信度在阈值附近抖动时不会反复进入/离开）
+- 离开：在场的类别超过 exit_seconds 没再出现才算离开（漏检几帧、跳帧检测都不会误判离开）
+每个事件带开始/结束时间、最高置信度和出现的检测帧数，通过Qt信号 event_signal 和回调函数发出。
+
+用法：
+    engine = DetectionEventEngine(min_seconds=0.5, class_min_seconds={"person": 1.0})
+    engine.event_signal.connect(self.handle_detection_event)   # 主线程接收（跨线程自动排队）
+    engine.add_callback(lambda event: save_event(event))        # 在调用update的线程里直接调用
+    engine.update({"person": 0.82, "dog": 0.41})                # 每个检测帧调用一次（类别 -> 最高置信度）
+    engine.flush()                                              # 停止检测时结束所有在场的目标
+"""
+import threading
+import time
+from collections import namedtuple
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+ENTER = "enter"
+EXIT = "exit"
+
+
+class DetectionEvent(namedtuple("DetectionEvent", "kind label start end peak_conf frames")):
+    """
+    检测事件：kind为 enter/exit，start/end为时间戳（进入事件end为None），
+    peak_conf为到目前为止的最高置信度，frames为出现的检测帧数
+    """
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else self.start) - self.start
+
+    def describe(self):
+        if self.kind == ENTER:
+            return f"{self.label}进入画面（最高置信度{self.peak_conf:.2f}）"
+        return f"{self.label}离开画面（持续{self.duration:.1f}秒，最高置信度{self.peak_conf:.2f}）"
+
+
+class _Track:
+    """一个类别的在场状态"""
+    __slots__ = ("start", "last_seen", "peak_conf", "frames", "active")
+
+    def __init__(self, timestamp, conf):
+        self.start = timestamp
+        self.last_seen = timestamp
+        self.peak_conf = conf
+        self.frames = 1
+        self.active = False  # 是否已发出进入事件
+
+
+class DetectionEventEngine(QObject):
+    """逐帧类别 → 去抖动的进入/离开事件（update可在任意线程调用，同一时间只应有一个线程调用）"""
+    event_signal = pyqtSignal(DetectionEvent)
+
+    def __init__(self, min_seconds=0.5, class_min_seconds=None, exit_seconds=2.0,
+                 enter_conf=0.4, stay_conf=0.25, parent=None):
+        super().__init__(parent)
+        self.min_seconds = min_seconds  # 默认最短持续时间（秒）
+        self.class_min_seconds = dict(class_min_seconds or {})  # 按类别单独设置的最短持续时间
+        self.exit_seconds = exit_seconds  # 多久没出现算离开（秒）
+        self.enter_conf = enter_conf  # 未在场时算作出现的置信度
+        self.stay_conf = stay_conf  # 在场后算作仍在的置信度（迟滞下限）
+        self._tracks = {}  # 类别 -> _Track
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self.frames = 0  # 处理的检测帧数
+        self.events = 0  # 发出的事件数
+
+    def add_callback(self, callback):
+        """注册回调 callback(event)，在调用update/flush的线程里执行"""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def update(self, class_confs, timestamp=None):
+        """
+        输入一个检测帧的结果：class_confs 为 {类别: 最高置信度}（或 (类别, 置信度) 序列），
+        返回本帧产生的事件列表
+        """
+        now = time.time() if timestamp is None else timestamp
+        peaks = {}
+        for label, conf in (class_confs.items() if isinstance(class_confs, dict) else class_confs):
+            peaks[label] = max(float(conf), peaks.get(label, 0.0))
+        events = []
+        with self._lock:
+            self.frames += 1
+            for label, conf in peaks.items():
+                track = self._tracks.get(label)
+                threshold = self.stay_conf if track is not None and track.active else self.enter_conf
+                if conf < threshold:
+                    continue
+                if track is None:
+                    track = self._tracks[label] = _Track(now, conf)
+                else:
+                    track.last_seen = now
+                    track.peak_conf = max(track.peak_conf, conf)
+                    track.frames += 1
+                if not track.active and now - track.start >= self.class_min_seconds.get(label, self.min_seconds):
+                    track.active = True
+                    events.append(DetectionEvent(ENTER, label, track.start, None, track.peak_conf, track.frames))
+            events.extend(self._expire(now))
+        self._emit(events)
+        return events
+
+    def _expire(self, now):
+        """超过exit_seconds没出现的类别：在场的发离开事件，未达到最短持续时间的直接丢弃"""
+        events = []
+        for label, track in list(self._tracks.items()):
+            if now - track.last_seen > self.exit_seconds:
+                del self._tracks[label]
+                if track.active:
+                    events.append(DetectionEvent(EXIT, label, track.start, track.last_seen, track.peak_conf, track.frames))
+        return events
+
+    def flush(self):
+        """结束所有在场的目标（停止检测时调用），返回发出的离开事件"""
+        with self._lock:
+            events = self._expire(float("inf"))
+        self._emit(events)
+        return events
+
+    def reset(self):
+        """丢弃所有状态（不发事件）"""
+        with self._lock:
+            self._tracks.clear()
+            self.frames = self.events = 0
+
+    @property
+    def active_labels(self):
+        """当前在场的类别"""
+        with self._lock:
+            return [label for label, track in self._tracks.items() if track.active]
+
+    def _emit(self, events):
+        for event in events:
+            self.events += 1
+            self.event_signal.emit(event)
+            for callback in list(self._callbacks):
+                callback(event)
+
+    def summary(self):
+        return f"{self.frames}个检测帧产生{self.events}个事件"
@@ -1,8 +1,8 @@
 from PyQt6.QtWidgets import QApplication, QWidget
-from PyQt6.uic import loadUi
+from ui_build import setup_ui
 class Stats:
     def __init__(self):
-        self.ui = loadUi("D:/qtdesigner/HTTP.ui", QWidget())
+        self.ui = setup_ui(QWidget(), "HTTP.ui")
 if __name__ == "__main__":
     app = QApplication([])
     stats = Stats()
@@ -0,0 +1,197 @@
+"""
+检测日志：合并重复消息、按定时器批量刷到界面、后台线程写滚动日志文件
+
+原来每一帧有检测结果就往日志框 append 一行富文本再滚动到底部，控件内容无限增长，
+值班几个小时后界面越来越卡。LogSink 的做法：
+- post() 任意线程调用，只在锁内追加到有界队列，不等待界面和磁盘（队列满时丢弃并计数）
+- 合并窗口（默认2秒）内重复的同一条消息只显示第一次，窗口结束时补一行"重复N次"
+- 主线程定时器（默认200ms）把积攒的行一次 appendPlainText 到日志面板
+- 日志面板是 QPlainTextEdit，最多保留 MAX_LINES 行（超出后自动删除最早的行）
+- 同样的行交给进程级后台写线程，写入 logs/detection.log（按大小滚动，保留若干个旧文件）
+无论运行多久，内存和界面开销都是固定的。
+
+用法：
+    self.textLog = replace_log_panel(self.ui.textLog)   # 设计器里的QTextBrowser原位替换为日志面板
+    self.log_sink = LogSink(self.textLog, parent=self)
+    self.log_sink.post("🔍 检测到：person")             # 任意线程
+    self.log_sink.close()                                # 关闭窗口时写完剩余日志
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from PyQt6 import QtCore, QtWidgets
+
+LOG_DIR = os.environ.get("DETECTION_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"))
+LOG_FILE_BYTES = 5 * 1024 * 1024  # 单个日志文件大小上限
+LOG_FILE_BACKUPS = 5  # 保留的旧日志文件数
+MAX_LINES = 2000  # 日志面板最多保留的行数
+MAX_PENDING = 5000  # 还没刷到界面的行数上限（界面卡住时不无限积压）
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class LogFileWriter:
+    """后台写日志文件（进程内共用一个线程；队列满时丢弃，不阻塞调用方）"""
+
+    def __init__(self, log_dir=LOG_DIR, max_bytes=LOG_FILE_BYTES, backups=LOG_FILE_BACKUPS, queue_size=10000):
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, "detection.log")
+        self._handler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0  # 队列满被丢弃的行数
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, lines):
+        """提交若干行（不等待磁盘）"""
+        try:
+            self._queue.put_nowait(lines)
+        except queue.Full:
+            self.dropped += len(lines)
+
+    def flush(self, timeout=2.0):
+        """等待已提交的行写完（退出程序前调用）"""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                self._handler.flush()
+                item.set()
+                continue
+            record = logging.LogRecord("detection", logging.INFO, self.path, 0, "\n".join(item), None, None)
+            self._handler.emit(record)
+
+
+def get_log_writer():
+    """进程级共享的日志文件写线程（打不开日志目录时返回None）"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            try:
+                _writer = LogFileWriter()
+            except OSError as e:
+                print(f"日志文件不可用：{str(e)}")
+                return None
+        return _writer
+
+
+def replace_log_panel(widget, max_lines=MAX_LINES):
+    """把设计器里的QTextEdit/QTextBrowser原位替换为限制行数的QPlainTextEdit（对象名、尺寸、样式不变）"""
+    parent = widget.parentWidget()
+    panel = create_log_panel(parent, max_lines)
+    panel.setObjectName(widget.objectName())
+    panel.setSizePolicy(widget.sizePolicy())
+    panel.setMinimumSize(widget.minimumSize())
+    panel.setMaximumSize(widget.maximumSize())
+    panel.setStyleSheet(widget.styleSheet())
+    panel.setPlaceholderText(widget.placeholderText())
+    layout = parent.layout() if parent is not None else None
+    if layout is None or layout.replaceWidget(widget, panel) is None:
+        panel.setGeometry(widget.geometry())
+    widget.hide()
+    widget.deleteLater()
+    panel.show()
+    return panel
+
+
+def create_log_panel(parent=None, max_lines=MAX_LINES):
+    """只读纯文本日志面板，超过max_lines行自动删除最早的行"""
+    panel = QtWidgets.QPlainTextEdit(parent)
+    panel.setReadOnly(True)
+    panel.setMaximumBlockCount(max_lines)
+    panel.setLineWrapMode(QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+    return panel
+
+
+class LogSink(QtCore.QObject):
+    """日志汇集：合并重复消息，定时批量刷到日志面板和日志文件"""
+
+    def __init__(self, panel, coalesce_seconds=2.0, flush_ms=200, writer=None, parent=None):
+        super().__init__(parent)
+        self.panel = panel
+        self.coalesce_seconds = coalesce_seconds
+        self.writer = writer if writer is not None else get_log_writer()
+        self._pending = deque(maxlen=MAX_PENDING)  # (时间, 文字)，等待刷到界面
+        self._recent = {}  # 文字 -> [首次出现时间, 合并窗口内出现次数]
+        self._lock = threading.Lock()
+        self.posted = 0  # 收到的消息数
+        self.coalesced = 0  # 被合并（未单独显示）的消息数
+        self.dropped = 0  # 界面来不及刷、被挤掉的行数
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(flush_ms)
+
+    def post(self, text):
+        """记录一条日志（任意线程，不阻塞）"""
+        now = time.time()
+        with self._lock:
+            self.posted += 1
+            recent = self._recent.get(text)
+            if recent is not None and now - recent[0] < self.coalesce_seconds:
+                recent[1] += 1
+                self.coalesced += 1
+                return
+            if recent is not None and recent[1] > 1:
+                self._append(recent[0], self._repeat_line(text, recent[1]))
+            self._recent[text] = [now, 1]
+            self._append(now, text)
+
+    def _append(self, timestamp, text):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append((timestamp, text))
+
+    def _repeat_line(self, text, count):
+        return f"{text}（{self.coalesce_seconds:g}秒内重复{count - 1}次）"
+
+    def _expire(self, now):
+        """合并窗口已结束的消息：重复过的补一行次数统计"""
+        for text, (first, count) in list(self._recent.items()):
+            if now - first >= self.coalesce_seconds:
+                del self._recent[text]
+                if count > 1:
+                    self._append(first, self._repeat_line(text, count))
+
+    def flush(self):
+        """把积攒的行一次性追加到日志面板并交给写文件线程（主线程）"""
+        with self._lock:
+            self._expire(time.time())
+            pending = list(self._pending)
+            self._pending.clear()
+        if not pending:
+            return
+        lines = [f"[{time.strftime('%H:%M:%S', time.localtime(ts))}] {text}" for ts, text in pending]
+        scrollbar = self.panel.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2  # 用户往上翻看时不强制滚到底
+        self.panel.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+        if self.writer is not None:
+            self.writer.write([f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))} {text}"
+                               for ts, text in pending])
+
+    def close(self):
+        """停止定时器，把剩余日志（包括未结束的合并计数）写完"""
+        self._timer.stop()
+        with self._lock:
+            self._expire(float("inf"))
+        self.flush()
+        if self.writer is not None:
+            self.writer.flush()
+
+    def summary(self):
+        return f"日志{self.posted}条，合并重复{self.coalesced}条，界面来不及显示丢弃{self.dropped}行"
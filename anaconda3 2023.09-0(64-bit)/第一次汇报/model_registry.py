@@ -0,0 +1,198 @@
+"""
+进程级模型注册表：同一份权重在整个进程里只加载一次
+
+按（权重路径, 文件内容哈希, 设备, 推理后端）区分模型，返回共享的模型句柄：
+- 懒加载：第一次推理（或访问names/warmup）时才真正加载
+- 线程安全：同一个句柄的推理调用加锁串行（YOLO的predictor不支持多线程同时调用）
+- 跨窗口常驻：注册表挂在模块上，退出登录、重建主窗口都不会重新加载/预热
+- LRU上限：常驻的不同权重数超过上限时，卸载最久未使用的模型（句柄仍可用，下次调用再加载）
+- 推理后端：pytorch / onnx / onnx-int8 / openvino（见backends.py，默认取环境变量YOLO_BACKEND）
+
+用法：
+    model = get_registry().get("yolov8n.pt")            # 或 .get("yolov8n.pt", backend="onnx")
+    model.warmup()
+    results = model(frame, conf=0.25, verbose=False)
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import backends
+
+# YOLO推理参数会残留在predictor里（上一次传了classes，下一次不传也会沿用），
+# 共享句柄每次调用都显式带上这些参数的默认值，保证不同调用方互不影响
+_STICKY_PREDICT_DEFAULTS = {"classes": None, "imgsz": 640}
+
+
+def _default_loader(weights, device, backend=None, content_hash=None):
+    """默认加载方式：ultralytics YOLO（非pytorch后端先导出/量化并缓存）"""
+    return backends.load_backend_model(weights, device, backend, content_hash)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """计算文件内容的SHA256（分块读取，大文件也不占内存）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelHandle:
+    """共享模型句柄：调用方式和YOLO对象一致 handle(frame, conf=..., classes=...)"""
+
+    def __init__(self, registry, key, weights, device, backend):
+        self.key = key
+        self.weights = weights
+        self.device = device
+        self.backend = backend
+        self._registry = registry
+        self._model = None
+        self._names = None  # 类别名（加载时记下，读取时不等推理锁）
+        self._lock = threading.RLock()  # 加载和推理共用一把锁
+        self.warmed_up = False
+        self.load_count = 0  # 实际加载次数（被LRU卸载后会重新加载）
+
+    @property
+    def model(self):
+        """底层模型对象（未加载时在这里加载）"""
+        with self._lock:
+            if self._model is None:
+                self._model = self._registry.loader(self.weights, self.device,
+                                                    backend=self.backend, content_hash=self.key[1])
+                self._names = self._model.names
+                self.load_count += 1
+                self.warmed_up = False
+            model = self._model
+        self._registry._touch(self)
+        return model
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def names(self):
+        """类别名：加载过一次后直接返回，不用等正在进行的推理（后处理线程读取时不会被推理阻塞）"""
+        names = self._names
+        if names is None:
+            names = self.model.names
+        return names
+
+    def __call__(self, source, **kwargs):
+        for name, value in _STICKY_PREDICT_DEFAULTS.items():
+            kwargs.setdefault(name, value)
+        with self._lock:
+            return self.model(source, **kwargs)
+
+    def warmup(self, imgsz=640):
+        """预热推理（每次加载后只执行一次），返回预热结果"""
+        with self._lock:
+            model = self.model
+            if self.warmed_up:
+                return None
+            import torch
+
+            results = model(torch.zeros((1, 3, imgsz, imgsz)), verbose=False)
+            self.warmed_up = True
+            return results
+
+    def unload(self, wait=True):
+        """
+        释放底层模型（句柄仍然有效，下次调用时重新加载）
+        wait=False时如果模型正在推理就放弃卸载，返回是否卸载成功
+        """
+        if not self._lock.acquire(blocking=wait):
+            return False
+        try:
+            self._model = None
+            self.warmed_up = False
+            return True
+        finally:
+            self._lock.release()
+
+    def __repr__(self):
+        state = "已加载" if self.loaded else "未加载"
+        return f"<ModelHandle {self.weights} ({self.device}, {self.backend}) {state}>"
+
+
+class ModelRegistry:
+    """模型注册表（线程安全）"""
+
+    def __init__(self, max_resident=2, loader=None):
+        self.max_resident = max(1, int(max_resident))  # 最多常驻内存的不同权重数
+        self.loader = loader or _default_loader
+        self._handles = OrderedDict()  # key -> ModelHandle，按最近使用排序
+        self._hash_cache = {}  # (路径, 大小, 修改时间) -> 内容哈希
+        self._lock = threading.RLock()
+
+    def _content_hash(self, weights):
+        """权重文件内容哈希；本地还没有文件（等ultralytics自动下载）时按名称区分"""
+        path = os.path.abspath(weights)
+        if not os.path.isfile(path):
+            return path, "pending-download"
+        stat = os.stat(path)
+        cache_key = (path, stat.st_size, stat.st_mtime)
+        if cache_key not in self._hash_cache:
+            self._hash_cache[cache_key] = file_sha256(path)
+        return path, self._hash_cache[cache_key]
+
+    def get(self, weights, device="cpu", backend=None):
+        """获取共享模型句柄（不会立即加载），backend为空时用默认后端"""
+        backend = backends.check_backend(backend)
+        with self._lock:
+            path, content_hash = self._content_hash(str(weights))
+            key = (path, content_hash, device, backend)
+            handle = self._handles.get(key)
+            if handle is None:
+                for old_key in [k for k in self._handles if k[0] == path and k[2:] == key[2:]]:
+                    old = self._handles.pop(old_key)
+                    if old_key[1] == "pending-download":
+                        # 权重是加载时才下载下来的：沿用原句柄，只更新键
+                        handle = old
+                        handle.key = key
+                    else:
+                        # 权重文件内容变了：旧模型作废（正在推理的调用结束后随句柄一起释放）
+                        old.unload(wait=False)
+                if handle is None:
+                    handle = ModelHandle(self, key, str(weights), device, backend)
+                self._handles[key] = handle
+            self._handles.move_to_end(key)
+            return handle
+
+    def _touch(self, handle):
+        """句柄被使用：移到LRU末尾，超过常驻上限时卸载最久未用的模型"""
+        with self._lock:
+            if handle.key in self._handles:
+                self._handles.move_to_end(handle.key)
+            resident = [h for h in self._handles.values() if h.loaded or h is handle]
+            victims = [h for h in resident[:max(0, len(resident) - self.max_resident)] if h is not handle]
+        # 不等待别的句柄的锁（避免两个推理线程互相等待），正在推理的模型这次不卸载，下次再尝试
+        for old in victims:
+            old.unload(wait=False)
+
+    def handles(self):
+        """当前登记的所有句柄（按最近使用排序）"""
+        with self._lock:
+            return list(self._handles.values())
+
+    def clear(self):
+        """卸载全部模型"""
+        with self._lock:
+            for handle in self._handles.values():
+                handle.unload(wait=False)
+            self._handles.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """进程级共享注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,96 @@
+"""
+运动门控：固定机位的监控画面大部分时间是静止的空场景，没有运动的帧不必送进模型
+
+把帧缩小成灰度缩略图后与背景比较（帧差法：滑动平均背景；或MOG2背景建模），
+变化像素占比超过阈值才认为"有运动"需要推理，否则沿用上一次的检测结果。
+为防止静止目标（如一直站着的人）漏报，距上次推理超过refresh_seconds会强制推理一次。
+
+用法：
+    gate = MotionGate(sensitivity=0.5, refresh_seconds=5)
+    if gate.check(frame):
+        result = 模型检测(frame)
+    else:
+        result = 上一次结果
+    print(gate.saved, gate.saved_ratio)
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """运动门控（帧差法 / MOG2背景建模）"""
+
+    def __init__(self, sensitivity=0.5, refresh_seconds=5.0, method="diff", thumb_width=160,
+                 learning_rate=0.05, clock=time.monotonic):
+        self.method = method  # "diff"=帧差（更快），"mog2"=背景建模（抗光照渐变、树叶晃动更好）
+        self.thumb_width = thumb_width  # 缩略图宽度（越小越快）
+        self.learning_rate = learning_rate  # 背景更新速度
+        self.refresh_seconds = refresh_seconds  # 强制推理间隔（秒），<=0表示不强制
+        self._clock = clock
+        self.set_sensitivity(sensitivity)
+        self.reset()
+
+    def set_sensitivity(self, sensitivity):
+        """
+        灵敏度 0~1：越高越容易触发推理
+        （对应像素变化阈值 40→10、变化面积占比 2%→0.1%）
+        """
+        self.sensitivity = min(1.0, max(0.0, float(sensitivity)))
+        self.pixel_threshold = 40 - 30 * self.sensitivity
+        self.area_threshold = 0.02 - 0.019 * self.sensitivity
+
+    def reset(self):
+        """清空背景和统计（切换视频源时调用）"""
+        self._background = None
+        self._subtractor = None
+        self._last_infer = None
+        self.motion_ratio = 0.0  # 最近一帧的变化像素占比
+        self.frames = 0  # 经过门控的帧数
+        self.inferences = 0  # 放行推理的帧数
+
+    @property
+    def saved(self):
+        """省掉的推理次数"""
+        return self.frames - self.inferences
+
+    @property
+    def saved_ratio(self):
+        return self.saved / self.frames if self.frames else 0.0
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.thumb_width, max(1, int(h * self.thumb_width / w)))
+        thumb = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(thumb, (5, 5), 0)
+
+    def _measure(self, thumb):
+        """变化像素占比（0~1）"""
+        if self.method == "mog2":
+            if self._subtractor is None:
+                self._subtractor = cv2.createBackgroundSubtractorMOG2(history=300, detectShadows=False)
+                self._subtractor.setVarThreshold(self.pixel_threshold ** 2 / 4)
+            mask = self._subtractor.apply(thumb, learningRate=self.learning_rate)
+            return np.count_nonzero(mask) / mask.size
+        if self._background is None or self._background.shape != thumb.shape:
+            self._background = thumb.astype(np.float32)
+            return 1.0
+        diff = cv2.absdiff(thumb, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(thumb, self._background, self.learning_rate)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def check(self, frame):
+        """传入一帧，返回是否需要推理（有运动、首帧或到了强制刷新时间）"""
+        self.frames += 1
+        self.motion_ratio = self._measure(self._thumbnail(frame))
+        now = self._clock()
+        due = self._last_infer is None or (
+            self.refresh_seconds > 0 and now - self._last_infer >= self.refresh_seconds)
+        if due or self.motion_ratio >= self.area_threshold:
+            self._last_infer = now
+            self.inferences += 1
+            return True
+        return False
@@ -0,0 +1,173 @@
+"""
+多模型并行推理：一帧只预处理一次，多个模型同时推理，结果合并后一次画框
+
+原来双模型检测是 模型A(frame) → 模型B(frame) 串行执行，
+每次调用都各自做一遍 letterbox缩放+归一化，画框时还要多复制一份帧。
+这里先把帧 letterbox 成共享的输入张量，用线程池让各模型同时推理
+（PyTorch计算时会释放GIL，两个模型可以真正并行），
+再把检测框映射回原图坐标、合并成一个结果，最后只画一遍框。
+单帧耗时接近较慢的那个模型，而不是两个模型相加。
+指定 low_imgsz（如320）时启用分辨率级联：共享张量按低分辨率生成，
+各模型只对临界置信度的候选区域再做一次全分辨率复检（见cascade.py）。
+
+用法：
+    executor = MultiModelExecutor([
+        ("bag", bag_model, {"classes": [24, 26, 41], "conf": 0.3}),
+        ("helmet", helmet_model, {"conf": 0.3}),
+    ])
+    merged = executor.run(frame)
+    executor.draw(frame, merged)   # 直接在frame上画框
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import torch
+
+from cascade import CascadeDetector
+
+# 各模型的默认框颜色（BGR），同一模型的不同类别可以在 colors 里单独指定
+_DEFAULT_MODEL_COLORS = [(0, 165, 255), (255, 0, 0), (0, 0, 255), (0, 255, 0), (255, 0, 255)]
+
+
+def letterbox(frame, size=640, pad_value=114):
+    """
+    等比缩放到 size×size 以内，两侧用灰色填充成正方形（与YOLO预处理一致，size需为32的整数倍）
+    返回 (处理后的图像, 缩放比例, (左侧填充, 上方填充))
+    """
+    h, w = frame.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = min(size, int(round(w * ratio))), min(size, int(round(h * ratio)))
+    pad_w, pad_h = size - new_w, size - new_h
+    left, top = pad_w // 2, pad_h // 2
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    image = cv2.copyMakeBorder(frame, top, pad_h - top, left, pad_w - left,
+                               cv2.BORDER_CONSTANT, value=(pad_value, pad_value, pad_value))
+    return image, ratio, (left, top)
+
+
+def to_input_tensor(image):
+    """BGR图像 → 模型输入张量（1×3×H×W，RGB，0~1）"""
+    rgb = np.ascontiguousarray(image[:, :, ::-1].transpose(2, 0, 1))
+    return torch.from_numpy(rgb).unsqueeze(0).float().div_(255.0)
+
+
+class MergedDetections:
+    """多个模型合并后的检测结果（坐标已映射回原图）"""
+
+    def __init__(self, xyxy, conf, cls, model_index, names, model_names):
+        self.xyxy = xyxy  # (N, 4) float32
+        self.conf = conf  # (N,) float32
+        self.cls = cls  # (N,) int
+        self.model_index = model_index  # (N,) int，对应 model_names 的下标
+        self.names = names  # [{类别号: 类别名}, ...]，每个模型一份
+        self.model_names = model_names  # [模型名, ...]
+
+    def __len__(self):
+        return len(self.conf)
+
+    def select(self, model_name):
+        """某个模型的检测结果 (xyxy, conf, cls)"""
+        mask = self.model_index == self.model_names.index(model_name)
+        return self.xyxy[mask], self.conf[mask], self.cls[mask]
+
+    def max_confidence(self, model_name, cls=None):
+        """某个模型（某个类别）的最高置信度，没有检测结果返回0"""
+        _, conf, classes = self.select(model_name)
+        if cls is not None:
+            conf = conf[classes == cls]
+        return float(conf.max()) if len(conf) else 0.0
+
+    def labels(self):
+        """每个框的显示标签"""
+        return [f"{self.names[m][int(c)]} {p:.2f}" for m, c, p in zip(self.model_index, self.cls, self.conf)]
+
+
+class MultiModelExecutor:
+    """共享预处理 + 多模型并行推理 + 合并结果"""
+
+    def __init__(self, models, imgsz=640, colors=None, low_imgsz=None):
+        self.models = list(models)  # [(模型名, 模型, 推理参数), ...]
+        self.imgsz = imgsz
+        self.low_imgsz = low_imgsz  # 不为空时启用分辨率级联（共享张量按该尺寸生成）
+        # colors: {模型名: BGR颜色 或 {类别号: BGR颜色}}
+        self.colors = colors or {}
+        self.cascades = [CascadeDetector(model, low_imgsz, imgsz) for _, model, _ in self.models] if low_imgsz else None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.models)), thread_name_prefix="multi-model")
+
+    def _infer(self, index, frame, tensor, ratio, pad):
+        """单个模型推理（在线程池中执行），返回原图坐标的 (xyxy, conf, cls, names)"""
+        _, model, kwargs = self.models[index]
+        size = tensor.shape[-1]
+        if self.cascades:
+            # 级联粗检：候选阈值放低，临界候选交给第二级复检
+            cascade = self.cascades[index]
+            kwargs = dict(kwargs, conf=min(kwargs.get("conf", 0.25), cascade.candidate_conf))
+        result = model(tensor, **dict(kwargs, imgsz=size, verbose=False))[0]
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            xyxy, conf, cls = np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int)
+        else:
+            # letterbox坐标 → 原图坐标（一次向量化运算）
+            frame_h, frame_w = frame.shape[:2]
+            xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+            xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad[0]) / ratio).clip(0, frame_w)
+            xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad[1]) / ratio).clip(0, frame_h)
+            conf = boxes.conf.cpu().numpy().astype(np.float32)
+            cls = boxes.cls.cpu().numpy().astype(int)
+        if self.cascades:
+            xyxy, conf, cls = self.cascades[index].refine(frame, xyxy, conf, cls, **self.models[index][2])
+        return xyxy, conf, cls, result.names
+
+    def run(self, frame):
+        """对一帧执行所有模型，返回 MergedDetections"""
+        image, ratio, pad = letterbox(frame, self.low_imgsz or self.imgsz)
+        tensor = to_input_tensor(image)  # 所有模型共用同一个输入张量
+        futures = [self._pool.submit(self._infer, index, frame, tensor, ratio, pad)
+                   for index in range(len(self.models))]
+
+        xyxy_list, conf_list, cls_list, index_list, names = [], [], [], [], []
+        for index, future in enumerate(futures):
+            xyxy, conf, cls, model_names = future.result()
+            names.append(model_names)
+            if len(conf) == 0:
+                continue
+            xyxy_list.append(xyxy)
+            conf_list.append(conf)
+            cls_list.append(cls)
+            index_list.append(np.full(len(conf), index, dtype=int))
+
+        if xyxy_list:
+            return MergedDetections(np.concatenate(xyxy_list), np.concatenate(conf_list),
+                                    np.concatenate(cls_list), np.concatenate(index_list),
+                                    names, [name for name, _, _ in self.models])
+        return MergedDetections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int),
+                                np.zeros(0, int), names, [name for name, _, _ in self.models])
+
+    def color_for(self, model_index, cls):
+        model_name = self.models[model_index][0]
+        color = self.colors.get(model_name)
+        if isinstance(color, dict):
+            color = color.get(int(cls))
+        return color or _DEFAULT_MODEL_COLORS[model_index % len(_DEFAULT_MODEL_COLORS)]
+
+    def box_colors(self, merged):
+        """每个框的颜色（BGR），与draw()一致，供显示控件矢量绘制"""
+        return [self.color_for(m, c) for m, c in zip(merged.model_index, merged.cls)]
+
+    def draw(self, frame, merged, line_width=2, font_scale=0.5):
+        """在frame上一次画出所有模型的检测框（原地修改，返回frame）"""
+        for (x1, y1, x2, y2), label, m, c in zip(merged.xyxy.astype(int), merged.labels(),
+                                                 merged.model_index, merged.cls):
+            color = self.color_for(m, c)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, line_width)
+            (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)
+            top = max(y1 - th - 4, 0)
+            cv2.rectangle(frame, (x1, top), (x1 + tw + 2, top + th + 4), color, -1)
+            cv2.putText(frame, label, (x1 + 1, top + th + 1), cv2.FONT_HERSHEY_SIMPLEX,
+                        font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+        return frame
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,339 @@
+"""
+多路监控：N个视频源（摄像头/录像/网络流）分格显示，共用一个推理池
+
+每个视频源一个 CaptureThread 写自己的最新帧缓冲区；推理池只有一个线程、一份模型：
+- 公平调度：每一轮按轮转顺序从每个有新帧的视频源各取最新一帧（一个源一轮最多一帧），
+  下一轮从上次停下的位置继续，帧率高的源不会挤占其他源
+- 跨源批处理：一轮取到的帧拼成一批送进模型（最多batch_size帧）
+- 每路统计：采集帧率、推理帧率、延迟（采集到出结果）、跳过的帧数
+- 显示按屏幕刷新率合并（RenderScheduler），最小化/被遮挡的分格不再缩放画框
+
+用法（独立运行）：
+    python multi_stream.py 0 1 D:/录像/门口.mp4 rtsp://192.168.1.10/stream
+"""
+import math
+import sys
+import threading
+import time
+
+import cv2
+from PyQt6 import QtCore, QtWidgets
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPixmap
+
+from capture import CaptureThread, FrameRingBuffer, StreamCaptureThread, is_stream_url, redact_url
+from render_scheduler import RenderScheduler
+
+# 检测框颜色（BGR），按类别号循环取色
+_COLORS = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+           (10, 249, 72), (23, 204, 146), (134, 219, 61), (211, 188, 0), (255, 149, 0)]
+
+
+def parse_source(text):
+    """"0" → 摄像头0，其余（文件路径/网络地址）原样返回"""
+    text = str(text).strip()
+    return int(text) if text.isdigit() else text
+
+
+class StreamStats:
+    """单路统计（指数滑动平均）"""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.infer_fps = 0.0  # 推理帧率
+        self.latency = 0.0  # 采集到出结果的延迟（秒）
+        self.inferred = 0  # 推理过的帧数
+        self.skipped = 0  # 采集到但没轮到推理就被新帧覆盖的帧数
+        self._last_result = None
+        self._last_seq = 0
+
+    def record(self, seq, capture_ts, now):
+        if self._last_result is not None and now > self._last_result:
+            fps = 1.0 / (now - self._last_result)
+            self.infer_fps = fps if not self.inferred else (1 - self.alpha) * self.infer_fps + self.alpha * fps
+        latency = max(0.0, now - capture_ts)
+        self.latency = latency if not self.inferred else (1 - self.alpha) * self.latency + self.alpha * latency
+        if self._last_seq:
+            self.skipped += max(0, seq - self._last_seq - 1)
+        self._last_seq = seq
+        self._last_result = now
+        self.inferred += 1
+
+
+class StreamSource:
+    """一路视频源：采集线程 + 最新帧缓冲区 + 统计"""
+
+    def __init__(self, stream_id, source, name=None):
+        self.stream_id = stream_id
+        self.source = source
+        self.display_source = redact_url(source) if isinstance(source, str) else source  # 不含账号密码，用于显示
+        self.name = name or (f"摄像头{source}" if isinstance(source, int) else self.display_source.split("/")[-1])
+        self.buffer = FrameRingBuffer(capacity=2)
+        self.stats = StreamStats()
+        self.capture_thread = None
+        self.display_size = (320, 240)  # 分格尺寸（主线程更新，推理池按此缩放）
+        self.last_seq = 0  # 推理池已处理到的帧序号
+        self.capture_fps = 0.0
+
+    def open(self):
+        """打开视频源并启动采集线程，失败返回False（网络流在采集线程里连接，断流自动重连）"""
+        if is_stream_url(self.source):
+            self.capture_fps = 25
+            self.capture_thread = StreamCaptureThread(self.source, self.buffer)
+            self.capture_thread.start()
+            return True
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened() and not isinstance(self.source, int):
+            cap = cv2.VideoCapture(self.source, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            return False
+        is_file = isinstance(self.source, str) and "://" not in self.source
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.capture_fps = fps if fps and fps > 0 else 25
+        self.capture_thread = CaptureThread(cap, self.buffer, is_file=is_file, fps=self.capture_fps)
+        self.capture_thread.start()
+        return True
+
+    def close(self):
+        if self.capture_thread is not None:
+            self.capture_thread.stop()
+            self.capture_thread = None
+
+
+class SharedInferencePool:
+    """
+    共享推理池：一个推理线程轮转地从各路取最新帧，跨路拼批推理
+    on_result(source, seq, frame, result) 在推理线程中调用
+    """
+
+    def __init__(self, model, batch_size=8, on_result=None, idle_sleep=0.005, **predict_kwargs):
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.on_result = on_result
+        self.idle_sleep = idle_sleep
+        self.predict_kwargs = dict(predict_kwargs, verbose=False)
+        self.batches = 0  # 推理批次数
+        self.batch_frames = 0  # 推理总帧数
+        self._sources = []
+        self._lock = threading.Lock()
+        self._cursor = 0  # 下一轮从哪一路开始取帧
+        self._running = False
+        self._thread = None
+
+    def set_sources(self, sources):
+        with self._lock:
+            self._sources = list(sources)
+            self._cursor = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="shared-infer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def mean_batch(self):
+        return self.batch_frames / self.batches if self.batches else 0.0
+
+    def _collect(self):
+        """轮转取帧：从游标位置开始，每路最多一帧，凑满一批为止"""
+        with self._lock:
+            sources = self._sources
+            count = len(sources)
+            batch = []
+            taken = 0
+            for offset in range(count):
+                source = sources[(self._cursor + offset) % count]
+                taken = offset + 1
+                item = source.buffer.latest(after_seq=source.last_seq)
+                if item is not None:
+                    batch.append((source, item))
+                    if len(batch) >= self.batch_size:
+                        break
+            if count:
+                self._cursor = (self._cursor + taken) % count
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                time.sleep(self.idle_sleep)
+                continue
+            frames = [item[2] for _, item in batch]
+            try:
+                results = self.model(frames, **self.predict_kwargs)
+            except Exception as e:
+                print(f"❌ 共享推理池推理出错：{e}")
+                time.sleep(0.5)
+                continue
+            self.batches += 1
+            self.batch_frames += len(frames)
+            now = time.time()
+            for (source, (seq, capture_ts, frame)), result in zip(batch, results):
+                source.last_seq = seq
+                source.stats.record(seq, capture_ts, now)
+                if self.on_result is not None:
+                    self.on_result(source, seq, frame, result)
+
+
+def render_tile(frame, result, size):
+    """缩放到分格尺寸后再画框（框坐标同比缩放，画框只在小图上进行），返回RGB图像"""
+    target_w, target_h = size
+    frame_h, frame_w = frame.shape[:2]
+    scale = min(target_w / frame_w, target_h / frame_h)
+    image = cv2.resize(frame, (max(1, int(frame_w * scale)), max(1, int(frame_h * scale))),
+                       interpolation=cv2.INTER_AREA)
+    boxes = result.boxes
+    if boxes is not None and len(boxes):
+        xyxy = (boxes.xyxy.cpu().numpy() * scale).astype(int)
+        for (x1, y1, x2, y2), cls, conf in zip(xyxy, boxes.cls.cpu().numpy().astype(int), boxes.conf.cpu().numpy()):
+            color = _COLORS[cls % len(_COLORS)]
+            cv2.rectangle(image, (x1, y1), (x2, y2), color, 1)
+            cv2.putText(image, f"{result.names[cls]} {conf:.2f}", (x1, max(y1 - 3, 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+class StreamGridWidget(QtWidgets.QWidget):
+    """分格显示：每路一个画面标签 + 一行统计"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grid = QtWidgets.QGridLayout(self)
+        self.grid.setSpacing(4)
+        self.tiles = {}  # stream_id -> (画面标签, 统计标签)
+
+    def set_sources(self, sources):
+        for video, caption in self.tiles.values():
+            video.deleteLater()
+            caption.deleteLater()
+        self.tiles = {}
+        cols = max(1, math.ceil(math.sqrt(len(sources))))
+        for index, source in enumerate(sources):
+            video = QtWidgets.QLabel(source.name)
+            video.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            video.setMinimumSize(160, 120)
+            video.setSizePolicy(QtWidgets.QSizePolicy.Policy.Ignored, QtWidgets.QSizePolicy.Policy.Ignored)
+            video.setStyleSheet('border:1px solid #D7E2F9; background:#202020; color:#D7E2F9;')
+            caption = QtWidgets.QLabel(source.name)
+            row, col = divmod(index, cols)
+            self.grid.addWidget(video, row * 2, col)
+            self.grid.addWidget(caption, row * 2 + 1, col)
+            self.grid.setRowStretch(row * 2, 1)
+            self.tiles[source.stream_id] = (video, caption)
+
+    def tile_size(self, stream_id):
+        video, _ = self.tiles[stream_id]
+        return max(1, video.width()), max(1, video.height())
+
+    def show_image(self, stream_id, image):
+        if stream_id in self.tiles:
+            self.tiles[stream_id][0].setPixmap(QPixmap.fromImage(image))
+
+    def show_caption(self, stream_id, text):
+        if stream_id in self.tiles:
+            self.tiles[stream_id][1].setText(text)
+
+
+class MultiStreamWindow(QtWidgets.QWidget):
+    """多路监控窗口：N路分格显示，共用一个推理池"""
+    BATCH_SIZE = 8  # 跨路拼批的最大帧数
+    DISPLAY_MAX_FPS = None  # 分格刷新帧率上限（None=屏幕刷新率）
+
+    def __init__(self, model, sources, predict_kwargs=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("多路监控（共享推理池）")
+        self.resize(1280, 800)
+        self.model = model
+        self.streams = [StreamSource(index, parse_source(source)) for index, source in enumerate(sources)]
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.grid = StreamGridWidget(self)
+        self.summary = QtWidgets.QLabel("")
+        layout.addWidget(self.grid, 1)
+        layout.addWidget(self.summary)
+
+        self.render_scheduler = RenderScheduler(max_fps=self.DISPLAY_MAX_FPS, parent=self)
+        self.pool = SharedInferencePool(model, batch_size=self.BATCH_SIZE, on_result=self.render_result,
+                                        **(predict_kwargs or {"conf": 0.25}))
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+
+    def start(self):
+        """打开所有视频源并启动推理池，返回打开失败的视频源列表"""
+        failed = [stream for stream in self.streams if not stream.open()]
+        self.streams = [stream for stream in self.streams if stream not in failed]
+        self.grid.set_sources(self.streams)
+        for stream in self.streams:
+            video, _ = self.grid.tiles[stream.stream_id]
+            self.render_scheduler.add_pane(
+                stream.stream_id, lambda image, stream_id=stream.stream_id: self.grid.show_image(stream_id, image), video)
+        self.render_scheduler.start()
+        self.pool.set_sources(self.streams)
+        self.pool.start()
+        self.stats_timer.start(1000)
+        QtCore.QTimer.singleShot(0, self.update_tile_sizes)
+        return failed
+
+    def stop(self):
+        self.stats_timer.stop()
+        self.render_scheduler.stop()
+        self.pool.stop()
+        for stream in self.streams:
+            stream.close()
+
+    def update_tile_sizes(self):
+        """分格尺寸变化时通知推理池（推理线程按此尺寸缩放画面）"""
+        for stream in self.streams:
+            if stream.stream_id in self.grid.tiles:
+                stream.display_size = self.grid.tile_size(stream.stream_id)
+
+    def render_result(self, source, seq, frame, result):
+        """推理线程：缩放画框后交给刷新调度（QImage可以在子线程创建；分格不可见时直接跳过）"""
+        if not self.render_scheduler.wants(source.stream_id):
+            return
+        rgb = render_tile(frame, result, source.display_size)
+        h, w, ch = rgb.shape
+        image = QImage(rgb.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
+        self.render_scheduler.submit(source.stream_id, image)
+
+    def refresh_stats(self):
+        """每秒刷新每路统计和总览"""
+        total_fps = 0.0
+        for stream in self.streams:
+            stats = stream.stats
+            total_fps += stats.infer_fps
+            self.grid.show_caption(
+                stream.stream_id,
+                f"{stream.name}｜采集{stream.capture_fps:.0f}fps｜推理{stats.infer_fps:.1f}fps｜"
+                f"延迟{stats.latency * 1000:.0f}ms｜跳过{stats.skipped}帧")
+        self.summary.setText(f"共{len(self.streams)}路，总推理{total_fps:.1f}fps，平均每批{self.pool.mean_batch:.1f}帧")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_tile_sizes()
+
+    def closeEvent(self, event):
+        self.stop()
+        super().closeEvent(event)
+
+
+if __name__ == "__main__":
+    from model_registry import get_registry
+
+    if len(sys.argv) < 2:
+        print("用法：python multi_stream.py 视频源1 视频源2 ...（摄像头写编号，如 0 1）")
+        sys.exit(1)
+    app = QtWidgets.QApplication(sys.argv)
+    window = MultiStreamWindow(get_registry().get("yolov8n.pt"), sys.argv[1:])
+    window.show()
+    for stream in window.start():
+        print(f"❌ 无法打开视频源：{stream.display_source}")
+    sys.exit(app.exec())
@@ -0,0 +1,202 @@
+"""
+流水线并行的阶段图（decode → preprocess → infer → postprocess → render）
+
+每个阶段有自己的工作线程（数量可配置），阶段之间用有界队列连接，
+这样第N帧在推理时，第N+1帧可以同时做预处理、第N-1帧可以同时画框，
+各阶段耗时是重叠的而不是相加的。
+多线程阶段会打乱帧的顺序，出口处按帧序号重新排序后再交给 on_result 回调。
+
+用法：
+    graph = StageGraph([
+        Stage("preprocess", preprocess),
+        Stage("infer", infer),
+        Stage("postprocess", postprocess, workers=2),
+    ], on_result=render)
+    graph.start()
+    graph.submit(frame)          # 实时模式可用 block=False，队列满直接丢帧
+    graph.close(); graph.join()  # 离线模式：不再提交新帧，等待全部处理完
+    graph.stop()
+"""
+import heapq
+import queue
+import threading
+import time
+
+# 阶段函数返回 SKIP 表示丢弃这一帧（后续阶段不再处理，但排序时会跳过它）
+SKIP = object()
+
+
+class Stage:
+    """
+    流水线中的一个阶段
+    - func(payload) -> payload：处理函数，返回值交给下一阶段
+    - workers：该阶段的工作线程数
+    - setup：可选，每个工作线程启动时调用一次，返回该线程专用的处理函数
+      （例如每个推理线程各自加载一份模型，避免多线程共用同一个模型对象）
+    """
+
+    def __init__(self, name, func=None, workers=1, setup=None):
+        if func is None and setup is None:
+            raise ValueError(f"阶段{name}必须提供func或setup")
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.setup = setup
+
+
+class StageGraph:
+    """线性阶段图：有界队列 + 多工作线程 + 出口按序号重排"""
+
+    def __init__(self, stages, on_result=None, queue_size=4, ordered=True, on_error=None):
+        self.stages = list(stages)
+        self.on_result = on_result  # on_result(seq, payload)，在排序线程中调用
+        self.on_error = on_error  # on_error(stage_name, seq, exception)
+        self.ordered = ordered
+        # 每个阶段一个输入队列，最后多一个输出队列（交给排序线程）
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(self.stages) + 1)]
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._done_cond = threading.Condition(self._lock)
+        self._next_seq = 0  # 下一个提交的帧序号
+        self._emitted = 0  # 已经交给on_result（或跳过）的帧数
+        self._closed = False
+
+    # -------------------------- 生命周期 --------------------------
+    def start(self):
+        self._stop_event.clear()
+        for index, stage in enumerate(self.stages):
+            for worker_id in range(stage.workers):
+                t = threading.Thread(
+                    target=self._worker_loop, args=(index, stage),
+                    name=f"{stage.name}-{worker_id}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+        t = threading.Thread(target=self._collector_loop, name="reorder", daemon=True)
+        t.start()
+        self._threads.append(t)
+        return self
+
+    def submit(self, payload, block=True, timeout=None):
+        """
+        提交一帧到第一个阶段，返回分配的帧序号；
+        非阻塞提交且队列已满（或阻塞等待超时）时返回None，实时模式下相当于丢弃这一帧
+        """
+        if self._closed or self._stop_event.is_set():
+            return None
+        with self._submit_lock:
+            # 先占用序号，入队失败再退回（提交方串行，不会和别的提交冲突）
+            with self._lock:
+                seq = self._next_seq
+                self._next_seq += 1
+            if self._put(self._queues[0], (seq, payload), block, timeout):
+                return seq
+            with self._lock:
+                self._next_seq -= 1
+            return None
+
+    def close(self):
+        """不再接收新帧（已提交的帧会继续处理完）"""
+        self._closed = True
+
+    def join(self, timeout=None):
+        """等待所有已提交的帧都处理完毕，全部完成返回True"""
+        with self._done_cond:
+            return self._done_cond.wait_for(
+                lambda: self._stop_event.is_set() or self._emitted >= self._next_seq, timeout
+            )
+
+    def stop(self, timeout=2.0):
+        """立即停止所有线程（未处理完的帧直接丢弃）"""
+        self._stop_event.set()
+        with self._done_cond:
+            self._done_cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+
+    @property
+    def pending(self):
+        """已提交但还没输出的帧数"""
+        with self._lock:
+            return self._next_seq - self._emitted
+
+    # -------------------------- 工作线程 --------------------------
+    def _get(self, q):
+        """带超时的取队列，便于及时响应停止信号"""
+        while not self._stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _put(self, q, item, block=True, timeout=None):
+        """入队：下游满时阻塞形成背压，停止或超时放弃"""
+        if not block:
+            try:
+                q.put_nowait(item)
+                return True
+            except queue.Full:
+                return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop_event.is_set():
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            try:
+                q.put(item, timeout=wait)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker_loop(self, index, stage):
+        func = stage.setup() if stage.setup is not None else stage.func
+        in_q, out_q = self._queues[index], self._queues[index + 1]
+        while True:
+            item = self._get(in_q)
+            if item is None:
+                return
+            seq, payload = item
+            if payload is not SKIP:
+                try:
+                    payload = func(payload)
+                except Exception as e:
+                    payload = SKIP
+                    if self.on_error:
+                        self.on_error(stage.name, seq, e)
+                    else:
+                        print(f"流水线阶段{stage.name}出错（帧{seq}）：{str(e)}")
+            if not self._put(out_q, (seq, payload)):
+                return
+
+    def _collector_loop(self):
+        """出口：按帧序号重新排序，连续的帧依次交给on_result"""
+        out_q = self._queues[-1]
+        heap = []
+        next_emit = 0
+        while True:
+            item = self._get(out_q)
+            if item is None:
+                return
+            if not self.ordered:
+                self._emit(*item)
+                continue
+            heapq.heappush(heap, item)
+            while heap and heap[0][0] == next_emit:
+                seq, payload = heapq.heappop(heap)
+                self._emit(seq, payload)
+                next_emit += 1
+
+    def _emit(self, seq, payload):
+        if payload is not SKIP and self.on_result is not None and not self._stop_event.is_set():
+            try:
+                self.on_result(seq, payload)
+            except Exception as e:
+                print(f"流水线输出回调出错（帧{seq}）：{str(e)}")
+        with self._done_cond:
+            self._emitted += 1
+            self._done_cond.notify_all()
@@ -0,0 +1,118 @@
+"""
+显示刷新调度：处理线程只管提交结果，显示按屏幕刷新率（或设定上限）定时进行
+
+原来每处理完一帧就发信号让主线程重绘两个画面：视频源帧率高于显示器刷新率时，
+多出来的重绘用户根本看不到；窗口最小化/被切走时也照样做图像转换，白白和推理抢CPU。
+RenderScheduler 的做法：
+- submit() 可在任意线程调用，只把结果存为该画面的"最新一项"（旧的未显示项直接被覆盖）
+- 主线程定时器按刷新率取出每个画面的最新项交给显示函数
+- 画面不可见（控件隐藏、窗口最小化、被完全遮挡）时直接丢弃，不做任何转换；
+  处理线程可用 wants() 提前判断，画面不可见时连缩放/画框也省掉
+处理线程不等待显示，始终全速运行。
+
+用法：
+    scheduler = RenderScheduler(max_fps=None)          # None=屏幕刷新率
+    scheduler.add_pane("ori", self.present_original, self.label_ori_video)
+    scheduler.start()
+    scheduler.submit("ori", payload)                    # 处理线程中调用
+"""
+import threading
+
+from PyQt6 import QtCore
+from PyQt6.QtGui import QGuiApplication
+
+DEFAULT_REFRESH_RATE = 60.0
+
+
+def display_refresh_rate():
+    """主屏幕刷新率（取不到时按60Hz）"""
+    app = QGuiApplication.instance()
+    screen = app.primaryScreen() if app is not None else None
+    rate = screen.refreshRate() if screen is not None else 0
+    return rate if rate and rate > 1 else DEFAULT_REFRESH_RATE
+
+
+def pane_visible(widget):
+    """控件当前是否真正可见（显示中、窗口未最小化、没有被完全遮挡）"""
+    return (widget.isVisible() and not widget.window().isMinimized()
+            and not widget.visibleRegion().isEmpty())
+
+
+class RenderScheduler(QtCore.QObject):
+    """按刷新率合并显示：每个画面只显示最新一项，不可见的画面跳过"""
+
+    def __init__(self, max_fps=None, parent=None):
+        super().__init__(parent)
+        self._panes = {}  # 画面名 -> (显示函数, 控件)
+        self._pending = {}  # 画面名 -> 最新一项（未显示）
+        self._visible = {}  # 画面名 -> 上次定时检查时是否可见（供处理线程读取）
+        self._lock = threading.Lock()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self.submitted = 0  # 提交的项数
+        self.presented = 0  # 实际显示的项数
+        self.coalesced = 0  # 被更新的项覆盖、没来得及显示的项数
+        self.hidden = 0  # 画面不可见而丢弃的项数
+        self.set_max_fps(max_fps)
+
+    def set_max_fps(self, max_fps=None):
+        """显示帧率上限（None或0=屏幕刷新率）"""
+        self.max_fps = max_fps or display_refresh_rate()
+        self._timer.setInterval(max(1, int(1000 / self.max_fps)))
+
+    def add_pane(self, name, present, widget):
+        """注册画面：present(item) 在主线程调用；widget 用于判断是否可见"""
+        self._panes[name] = (present, widget)
+        self._visible[name] = True
+
+    def remove_pane(self, name):
+        with self._lock:
+            self._pending.pop(name, None)
+        self._panes.pop(name, None)
+        self._visible.pop(name, None)
+
+    def wants(self, name):
+        """该画面是否需要新内容（不可见时返回False，处理线程可跳过显示相关的计算）"""
+        return self._visible.get(name, False)
+
+    def submit(self, name, item):
+        """提交一项待显示内容（任意线程；只保留最新一项）"""
+        with self._lock:
+            self.submitted += 1
+            if name in self._pending:
+                self.coalesced += 1
+            self._pending[name] = item
+
+    def reset_stats(self):
+        self.submitted = self.presented = self.coalesced = self.hidden = 0
+
+    def clear(self):
+        """丢弃所有未显示的内容（停止任务、清屏前调用）"""
+        with self._lock:
+            self._pending.clear()
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self.clear()
+
+    def _tick(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for name, (present, widget) in list(self._panes.items()):
+            visible = pane_visible(widget)
+            self._visible[name] = visible
+            if name not in pending:
+                continue
+            if not visible:
+                self.hidden += 1
+                continue
+            self.presented += 1
+            present(pending[name])
+
+    def summary(self):
+        return (f"显示{self.presented}次（上限{self.max_fps:.0f}fps），合并跳过{self.coalesced}次，"
+                f"画面不可见跳过{self.hidden}次")
@@ -0,0 +1,183 @@
+"""
+启动预加载：登录窗口显示期间，后台并行准备主窗口要用的资源
+
+原来登录成功后才在主线程里依次加载模型、预热推理、解析主界面UI，点完登录要卡好几秒主窗口才出来，
+而用户输入账号密码的这段时间程序什么都没做。StartupOrchestrator 在登录窗口显示时就把这些
+互不依赖的任务各放一个后台线程同时执行：
+- 模型：从模型注册表加载并预热（注册表是进程级的，主窗口拿到的是同一个已预热的句柄）
+- 主界面：在后台取得编译好的界面类（见ui_build.py；控件只能在主线程创建，主线程只剩setupUi这一步）
+- 数据库：连接池预先建好连接（登录查询直接复用）
+每个任务完成时通过 progress_signal 通知主线程（登录窗口据此显示就绪状态），全部完成后发 finished_signal；
+登录成功时如果还有任务没完成，登录窗口显示等待提示，完成后自动打开主窗口。
+任务失败不影响登录：主窗口发现没有预加载结果时按原来的方式在主线程里加载并提示错误。
+
+用法：
+    startup = StartupOrchestrator()
+    startup.add("model", "模型", preload_models)
+    startup.add("ui", "主界面", lambda: load_ui_class("main11111.ui"))
+    startup.progress_signal.connect(self.update_startup_status)
+    startup.start()
+    ...
+    ui_class = startup.result("ui")     # 未完成或失败时返回None
+
+lazy_import 让重型模块（如OpenCV）在第一次用到时才加载，登录窗口不用等它们导入。
+"""
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+from PyQt6 import QtCore
+
+PENDING = "⏳"
+DONE = "✅"
+FAILED = "❌"
+
+
+class StartupTask:
+    """一个预加载任务的状态"""
+
+    def __init__(self, name, label, func):
+        self.name = name
+        self.label = label  # 显示给用户的名称
+        self.func = func
+        self.result = None
+        self.error = None
+        self.seconds = None  # 执行耗时（秒）
+        self.finished = threading.Event()
+
+    @property
+    def state(self):
+        if not self.finished.is_set():
+            return PENDING
+        return FAILED if self.error is not None else DONE
+
+
+class StartupOrchestrator(QtCore.QObject):
+    """并行执行启动预加载任务（需在主线程创建，信号在主线程接收）"""
+    progress_signal = QtCore.pyqtSignal(str, bool, str)  # 任务名, 是否成功, 说明（成功为耗时，失败为错误信息）
+    finished_signal = QtCore.pyqtSignal()  # 所有任务都已结束（不论成败）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = OrderedDict()  # 任务名 -> StartupTask
+        self._lock = threading.Lock()
+        self.started_at = None
+        self._finished = False  # finished_signal是否已发出
+
+    def add(self, name, label, func):
+        """添加任务 func()（start之前调用），返回值可用 result(name) 取得"""
+        self._tasks[name] = StartupTask(name, label, func)
+
+    def start(self):
+        """每个任务一个后台线程同时开始执行（重复调用无效）"""
+        with self._lock:
+            if self.started_at is not None:
+                return
+            self.started_at = time.perf_counter()
+        for task in self._tasks.values():
+            threading.Thread(target=self._run, args=(task,), name=f"startup-{task.name}", daemon=True).start()
+
+    @property
+    def started(self):
+        return self.started_at is not None
+
+    def _run(self, task):
+        begin = time.perf_counter()
+        try:
+            task.result = task.func()
+        except Exception as e:
+            task.error = e
+        task.seconds = time.perf_counter() - begin
+        with self._lock:
+            task.finished.set()
+            last = self.done() and not self._finished
+            self._finished = self._finished or last
+        if task.error is None:
+            self.progress_signal.emit(task.name, True, f"{task.seconds:.1f}秒")
+        else:
+            self.progress_signal.emit(task.name, False, str(task.error))
+        if last:
+            self.finished_signal.emit()
+
+    def done(self, *names):
+        """指定任务（不指定时为全部任务）是否都已结束"""
+        tasks = [self._tasks[name] for name in names if name in self._tasks] if names else self._tasks.values()
+        return all(task.finished.is_set() for task in tasks)
+
+    def wait(self, name, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        task = self._tasks.get(name)
+        return task is None or task.finished.wait(timeout)
+
+    def result(self, name, default=None):
+        """任务的返回值；未开始、未完成或失败时返回default（不等待）"""
+        task = self._tasks.get(name)
+        if task is None or not task.finished.is_set() or task.error is not None:
+            return default
+        return task.result
+
+    def error(self, name):
+        task = self._tasks.get(name)
+        return task.error if task is not None else None
+
+    def status_text(self):
+        """各任务状态，例如 "✅ 模型  ⏳ 主界面  ✅ 数据库" """
+        return "  ".join(f"{task.state} {task.label}" for task in self._tasks.values())
+
+    def pending_labels(self):
+        """还没结束的任务名称"""
+        return [task.label for task in self._tasks.values() if not task.finished.is_set()]
+
+    def summary(self):
+        parts = []
+        for task in self._tasks.values():
+            if not task.finished.is_set():
+                parts.append(f"{task.label}未完成")
+            elif task.error is not None:
+                parts.append(f"{task.label}失败（{task.error}）")
+            else:
+                parts.append(f"{task.label}{task.seconds:.1f}秒")
+        return "，".join(parts)
+
+
+class _LazyModule(types.ModuleType):
+    """按需导入的空壳模块：第一次访问它没有的属性时导入真正的模块，并把真正模块的内容复制过来"""
+
+    def __init__(self, name, spec):
+        super().__init__(name)
+        self.__spec__ = spec
+        self._lazy_lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        with self._lazy_lock:
+            if sys.modules.get(self.__name__) is self:
+                del sys.modules[self.__name__]
+                try:
+                    module = importlib.import_module(self.__name__)
+                except BaseException:
+                    sys.modules[self.__name__] = self
+                    raise
+                self.__dict__.update(module.__dict__)
+        try:
+            return self.__dict__[attr]
+        except KeyError:
+            raise AttributeError(f"module '{self.__name__}' has no attribute '{attr}'") from None
+
+
+def lazy_import(name):
+    """
+    按需导入：先在sys.modules登记一个空壳模块，第一次用到它的属性时才真正导入（线程安全）
+    之后其它模块里的 import name 拿到的也是这个空壳；已导入的模块直接返回，找不到时抛出ImportError
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    module = sys.modules[name] = _LazyModule(name, spec)
+    return module
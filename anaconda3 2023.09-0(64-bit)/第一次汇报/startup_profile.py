@@ -0,0 +1,204 @@
+"""
+冷启动耗时分析：统计启动过程中每个模块的导入耗时和各阶段（界面解析、模型加载、预热、数据库连接）耗时
+
+瘦客户机上冷启动要好几秒，但说不清时间花在哪里、改了之后快了多少。用法：
+    python 9.8.py --profile-startup              # 登录窗口出来、后台预加载全部完成后打印表格并退出
+    python 9.8.py --profile-startup=json         # 同上，最后一行输出JSON（方便脚本记录每次的冷启动时间）
+    python 9.8.py --profile-startup=report.json  # JSON写入文件
+- 模块导入：在 sys.meta_path 最前面挂一个查找器，给每个模块的加载器计时（累计=含它导入的其它模块，
+  自身=去掉子模块后的时间）；按需导入的模块在第一次真正加载时计时
+- 阶段：代码里用 profiler.phase("模型加载") 包住要统计的步骤，后台线程里的阶段也能统计（记录开始时间和耗时）
+- 所有时间都从本模块被导入时算起（在程序最前面导入它，之前只有解释器自身的启动时间）
+没有 --profile-startup 时 from_argv 返回不做任何事的 NullProfiler，不挂查找器，没有额外开销。
+
+本模块只用标准库，必须在PyQt、OpenCV等其它模块之前导入，否则这些模块的导入时间统计不到。
+"""
+import importlib.abc
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PROFILE_FLAG = "--profile-startup"
+MIN_MODULE_MS = 1.0  # 表格里只列累计导入耗时不少于该值（毫秒）的模块
+MAX_TABLE_MODULES = 30  # 表格里最多列出的模块数（JSON里是全部模块）
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """包一层原加载器，给 create_module/exec_module 计时（扩展模块的耗时主要在create_module；其它属性都转给原加载器）"""
+
+    def __init__(self, loader, profiler, name):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def create_module(self, spec):
+        with self._profiler._time_module(self._name):
+            return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler._time_module(self._name):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """挂在 sys.meta_path 最前面：用其它查找器找到模块后，把加载器换成计时的加载器"""
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.busy = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self._profiler, fullname)
+        return spec
+
+
+class NullProfiler:
+    """未开启耗时分析时使用：所有方法都不做任何事"""
+    enabled = False
+    output = None
+
+    def phase(self, name):
+        return nullcontext()
+
+    def mark(self, name):
+        pass
+
+    def uninstall(self):
+        pass
+
+
+class StartupProfiler:
+    """启动耗时分析（模块导入 + 各阶段）；线程安全"""
+    enabled = True
+
+    def __init__(self, output="table"):
+        self.output = output  # "table" / "json" / JSON文件路径
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stacks = threading.local()  # 每个线程正在导入的模块栈：[模块名, 开始时间, 子模块耗时]
+        self.modules = {}  # 模块名 -> {"total": 秒, "self": 秒, "parent": 由哪个模块导入, "thread": 线程名}
+        self.phases = []  # {"name", "start", "seconds", "ok", "thread"}，按结束顺序
+        self.marks = {}  # 时间点名称 -> 距开始的秒数
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    @classmethod
+    def from_argv(cls, argv):
+        """命令行带 --profile-startup[=json|文件] 时开启（并从argv里去掉该参数），否则返回NullProfiler"""
+        for arg in list(argv[1:]):
+            if arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + "="):
+                argv.remove(arg)
+                return cls(arg.partition("=")[2] or "table")
+        return NullProfiler()
+
+    def uninstall(self):
+        """不再统计模块导入"""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def elapsed(self):
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def _time_module(self, name):
+        stack = getattr(self._stacks, "items", None)
+        if stack is None:
+            stack = self._stacks.items = []
+        entry = [name, time.perf_counter(), 0.0]
+        stack.append(entry)
+        try:
+            yield
+        finally:
+            stack.pop()
+            total = time.perf_counter() - entry[1]
+            if stack:
+                stack[-1][2] += total
+            with self._lock:
+                record = self.modules.setdefault(name, {"total": 0.0, "self": 0.0,
+                                                        "parent": stack[-1][0] if stack else None,
+                                                        "thread": threading.current_thread().name})
+                record["total"] += total
+                record["self"] += total - entry[2]
+
+    @contextmanager
+    def phase(self, name):
+        """统计一个阶段的耗时（阶段内抛出的异常照常抛出，记为失败）"""
+        start = self.elapsed()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            with self._lock:
+                self.phases.append({"name": name, "start": start, "seconds": self.elapsed() - start,
+                                    "ok": ok, "thread": threading.current_thread().name})
+
+    def mark(self, name):
+        """记录一个时间点（例如"登录窗口显示"）"""
+        with self._lock:
+            self.marks.setdefault(name, self.elapsed())
+
+    def report(self):
+        """汇总结果（可直接转成JSON）"""
+        with self._lock:
+            modules = sorted(self.modules.items(), key=lambda item: item[1]["total"], reverse=True)
+            return {
+                "total_seconds": self.elapsed(),
+                "marks": dict(self.marks),
+                "phases": sorted(self.phases, key=lambda phase: phase["start"]),
+                "modules": [dict(name=name, **info) for name, info in modules],
+            }
+
+    def format_table(self, report=None):
+        report = report or self.report()
+        lines = [f"冷启动耗时分析（共{report['total_seconds'] * 1000:.0f}ms）", "",
+                 f"{'阶段':<16}{'开始(ms)':>10}{'耗时(ms)':>10}  线程"]
+        for phase in report["phases"]:
+            state = "" if phase["ok"] else "  ❌失败"
+            lines.append(f"{phase['name']:<16}{phase['start'] * 1000:>10.0f}{phase['seconds'] * 1000:>10.0f}"
+                         f"  {phase['thread']}{state}")
+        for name, at in sorted(report["marks"].items(), key=lambda item: item[1]):
+            lines.append(f"{'▶ ' + name:<16}{at * 1000:>10.0f}")
+        # 只列程序代码直接导入的模块（被其它模块间接导入的已算在那个模块的累计耗时里，完整列表见JSON）
+        shown = [module for module in report["modules"]
+                 if module["parent"] is None and module["total"] * 1000 >= MIN_MODULE_MS]
+        lines += ["", f"{'模块':<32}{'累计(ms)':>10}{'自身(ms)':>10}  线程"]
+        for module in shown[:MAX_TABLE_MODULES]:
+            lines.append(f"{module['name']:<32}{module['total'] * 1000:>10.1f}{module['self'] * 1000:>10.1f}"
+                         f"  {module['thread']}")
+        if len(shown) > MAX_TABLE_MODULES:
+            lines.append(f"……另有{len(shown) - MAX_TABLE_MODULES}个模块（完整列表用 {PROFILE_FLAG}=json）")
+        return "\n".join(lines)
+
+    def write(self):
+        """按 --profile-startup 的参数输出：表格 / JSON一行 / JSON文件"""
+        report = self.report()
+        if self.output == "table":
+            print(self.format_table(report))
+        elif self.output == "json":
+            print(json.dumps(report, ensure_ascii=False))
+        else:
+            with open(self.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+            print(f"冷启动耗时分析已写入 {self.output}（共{report['total_seconds'] * 1000:.0f}ms）")
+        return report
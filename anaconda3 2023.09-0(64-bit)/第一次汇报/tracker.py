@@ -0,0 +1,251 @@
+"""
+隔帧检测 + 轻量跟踪：模型只在部分帧上运行，中间帧用卡尔曼跟踪器外推检测框
+
+- AdaptiveStride：自适应检测间隔k，根据实测推理耗时调整，保证整体跟得上视频源帧率；
+  场景切换（画面突变）时强制检测
+- BoxTracker：向量化的卡尔曼跟踪器（匀速模型），所有目标一次矩阵运算完成预测/更新，
+  检测帧按IoU把检测框与已有轨迹关联
+
+用法（每帧按顺序调用）：
+    stride = AdaptiveStride(source_fps=25)
+    tracker = BoxTracker()
+    if stride.should_detect(frame):
+        start = time.perf_counter()
+        xyxy, conf, cls = 模型检测(frame)
+        stride.record_latency(time.perf_counter() - start)
+        tracks = tracker.update(xyxy, conf, cls)
+    else:
+        tracks = tracker.predict()
+"""
+import math
+
+import cv2
+import numpy as np
+
+# 状态向量 [cx, cy, w, h, vx, vy, vw, vh]，观测向量 [cx, cy, w, h]
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)  # 匀速模型：位置 += 速度（时间步为1帧）
+_H = np.eye(4, 8, dtype=np.float64)
+_I8 = np.eye(8, dtype=np.float64)
+
+
+def xyxy_to_cxcywh(xyxy):
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    wh = xyxy[:, 2:] - xyxy[:, :2]
+    return np.hstack([xyxy[:, :2] + wh / 2, wh])
+
+
+def cxcywh_to_xyxy(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    half = np.maximum(boxes[:, 2:], 0) / 2
+    return np.hstack([boxes[:, :2] - half, boxes[:, :2] + half])
+
+
+def iou_matrix(a, b):
+    """两组框 (N,4)、(M,4) 的IoU矩阵 (N,M)（xyxy格式，一次广播计算）"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+    area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def greedy_match(iou, min_iou):
+    """按IoU从大到小贪心匹配，返回 [(行, 列), ...]"""
+    if iou.size == 0:
+        return []
+    rows, cols = np.nonzero(iou >= min_iou)
+    order = np.argsort(-iou[rows, cols])
+    used_rows, used_cols, pairs = set(), set(), []
+    for r, c in zip(rows[order], cols[order]):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((int(r), int(c)))
+    return pairs
+
+
+class Tracks:
+    """某一帧的跟踪结果（只包含最近一次检测仍然匹配上的目标）"""
+
+    def __init__(self, xyxy, conf, cls, ids, detected):
+        self.xyxy = xyxy  # (N, 4) float
+        self.conf = conf  # (N,) 最近一次检测的置信度
+        self.cls = cls  # (N,) int
+        self.ids = ids  # (N,) 轨迹编号
+        self.detected = detected  # 这一帧是否运行了检测
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class BoxTracker:
+    """向量化卡尔曼跟踪器（同类别之间按IoU关联）"""
+
+    def __init__(self, min_iou=0.3, max_missed=2, process_noise=1e-2, measure_noise=1e-1):
+        self.min_iou = min_iou
+        self.max_missed = max_missed  # 连续多少次检测没匹配上就删除轨迹
+        self.process_noise = process_noise
+        self.measure_noise = measure_noise
+        self.reset()
+
+    def reset(self):
+        self.x = np.zeros((0, 8))  # 状态
+        self.P = np.zeros((0, 8, 8))  # 协方差
+        self.conf = np.zeros(0)
+        self.cls = np.zeros(0, dtype=int)
+        self.ids = np.zeros(0, dtype=int)
+        self.missed = np.zeros(0, dtype=int)  # 连续未匹配的检测次数
+        self._next_id = 1
+
+    def _noise(self, boxes, scale):
+        """噪声随目标尺寸缩放（大目标允许更大的位移误差）"""
+        size = np.maximum(boxes[:, 2:4].mean(axis=1), 1.0)
+        return (scale * size)[:, None, None] ** 2
+
+    def _step(self):
+        """所有轨迹前进一帧"""
+        if len(self.x):
+            self.x = self.x @ _F.T
+            self.x[:, 2:4] = np.maximum(self.x[:, 2:4], 1.0)
+            q = self._noise(self.x, self.process_noise) * _I8
+            self.P = _F @ self.P @ _F.T + q
+
+    def _snapshot(self, detected):
+        visible = self.missed == 0
+        return Tracks(cxcywh_to_xyxy(self.x[visible, :4]), self.conf[visible].copy(),
+                      self.cls[visible].copy(), self.ids[visible].copy(), detected)
+
+    def predict(self):
+        """非检测帧：只外推轨迹位置"""
+        self._step()
+        return self._snapshot(detected=False)
+
+    def hold(self):
+        """画面静止的帧：轨迹原地保持（不外推）"""
+        return self._snapshot(detected=False)
+
+    def update(self, xyxy, conf, cls):
+        """检测帧：外推后用检测结果校正，未匹配的检测新建轨迹"""
+        self._step()
+        boxes = xyxy_to_cxcywh(xyxy)
+        conf = np.asarray(conf, dtype=np.float64).reshape(-1)
+        cls = np.asarray(cls, dtype=int).reshape(-1)
+
+        iou = iou_matrix(cxcywh_to_xyxy(self.x[:, :4]), cxcywh_to_xyxy(boxes))
+        iou[self.cls[:, None] != cls[None, :]] = 0.0  # 不同类别不关联
+        pairs = greedy_match(iou, self.min_iou)
+        track_idx = np.array([p[0] for p in pairs], dtype=int)
+        det_idx = np.array([p[1] for p in pairs], dtype=int)
+
+        if len(pairs):
+            # 批量卡尔曼更新
+            P = self.P[track_idx]
+            R = self._noise(boxes[det_idx], self.measure_noise) * np.eye(4)
+            S = _H @ P @ _H.T + R
+            K = P @ _H.T @ np.linalg.inv(S)
+            innovation = boxes[det_idx] - self.x[track_idx, :4]
+            self.x[track_idx] += (K @ innovation[:, :, None])[:, :, 0]
+            self.P[track_idx] = (_I8 - K @ _H) @ P
+            self.conf[track_idx] = conf[det_idx]
+
+        self.missed += 1
+        self.missed[track_idx] = 0
+        keep = self.missed <= self.max_missed
+        self.x, self.P = self.x[keep], self.P[keep]
+        self.conf, self.cls, self.ids, self.missed = self.conf[keep], self.cls[keep], self.ids[keep], self.missed[keep]
+
+        new = np.setdiff1d(np.arange(len(boxes)), det_idx)
+        if len(new):
+            x = np.zeros((len(new), 8))
+            x[:, :4] = boxes[new]
+            P = np.tile(np.diag([1.0, 1.0, 1.0, 1.0, 100.0, 100.0, 100.0, 100.0]), (len(new), 1, 1))
+            P *= self._noise(x, self.measure_noise)
+            self.x = np.vstack([self.x, x])
+            self.P = np.concatenate([self.P, P])
+            self.conf = np.concatenate([self.conf, conf[new]])
+            self.cls = np.concatenate([self.cls, cls[new]])
+            self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + len(new))])
+            self.missed = np.concatenate([self.missed, np.zeros(len(new), dtype=int)])
+            self._next_id += len(new)
+        return self._snapshot(detected=True)
+
+
+class SceneCutDetector:
+    """场景切换检测：比较相邻帧缩略灰度图的平均差异"""
+
+    def __init__(self, threshold=30.0, thumb_size=(32, 18)):
+        self.threshold = threshold  # 平均像素差（0~255）超过该值视为切换
+        self.thumb_size = thumb_size
+        self._last = None
+
+    def is_cut(self, frame):
+        thumb = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        thumb = thumb.astype(np.int16)
+        last, self._last = self._last, thumb
+        if last is None:
+            return True
+        return float(np.abs(thumb - last).mean()) > self.threshold
+
+    def reset(self):
+        self._last = None
+
+
+class AdaptiveStride:
+    """
+    自适应检测间隔：每k帧检测一次，k由实测推理耗时决定
+    推理平均摊到k帧上的耗时不超过帧间隔×budget，否则增大k；推理变快后逐步减小k
+    """
+
+    def __init__(self, source_fps=25, min_stride=1, max_stride=10, budget=0.8, scene_cut=None):
+        self.frame_interval = 1.0 / (source_fps if source_fps and source_fps > 0 else 25)
+        self.min_stride = max(1, int(min_stride))
+        self.max_stride = max(self.min_stride, int(max_stride))
+        self.budget = budget
+        self.scene_cut = scene_cut if scene_cut is not None else SceneCutDetector()
+        self.stride = self.min_stride
+        self.latency = None  # 推理耗时的指数滑动平均（秒）
+        self._since_detect = None  # 距离上次检测的帧数（None=还没检测过）
+        self.frames = 0  # 总帧数
+        self.detections = 0  # 实际运行检测的帧数
+
+    def should_detect(self, frame):
+        """按顺序传入每一帧，返回这一帧是否需要运行检测"""
+        self.frames += 1
+        cut = self.scene_cut.is_cut(frame) if self.scene_cut else False
+        if cut or self._since_detect is None or self._since_detect + 1 >= self.stride:
+            self._since_detect = 0
+            self.detections += 1
+            return True
+        self._since_detect += 1
+        return False
+
+    def record_latency(self, seconds, alpha=0.3):
+        """记录一次检测耗时，并据此调整检测间隔"""
+        self.latency = seconds if self.latency is None else (1 - alpha) * self.latency + alpha * seconds
+        needed = math.ceil(self.latency / (self.frame_interval * self.budget))
+        needed = min(self.max_stride, max(self.min_stride, needed))
+        if needed > self.stride:
+            self.stride = needed  # 跟不上：立即加大间隔
+        elif needed < self.stride:
+            self.stride -= 1  # 变快了：每次只减1，避免来回抖动
+        return self.stride
+
+    @property
+    def detect_ratio(self):
+        """实际运行检测的帧占比"""
+        return self.detections / self.frames if self.frames else 0.0
+
+    def reset(self):
+        self.stride = self.min_stride
+        self.latency = None
+        self._since_detect = None
+        self.frames = self.detections = 0
+        if self.scene_cut:
+            self.scene_cut.reset()
@@ -0,0 +1,173 @@
+"""
+设计器界面预编译：把 qtdesigner/ 下的 .ui 文件编译成Python模块，窗口直接导入，不再每次启动解析XML
+
+原来每个窗口都用 loadUi("D:/qtdesigner/xxx.ui") 在运行时解析设计器XML，路径写死在D盘，
+换台电脑或换个目录就打不开。这里统一管理界面文件：
+- 界面目录默认是仓库里的 qtdesigner/（环境变量 QTDESIGNER_DIR 可改），不再依赖D盘路径
+- .ui 用 pyuic6 同样的代码生成器（uic.compileUi）编译成 qtdesigner/ui_build/ 下的Python模块，
+  manifest.json 记录每个文件的修改时间、大小和内容SHA256：修改时间/大小变了再比对哈希，
+  内容真的变了（或PyQt版本变了）才重新编译；git检出等只改了修改时间的情况不会重编
+- setup_ui(widget, "main11111.ui") 导入编译好的界面类创建控件，控件和loadUi一样作为widget的属性；
+  编译或导入失败时退回 loadUi 解析原始 .ui 文件，窗口照常打开
+
+用法：
+    self.ui = setup_ui(self, "jiance.ui")       # 代替 loadUi("D:/qtdesigner/jiance.ui", self)
+    ui_class = load_ui_class("main11111.ui")     # 只取界面类（可在后台线程调用，不创建控件）
+    python ui_build.py [--force]                 # 预先编译全部界面（代替 qtdesigner/1.py 里手动执行pyuic6）
+"""
+import argparse
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import threading
+
+from PyQt6.QtCore import PYQT_VERSION_STR
+
+UI_DIR = os.environ.get("QTDESIGNER_DIR", os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "qtdesigner")))
+BUILD_DIR_NAME = "ui_build"  # 编译结果放在界面目录下的这个子目录
+MANIFEST_NAME = "manifest.json"
+
+_lock = threading.RLock()
+_classes = {}  # (模块路径, 内容哈希) -> 界面类
+
+
+def ui_path(name, ui_dir=None):
+    """界面文件的完整路径（name为文件名，如 "jiance.ui"；已是存在的路径时原样返回）"""
+    if os.path.isfile(name):
+        return os.path.abspath(name)
+    return os.path.join(ui_dir or UI_DIR, name)
+
+
+def _build_dir(path):
+    return os.path.join(os.path.dirname(path), BUILD_DIR_NAME)
+
+
+def _read_manifest(build_dir):
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(build_dir, manifest):
+    target = os.path.join(build_dir, MANIFEST_NAME)
+    with open(target + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(target + ".tmp", target)
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_ui(name, force=False, ui_dir=None):
+    """
+    需要时把一个.ui编译成Python模块，返回 (模块路径, 内容哈希, 是否重新编译)
+    没有变化时只比较修改时间和大小，不读文件内容
+    """
+    path = ui_path(name, ui_dir)
+    stat = os.stat(path)
+    build_dir = _build_dir(path)
+    key = os.path.basename(path)
+    module_path = os.path.join(build_dir, os.path.splitext(key)[0] + "_ui.py")
+    with _lock:
+        manifest = _read_manifest(build_dir)
+        entry = manifest.get(key) or {}
+        fresh = (not force and os.path.isfile(module_path) and entry.get("pyqt") == PYQT_VERSION_STR)
+        if fresh and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+            return module_path, entry["sha256"], False
+        digest = _sha256(path)
+        rebuilt = not (fresh and entry.get("sha256") == digest)
+        if rebuilt:
+            from PyQt6 import uic  # 只有需要编译时才导入代码生成器
+
+            code = io.StringIO()
+            uic.compileUi(path, code)
+            os.makedirs(build_dir, exist_ok=True)
+            with open(module_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(code.getvalue())
+            os.replace(module_path + ".tmp", module_path)
+        manifest[key] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": digest,
+                         "module": os.path.basename(module_path), "pyqt": PYQT_VERSION_STR}
+        _write_manifest(build_dir, manifest)
+        return module_path, digest, rebuilt
+
+
+def build_all(force=False, ui_dir=None):
+    """编译界面目录下全部.ui，返回 [(文件名, 模块路径或错误, 是否重新编译)]"""
+    ui_dir = ui_dir or UI_DIR
+    results = []
+    for name in sorted(os.listdir(ui_dir)):
+        if not name.endswith(".ui"):
+            continue
+        try:
+            module_path, _, rebuilt = build_ui(name, force=force, ui_dir=ui_dir)
+            results.append((name, module_path, rebuilt))
+        except Exception as e:
+            results.append((name, e, False))
+    return results
+
+
+def load_ui_class(name, ui_dir=None):
+    """
+    取编译好的界面类（Ui_xxx），界面文件改过时先重新编译（可在后台线程调用，不创建控件）
+    编译或导入失败时抛出异常
+    """
+    try:
+        return _import_ui_class(*build_ui(name, ui_dir=ui_dir)[:2])
+    except (SyntaxError, ImportError, ValueError):
+        # 编译结果损坏（例如写到一半程序被关掉）：强制重新编译一次
+        return _import_ui_class(*build_ui(name, force=True, ui_dir=ui_dir)[:2])
+
+
+def _import_ui_class(module_path, digest):
+    with _lock:
+        ui_class = _classes.get((module_path, digest))
+        if ui_class is None:
+            module_name = f"{BUILD_DIR_NAME}.{os.path.splitext(os.path.basename(module_path))[0]}"
+            spec = importlib.util.spec_from_file_location(module_name, module_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            classes = [value for attr, value in vars(module).items()
+                       if attr.startswith("Ui_") and isinstance(value, type)]
+            if not classes:
+                raise ValueError(f"{module_path} 中没有界面类")
+            ui_class = _classes[(module_path, digest)] = classes[0]
+        return ui_class
+
+
+def setup_ui(widget, name, ui_class=None, ui_dir=None):
+    """
+    在widget上创建设计器界面并返回widget（和 loadUi(路径, widget) 一样，控件作为widget的属性）
+    优先用编译好的界面类，编译/导入失败时退回loadUi解析.ui文件
+    """
+    if ui_class is None:
+        try:
+            ui_class = load_ui_class(name, ui_dir)
+        except Exception as e:
+            print(f"界面预编译不可用，改为运行时解析{name}：{str(e)}")
+            from PyQt6 import uic
+
+            return uic.loadUi(ui_path(name, ui_dir), widget)
+    ui = ui_class()
+    ui.setupUi(widget)
+    for attr, value in vars(ui).items():
+        setattr(widget, attr, value)
+    return widget
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把设计器界面(.ui)编译成Python模块")
+    parser.add_argument("--dir", default=UI_DIR, help="界面目录（默认仓库里的qtdesigner）")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，全部重新编译")
+    args = parser.parse_args()
+    for name, result, rebuilt in build_all(force=args.force, ui_dir=args.dir):
+        if isinstance(result, Exception):
+            print(f"❌ {name}：{str(result)}")
+        else:
+            print(f"{'✅ 已编译' if rebuilt else 'ℹ️ 无变化'} {name} -> {os.path.relpath(result, args.dir)}")
@@ -0,0 +1,237 @@
+"""
+视频显示控件：替代 QLabel.setPixmap 显示视频帧
+
+原来每帧显示要 cv2.resize → cvtColor(BGR2RGB) → QImage → QPixmap.fromImage → scaled(Smooth)，
+两次缩放加好几次整帧拷贝。VideoView 的做法：
+- 帧拷进预分配的缓冲区（尺寸不变就一直复用），缓冲区直接包装成 Format_BGR888 的 QImage，不转RGB
+- 绘制时 drawImage 到目标矩形，缩放交给绘制引擎（OpenGL可用时是一次纹理上传，由GPU缩放）
+- 检测框/标签/入侵区域作为矢量图元画在画面之上，不修改帧本身（按显示尺寸绘制，与原图分辨率无关）
+- 检测框按颜色分组一次 drawRects 画完；标签（底色块+文字）按文字和颜色缓存成小图，之后每帧只是贴图，
+  画面里几十个框时绘制耗时也基本不变
+
+用法：
+    view = replace_label(self.ui.label_ori_video)   # 替换设计器里的QLabel（位置、尺寸策略、样式不变）
+    view = create_video_view(placeholder="原始视频")  # 代码创建界面时用
+    view.set_frame(frame, boxes=BoxOverlay(xyxy, labels, colors), zones=(zone_set, pending))
+    view.clear()
+能创建OpenGL上下文时用 QOpenGLWidget，否则用普通控件软件绘制；
+环境变量 VIDEO_VIEW_OPENGL=0 可强制关闭OpenGL（远程桌面/老显卡驱动下OpenGL异常时使用）
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+from PyQt6 import QtWidgets
+from PyQt6.QtCore import QPointF, QRectF, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QImage, QOpenGLContext, QPainter, QPen, QPolygonF
+
+try:
+    from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+except ImportError:  # 没有装OpenGL模块时退回普通控件（软件绘制）
+    QOpenGLWidget = None
+
+USE_OPENGL = QOpenGLWidget is not None and os.environ.get("VIDEO_VIEW_OPENGL", "1") != "0"
+_opengl_available = None
+MAX_LABEL_CACHE = 512  # 缓存的标签小图数量上限（类别数×常见置信度取值，超出后清空重建）
+
+# 检测框叠加层：xyxy为帧坐标 (N, 4)，labels为每个框的文字，colors为每个框的BGR颜色
+BoxOverlay = namedtuple("BoxOverlay", "xyxy labels colors")
+
+
+def opengl_available():
+    """当前平台能否创建OpenGL上下文（只检测一次；需在QApplication创建之后调用）"""
+    global _opengl_available
+    if _opengl_available is None:
+        _opengl_available = USE_OPENGL and QOpenGLContext().create()
+    return _opengl_available
+
+
+class _VideoViewMixin:
+    """视频帧显示（保持宽高比居中显示，检测框和区域用矢量绘制）"""
+
+    def __init__(self, parent=None, placeholder=""):
+        super().__init__(parent)
+        self.placeholder = placeholder  # 没有画面时显示的文字
+        self.zone_color = QColor(0, 255, 255)  # 区域轮廓颜色（RGB）
+        self._buffer = None  # 预分配的帧缓冲区（BGR）
+        self._image = None  # 包装缓冲区的QImage（不拷贝）
+        self._has_frame = False
+        self._boxes = None
+        self._zones = None
+        self._pens = {}
+        self._labels = {}  # (文字, 颜色, 缩放比例) -> 标签小图（底色块+白字）
+        self._font = QFont(self.font())
+        self._font.setPixelSize(12)
+        self._metrics = QFontMetrics(self._font)
+        self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
+
+    # -------------------- 与QLabel兼容的接口 --------------------
+    def alignment(self):
+        """画面始终居中（ZoneEditor按对齐方式换算点击坐标）"""
+        return Qt.AlignmentFlag.AlignCenter
+
+    def clear(self):
+        self._has_frame = False
+        self._boxes = None
+        self._zones = None
+        self.update()
+
+    # -------------------- 显示 --------------------
+    @property
+    def frame_size(self):
+        """当前画面 (宽, 高)，没有画面返回None"""
+        if not self._has_frame:
+            return None
+        return self._buffer.shape[1], self._buffer.shape[0]
+
+    def set_frame(self, frame, boxes=None, zones=None):
+        """
+        显示一帧BGR图像（主线程调用）
+        boxes：BoxOverlay（帧坐标）；zones：(ZoneSet, 正在画的顶点)（归一化坐标）
+        """
+        if frame.ndim == 2:
+            frame = np.repeat(frame[:, :, None], 3, axis=2)
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            # 尺寸变化时才重新分配缓冲区和QImage
+            self._buffer = np.empty(frame.shape, dtype=np.uint8)
+            h, w = frame.shape[:2]
+            self._image = QImage(self._buffer.data, w, h, self._buffer.strides[0], QImage.Format.Format_BGR888)
+        np.copyto(self._buffer, frame)
+        self._has_frame = True
+        self._boxes = boxes
+        self._zones = zones
+        self.update()
+
+    def frame_rect(self):
+        """画面在控件中的显示区域（保持宽高比、居中）"""
+        size = self.frame_size
+        if size is None:
+            return QRectF(self.rect())
+        frame_w, frame_h = size
+        scale = min(self.width() / frame_w, self.height() / frame_h)
+        shown_w, shown_h = frame_w * scale, frame_h * scale
+        return QRectF((self.width() - shown_w) / 2, (self.height() - shown_h) / 2, shown_w, shown_h)
+
+    def _pen(self, color, width=2):
+        key = (color, width)
+        if key not in self._pens:
+            b, g, r = color
+            pen = QPen(QColor(r, g, b))
+            pen.setWidthF(width)
+            self._pens[key] = pen
+        return self._pens[key]
+
+    def _label_image(self, label, color):
+        """标签小图（按文字和颜色缓存，文字只在第一次出现时排版和光栅化）"""
+        ratio = self.devicePixelRatioF()  # 窗口移到不同缩放比例的屏幕上时重新生成
+        key = (label, color, ratio)
+        image = self._labels.get(key)
+        if image is None:
+            if len(self._labels) >= MAX_LABEL_CACHE:
+                self._labels.clear()
+            width, height = self._metrics.horizontalAdvance(label) + 4, self._metrics.height()
+            image = QImage(int(width * ratio), int(height * ratio), QImage.Format.Format_ARGB32_Premultiplied)
+            image.setDevicePixelRatio(ratio)
+            image.fill(self._pen(color).color())
+            painter = QPainter(image)
+            painter.setFont(self._font)
+            painter.setPen(Qt.GlobalColor.white)
+            painter.drawText(QRectF(2, 0, width - 2, height), Qt.AlignmentFlag.AlignVCenter, label)
+            painter.end()
+            self._labels[key] = image
+        return image
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        style_option = QtWidgets.QStyleOption()
+        style_option.initFrom(self)
+        painter.fillRect(self.rect(), self.palette().window())
+        self.style().drawPrimitive(QtWidgets.QStyle.PrimitiveElement.PE_Widget, style_option, painter, self)
+        if not self._has_frame:
+            if self.placeholder:
+                painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self.placeholder)
+            painter.end()
+            return
+
+        target = self.frame_rect()
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        painter.drawImage(target, self._image)
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.translate(target.topLeft())
+        if self._zones is not None:
+            self._draw_zones(painter, target.width(), target.height(), *self._zones)
+        if self._boxes is not None and len(self._boxes.labels):
+            self._draw_boxes(painter, target.width() / self._buffer.shape[1], self._boxes)
+        painter.end()
+
+    def _draw_zones(self, painter, width, height, zone_set, pending):
+        pen = QPen(self.zone_color)
+        pen.setWidthF(2)
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for zone in zone_set.zones:
+            painter.drawPolygon(QPolygonF([QPointF(x * width, y * height) for x, y in zone.points]))
+        if pending:
+            points = [QPointF(x * width, y * height) for x, y in pending]
+            pen.setWidthF(1)
+            painter.setPen(pen)
+            painter.drawPolyline(QPolygonF(points))
+            painter.setBrush(self.zone_color)
+            for point in points:
+                painter.drawEllipse(point, 3, 3)
+
+    def _draw_boxes(self, painter, scale, boxes):
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        text_h = self._metrics.height()
+        rects = np.asarray(boxes.xyxy, dtype=np.float64).reshape(-1, 4) * scale
+        colors = [tuple(color) for color in boxes.colors]
+        # 框线：同一颜色的框一次画完
+        groups = {}
+        for (x1, y1, x2, y2), color in zip(rects, colors):
+            groups.setdefault(color, []).append(QRectF(x1, y1, x2 - x1, y2 - y1))
+        for color, group in groups.items():
+            painter.setPen(self._pen(color))
+            painter.drawRects(group)
+        # 标签：贴缓存的小图，画在框的左上角外侧（贴近顶边时画在框内）
+        for (x1, y1, _, _), label, color in zip(rects, boxes.labels, colors):
+            painter.drawImage(QPointF(x1, y1 - text_h if y1 >= text_h else y1), self._label_image(label, color))
+
+
+class VideoView(_VideoViewMixin, QtWidgets.QWidget):
+    """视频显示控件（软件绘制）"""
+
+
+if QOpenGLWidget is not None:
+    class GLVideoView(_VideoViewMixin, QOpenGLWidget):
+        """视频显示控件（OpenGL绘制：帧作为纹理上传，由GPU缩放）"""
+else:
+    GLVideoView = None
+
+
+def create_video_view(parent=None, placeholder=""):
+    """创建视频显示控件：OpenGL可用时用GLVideoView，否则用VideoView"""
+    cls = GLVideoView if opengl_available() else VideoView
+    return cls(parent, placeholder=placeholder)
+
+
+def replace_label(label, placeholder=None):
+    """
+    用 VideoView 替换设计器UI里的QLabel：沿用对象名、尺寸策略、最小/最大尺寸、样式表和提示，
+    在原布局中原位替换（没有布局时沿用原几何位置）
+    """
+    parent = label.parentWidget()
+    view = create_video_view(parent, placeholder=label.text() if placeholder is None else placeholder)
+    view.setObjectName(label.objectName())
+    view.setSizePolicy(label.sizePolicy())
+    view.setMinimumSize(label.minimumSize())
+    view.setMaximumSize(label.maximumSize())
+    view.setStyleSheet(label.styleSheet())
+    view.setToolTip(label.toolTip())
+    layout = parent.layout() if parent is not None else None
+    if layout is None or layout.replaceWidget(label, view) is None:
+        view.setGeometry(label.geometry())
+    label.hide()
+    label.deleteLater()
+    view.show()
+    return view
@@ -0,0 +1,300 @@
+"""
+入侵区域：在原始视频标签上画多边形区域，只在区域内检测
+
+- Zone / ZoneSet：多边形区域（坐标按帧宽高归一化到0~1，与分辨率、标签大小无关）
+- ZoneStore：按视频源（摄像头编号/文件路径）保存区域到 zones.json
+- detect_in_zones：只把区域外接矩形裁剪出来送进模型（输入更小、推理更快），
+  检测框映射回原图坐标后，再用向量化的点在多边形内判断过滤掉区域外的目标
+- ZoneEditor：安装到QLabel上的事件过滤器，左键加点、右键闭合（没有正在画的点时右键删除最后一个区域）
+
+用法：
+    zones = ZoneSet([Zone("门口", [(0.1, 0.2), (0.5, 0.2), (0.5, 0.9), (0.1, 0.9)])])
+    xyxy, conf, cls = detect_in_zones(model, frame, zones, conf=0.25)
+"""
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QObject, QEvent, Qt, pyqtSignal
+
+from capture import redact_url
+
+ZONES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zones.json")
+
+
+class Zone:
+    """一个多边形区域（顶点为归一化坐标）"""
+
+    def __init__(self, name, points):
+        self.name = name
+        self.points = [(float(x), float(y)) for x, y in points]
+
+    def to_dict(self):
+        return {"name": self.name, "points": self.points}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("name", "区域"), data["points"])
+
+
+def points_in_polygon(points, polygon):
+    """
+    向量化射线法：points (N,2) 中每个点是否在多边形 polygon (E,2) 内，返回 (N,) bool
+    所有点和所有边一次广播计算
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0 or len(polygon) < 3:
+        return np.zeros(len(points), dtype=bool)
+    px, py = points[:, 0:1], points[:, 1:2]  # (N,1)
+    xi, yi = polygon[:, 0], polygon[:, 1]  # (E,)
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    straddle = (yi > py) != (yj > py)  # 边跨过该点所在水平线
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross_x = (xj - xi) * (py - yi) / (yj - yi) + xi
+    crossings = straddle & (px < cross_x)
+    return (crossings.sum(axis=1) % 2) == 1
+
+
+def merge_rects(rects):
+    """把相互重叠的矩形 [x1, y1, x2, y2] 合并成外接矩形，返回 [(x1, y1, x2, y2), ...]"""
+    rects = [list(rect) for rect in rects]
+    merged = True
+    while merged and len(rects) > 1:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(rect) for rect in rects if rect[2] > rect[0] and rect[3] > rect[1]]
+
+
+class ZoneSet:
+    """一个视频源的全部区域"""
+
+    def __init__(self, zones=None):
+        self.zones = list(zones or [])
+
+    def __len__(self):
+        return len(self.zones)
+
+    def __bool__(self):
+        return bool(self.zones)
+
+    def pixel_polygons(self, frame_w, frame_h):
+        """区域顶点换算成像素坐标 [(E,2) ndarray, ...]"""
+        scale = np.array([frame_w, frame_h], dtype=np.float64)
+        return [np.asarray(zone.points, dtype=np.float64) * scale for zone in self.zones if len(zone.points) >= 3]
+
+    def crop_regions(self, frame_w, frame_h, margin=16):
+        """
+        需要送进模型的裁剪区域 [(x1, y1, x2, y2), ...]：每个区域的外接矩形（外扩margin像素，
+        便于检测跨在边界上的目标），相互重叠的矩形合并成一个
+        """
+        rects = []
+        for polygon in self.pixel_polygons(frame_w, frame_h):
+            x1, y1 = np.floor(polygon.min(axis=0)) - margin
+            x2, y2 = np.ceil(polygon.max(axis=0)) + margin
+            rects.append([max(0, int(x1)), max(0, int(y1)), min(frame_w, int(x2)), min(frame_h, int(y2))])
+        return merge_rects(rects)
+
+    def contains(self, xyxy, frame_w, frame_h, anchor="bottom"):
+        """
+        检测框是否落在任一区域内，返回 (N,) bool
+        anchor="bottom"：用框底边中点（脚下位置）判断；"center"：用框中心判断
+        """
+        xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        cy = xyxy[:, 3] if anchor == "bottom" else (xyxy[:, 1] + xyxy[:, 3]) / 2
+        points = np.stack([cx, cy], axis=1)
+        inside = np.zeros(len(points), dtype=bool)
+        for polygon in self.pixel_polygons(frame_w, frame_h):
+            inside |= points_in_polygon(points, polygon)
+        return inside
+
+    def draw(self, image, color=(0, 255, 255), thickness=2):
+        """在图像上画区域轮廓（image可以是任意缩放后的帧，原地修改）"""
+        h, w = image.shape[:2]
+        for polygon in self.pixel_polygons(w, h):
+            cv2.polylines(image, [polygon.astype(np.int32)], True, color, thickness, cv2.LINE_AA)
+        return image
+
+
+def regions_imgsz(regions, max_imgsz=640):
+    """裁剪区域一批推理时的推理尺寸：按最大区域取（32的整数倍），不超过max_imgsz"""
+    longest = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in regions)
+    return min(max_imgsz, max(32, int(math.ceil(longest / 32)) * 32))
+
+
+def detect_in_regions(model, frame, regions, max_imgsz=640, **kwargs):
+    """
+    只检测若干矩形区域：裁剪 → 一批送进模型 → 框映射回原图坐标
+    regions：[(x1, y1, x2, y2), ...]，返回 (xyxy (N,4), conf (N,), cls (N,))
+    """
+    empty = (np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int))
+    if not regions:
+        return empty
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+    # 推理尺寸按最大裁剪区域取（32的整数倍），小区域不再放大到640，这才真正省计算量
+    imgsz = regions_imgsz(regions, max_imgsz)
+    kwargs.setdefault("verbose", False)
+    results = model(crops, imgsz=imgsz, **kwargs)
+
+    xyxy_list, conf_list, cls_list = [], [], []
+    for (x1, y1, _, _), result in zip(regions, results):
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+        xyxy[:, [0, 2]] += x1
+        xyxy[:, [1, 3]] += y1
+        xyxy_list.append(xyxy)
+        conf_list.append(boxes.conf.cpu().numpy().astype(np.float32))
+        cls_list.append(boxes.cls.cpu().numpy().astype(int))
+    if not xyxy_list:
+        return empty
+    return np.concatenate(xyxy_list), np.concatenate(conf_list), np.concatenate(cls_list)
+
+
+def detect_in_zones(model, frame, zone_set, margin=16, max_imgsz=640, anchor="bottom", **kwargs):
+    """
+    只在区域内检测：裁剪区域外接矩形 → 一批送进模型 → 框映射回原图 → 过滤区域外的框
+    返回 (xyxy (N,4), conf (N,), cls (N,))
+    """
+    frame_h, frame_w = frame.shape[:2]
+    regions = zone_set.crop_regions(frame_w, frame_h, margin)
+    xyxy, conf, cls = detect_in_regions(model, frame, regions, max_imgsz, **kwargs)
+    inside = zone_set.contains(xyxy, frame_w, frame_h, anchor)
+    return xyxy[inside], conf[inside], cls[inside]
+
+
+class ZoneStore:
+    """按视频源保存区域（JSON文件：{视频源: [区域, ...]}）"""
+
+    def __init__(self, path=ZONES_FILE):
+        self.path = path
+        self._data = {}
+        self.load()
+
+    @staticmethod
+    def source_key(source):
+        """视频源标识：摄像头编号 → "camera:0"，网络流 → 去掉账号密码的地址，文件 → 绝对路径"""
+        if isinstance(source, int):
+            return f"camera:{source}"
+        if "://" in str(source):
+            return redact_url(str(source), mask="")
+        return os.path.abspath(str(source))
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                # 旧文件里的网络流地址可能带账号密码：改用不含账号密码的键（下次保存时写回文件）
+                self._data = {redact_url(key, mask="") if "://" in key else key: zones for key, zones in data.items()}
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 区域文件读取失败，已忽略：{e}")
+                self._data = {}
+
+    def get(self, source):
+        return ZoneSet(Zone.from_dict(item) for item in self._data.get(self.source_key(source), []))
+
+    def set(self, source, zone_set):
+        key = self.source_key(source)
+        if zone_set:
+            self._data[key] = [zone.to_dict() for zone in zone_set.zones]
+        else:
+            self._data.pop(key, None)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+
+
+class ZoneEditor(QObject):
+    """
+    在显示视频的QLabel上画区域：左键加顶点，右键闭合当前多边形（至少3个点）；
+    没有正在画的点时右键删除最后一个区域
+    标签按KeepAspectRatio显示画面，点击位置按标签的对齐方式换算回画面归一化坐标
+    """
+    zones_changed = pyqtSignal(object)  # 区域画完/删除（参数：ZoneSet）
+
+    def __init__(self, label, zone_set=None):
+        super().__init__(label)
+        self.label = label
+        self.zone_set = zone_set or ZoneSet()
+        self.pending = []  # 正在画的多边形顶点（归一化坐标）
+        self.frame_size = None  # 当前显示画面的 (宽, 高)，由显示代码更新
+        label.installEventFilter(self)
+
+    def set_zones(self, zone_set):
+        self.zone_set = zone_set
+        self.pending = []
+
+    def snapshot(self):
+        """当前区域的副本（可以交给子线程使用）"""
+        return ZoneSet(Zone(zone.name, zone.points) for zone in self.zone_set.zones), list(self.pending)
+
+    def _to_normalized(self, pos):
+        """标签坐标 → 画面归一化坐标（点在画面外返回None）"""
+        if not self.frame_size:
+            return None
+        frame_w, frame_h = self.frame_size
+        label_w, label_h = self.label.width(), self.label.height()
+        scale = min(label_w / frame_w, label_h / frame_h)
+        shown_w, shown_h = frame_w * scale, frame_h * scale
+        align = self.label.alignment()
+        if align & Qt.AlignmentFlag.AlignHCenter:
+            left = (label_w - shown_w) / 2
+        elif align & Qt.AlignmentFlag.AlignRight:
+            left = label_w - shown_w
+        else:
+            left = 0
+        if align & Qt.AlignmentFlag.AlignVCenter:
+            top = (label_h - shown_h) / 2
+        elif align & Qt.AlignmentFlag.AlignBottom:
+            top = label_h - shown_h
+        else:
+            top = 0
+        x, y = (pos.x() - left) / shown_w, (pos.y() - top) / shown_h
+        if 0 <= x <= 1 and 0 <= y <= 1:
+            return x, y
+        return None
+
+    def eventFilter(self, obj, event):
+        if obj is self.label and event.type() == QEvent.Type.MouseButtonPress:
+            if event.button() == Qt.MouseButton.LeftButton:
+                point = self._to_normalized(event.position())
+                if point is not None:
+                    self.pending.append(point)
+                return True
+            if event.button() == Qt.MouseButton.RightButton:
+                if len(self.pending) >= 3:
+                    self.zone_set.zones.append(Zone(f"区域{len(self.zone_set) + 1}", self.pending))
+                    self.pending = []
+                    self.zones_changed.emit(self.zone_set)
+                elif self.pending:
+                    self.pending = []  # 不足3个点，放弃
+                elif self.zone_set.zones:
+                    self.zone_set.zones.pop()
+                    self.zones_changed.emit(self.zone_set)
+                return True
+        return super().eventFilter(obj, event)
+
+
+def draw_pending(image, points, color=(0, 255, 255), radius=3):
+    """画正在编辑的多边形顶点和连线（归一化坐标，原地修改）"""
+    if not points:
+        return image
+    h, w = image.shape[:2]
+    pixel = (np.asarray(points) * [w, h]).astype(np.int32)
+    cv2.polylines(image, [pixel], False, color, 1, cv2.LINE_AA)
+    for x, y in pixel:
+        cv2.circle(image, (int(x), int(y)), radius, color, -1)
+    return image
@@ -1,11 +1,11 @@
 from PyQt6.QtWidgets import QApplication, QMainWindow  # 导入QMainWindow
-from PyQt6.uic import loadUi
+from ui_build import setup_ui
 
 class Stats(QMainWindow):  # 继承QMainWindow
     def __init__(self):
         super().__init__()
         # 用QMainWindow作为基类加载UI
-        self.ui = loadUi("D:/qtdesigner/yiyuan.ui", self)  # 直接传self（当前QMainWindow实例）
+        self.ui = setup_ui(self, "yiyuan.ui")  # 直接传self（当前QMainWindow实例）
 
 if __name__ == "__main__":
     app = QApplication([])
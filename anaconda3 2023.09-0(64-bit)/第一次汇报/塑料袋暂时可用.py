@@ -10,7 +10,12 @@ import cv2
 os.environ['YOLO_VERBOSE'] = 'False'
 from ultralytics import YOLO
 
+from batch_infer import analyze_video_batched
+
 class Stats(QWidget):
+    # 离线批量分析每批帧数（CPU上8~16较合适，可用batch_infer.py测速）；0=不询问，始终逐帧检测并显示画面
+    OFFLINE_BATCH_SIZE = 8
+
     def __init__(self):
         super().__init__()
         # 加载UI文件（请确保路径正确）
@@ -229,6 +234,16 @@ class Stats(QWidget):
         self.detected_plastic_bag = False
         max_confidence = 0.0
 
+        # 录像可选离线批量分析（不逐帧显示画面，速度更快）
+        if self.OFFLINE_BATCH_SIZE > 0:
+            reply = QMessageBox.question(
+                self, "检测模式",
+                f"是否使用离线批量分析（每批{self.OFFLINE_BATCH_SIZE}帧，不逐帧显示画面，速度更快）？"
+            )
+            if reply == QMessageBox.StandardButton.Yes:
+                self.scan_video_batched(file_path)
+                return
+
         # 打开视频文件
         self.cap = cv2.VideoCapture(file_path)
         if not self.cap.isOpened():
@@ -338,6 +353,39 @@ class Stats(QWidget):
                 f"最高置信度：{max_confidence:.2f}"
             )
 
+    def scan_video_batched(self, file_path):
+        """离线批量分析：解码线程提前读帧，每OFFLINE_BATCH_SIZE帧送一次模型"""
+        def on_progress(done, total, fps):
+            if hasattr(self.ui, "label_video_name"):
+                self.ui.label_video_name.setText(f"正在分析：{os.path.basename(file_path)}（{done}/{total}帧，{fps:.1f}帧/秒）")
+            QApplication.processEvents()  # 处理UI事件（避免界面卡顿）
+
+        models = [("bag", self.yolo_model, {"classes": [24, 26, 41], "conf": 0.3})]
+        try:
+            analysis = analyze_video_batched(file_path, models, batch_size=self.OFFLINE_BATCH_SIZE, on_progress=on_progress)
+        except IOError as e:
+            QMessageBox.warning(self, "视频错误", str(e))
+            return
+        print(f"离线批量分析：{analysis.frame_count}帧，{analysis.elapsed:.1f}秒，"
+              f"{analysis.fps:.1f}帧/秒（批大小{analysis.batch_size}）")
+
+        # 汇总结果：每帧结果已按帧号对应，取所有帧的最高置信度
+        max_confidence = max(analysis.max_confidence("bag").values(), default=0.0)
+        self.detected_plastic_bag = bool(analysis.hit_frames("bag"))
+        if self.detected_plastic_bag:
+            QMessageBox.warning(
+                self,
+                "检测警告",
+                f"在视频《{os.path.basename(file_path)}》中检测到塑料袋！\n"
+                f"最高置信度：{max_confidence:.2f}（首次出现于第{analysis.hit_frames('bag')[0]}帧）"
+            )
+        else:
+            QMessageBox.information(
+                self,
+                "检测结果",
+                f"在视频《{os.path.basename(file_path)}》中未检测到塑料袋。\n"
+                f"最高置信度：{max_confidence:.2f}"
+            )
 
 if __name__ == "__main__":
     # 解决Qt高DPI显示问题（避免高分屏界面模糊）
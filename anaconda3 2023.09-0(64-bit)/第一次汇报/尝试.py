@@ -16,12 +16,12 @@ from utils.general import non_max_suppression, scale_boxes  # YOLOv5检测后处
 from utils.plots import Annotator  # YOLOv5绘制检测框
 from ultralytics import YOLO  # YOLOv8加载库
 from PyQt6.QtWidgets import (QApplication, QWidget, QFileDialog, QMessageBox, QCheckBox, QLabel)
-from PyQt6.QtGui import QImage, QPixmap
 from PyQt6.QtCore import Qt
 from PyQt6.uic import loadUi
 import cv2
 import torch
 import numpy as np
+from video_widget import replace_label
 
 # 关闭YOLO调试信息
 os.environ['YOLO_VERBOSE'] = 'False'
@@ -75,6 +75,10 @@ class Stats(QWidget):
         self.label_treated = getattr(self.ui, "label_treated", None)
         if not self.label_ori_video or not self.label_treated:
             QMessageBox.warning(self, "控件警告", "未找到视频显示标签，请检查UI控件名")
+        else:
+            # 原位替换为视频显示控件（BGR帧直接上传，由控件保持宽高比缩放）
+            self.label_ori_video = replace_label(self.label_ori_video)
+            self.label_treated = replace_label(self.label_treated)
 
     def bind_events(self):
         """绑定事件（保持原逻辑）"""
@@ -125,10 +129,7 @@ class Stats(QWidget):
 
             # -------------------------- 步骤1：显示原始视频（保持原逻辑） --------------------------
             if self.label_ori_video:
-                ori_resized = cv2.resize(frame, (self.label_ori_video.width(), self.label_ori_video.height()))
-                ori_rgb = cv2.cvtColor(ori_resized, cv2.COLOR_BGR2RGB)
-                qt_ori = QImage(ori_rgb.data, ori_rgb.shape[1], ori_rgb.shape[0], QImage.Format.Format_RGB888)
-                self.label_ori_video.setPixmap(QPixmap.fromImage(qt_ori))
+                self.label_ori_video.set_frame(frame)
 
             # -------------------------- 步骤2：YOLOv5检测（头盔/人头/人体） --------------------------
             # 预处理帧（适配YOLOv5输入格式）
@@ -185,10 +186,7 @@ class Stats(QWidget):
 
             # -------------------------- 步骤4：显示最终检测结果（双模型叠加） --------------------------
             if self.label_treated:
-                treated_resized = cv2.resize(frame_final, (self.label_treated.width(), self.label_treated.height()))
-                treated_rgb = cv2.cvtColor(treated_resized, cv2.COLOR_BGR2RGB)
-                qt_treated = QImage(treated_rgb.data, treated_rgb.shape[1], treated_rgb.shape[0], QImage.Format.Format_RGB888)
-                self.label_treated.setPixmap(QPixmap.fromImage(qt_treated))
+                self.label_treated.set_frame(frame_final)
 
             # 处理UI事件，避免卡顿
             QApplication.processEvents()
@@ -1,8 +1,6 @@
 from PyQt6.QtWidgets import (QApplication, QWidget, QFileDialog,
                              QMessageBox, QCheckBox, QLabel)
-from PyQt6.QtGui import QImage, QPixmap
 from PyQt6.QtCore import Qt
-from PyQt6.uic import loadUi
 import sys
 import os
 import cv2
@@ -10,13 +8,25 @@ from models.experimental import attempt_load
 from utils.torch_utils import select_device
 # 关闭YOLO调试信息
 os.environ['YOLO_VERBOSE'] = 'False'
-from ultralytics import YOLO
+from backends import DEFAULT_BACKEND
+from batch_infer import analyze_video_batched
+from model_registry import get_registry
+from multi_model import MultiModelExecutor
+from video_widget import BoxOverlay, replace_label
+from ui_build import setup_ui
 
 class Stats(QWidget):
+    # 推理后端：pytorch / onnx / onnx-int8 / openvino（默认取环境变量YOLO_BACKEND）
+    INFERENCE_BACKEND = DEFAULT_BACKEND
+    # 分辨率级联：先按该尺寸粗检，临界候选区域再全分辨率复检（None=每帧都按640检测）
+    CASCADE_IMGSZ = 320
+    # 离线批量分析每批帧数（CPU上8~16较合适，可用batch_infer.py测速）；0=不询问，始终逐帧检测并显示画面
+    OFFLINE_BATCH_SIZE = 8
+
     def __init__(self):
         super().__init__()
-        # 加载UI文件（请确保路径正确）
-        self.ui = loadUi("D:/qtdesigner/main11111.ui", self)
+        # 加载UI（qtdesigner目录下的界面，优先用编译好的界面模块）
+        self.ui = setup_ui(self, "main11111.ui")
 
         # 初始化核心组件（关键：获取原始视频标签和检测后视频标签）
         self.init_components()
@@ -29,11 +39,26 @@ class Stats(QWidget):
         # -------------------------- 关键修改1：加载双模型（塑料袋+头盔检测） --------------------------
         try:
             # 1. 原塑料袋检测模型（yolov8n.pt，检测24=手提箱、26=手提包、41=购物袋）
-            self.yolo_bag_model = YOLO('yolov8n.pt')
+            registry = get_registry()
+            self.yolo_bag_model = registry.get('yolov8n.pt', backend=self.INFERENCE_BACKEND)
             # 2. 新增头盔检测模型（helmet_head_person_s.pt，需确保路径正确）
             # 若权重在项目根目录，直接写文件名；否则写绝对路径（如"D:/yolov5/helmet_head_person_s.pt"）
-            self.yolo_helmet_model = YOLO('D:\yolov5\yolov5-master/helmet_head_person_s.pt')
-            print("双YOLO模型加载成功（塑料袋+头盔检测）")
+            self.yolo_helmet_model = registry.get('D:\yolov5\yolov5-master/helmet_head_person_s.pt',
+                                                  backend=self.INFERENCE_BACKEND)
+            # 模型句柄是懒加载的，这里预热一次，权重有问题时在启动阶段就能发现
+            self.yolo_bag_model.warmup()
+            self.yolo_helmet_model.warmup()
+            print(f"双YOLO模型加载成功（塑料袋+头盔检测，推理后端：{self.INFERENCE_BACKEND}）")
+            # 3. 双模型并行执行器：每帧只做一次letterbox预处理，两个模型同时推理，合并结果后一次画框
+            self.detector = MultiModelExecutor(
+                [
+                    ("bag", self.yolo_bag_model, {"classes": [24, 26, 41], "conf": 0.3}),
+                    ("helmet", self.yolo_helmet_model, {"conf": 0.3}),
+                ],
+                # 头盔相关检测框用不同颜色，避免与塑料袋框混淆（BGR）：0=person(蓝)、1=head(红)、2=helmet(绿)
+                colors={"helmet": {0: (255, 0, 0), 1: (0, 0, 255), 2: (0, 255, 0)}},
+                low_imgsz=self.CASCADE_IMGSZ
+            )
         except Exception as e:
             QMessageBox.critical(self, "模型错误", f"YOLO模型加载失败：{str(e)}\n请检查helmet_head_person_s.pt路径")
             sys.exit(1)
@@ -50,11 +75,15 @@ class Stats(QWidget):
         self.label_ori_video = getattr(self.ui, "label_ori_video", None)
         if not self.label_ori_video:
             QMessageBox.warning(self, "控件警告", "未找到原始视频标签'label_ori_video'，请检查UI控件名")
+        else:
+            self.label_ori_video = replace_label(self.label_ori_video)  # 原位替换为视频显示控件
 
         # 获取“检测后视频显示标签”（label_treated，按需求指定）
         self.label_treated = getattr(self.ui, "label_treated", None)
         if not self.label_treated:
             QMessageBox.warning(self, "控件警告", "未找到检测后视频标签'label_treated'，请检查UI控件名")
+        else:
+            self.label_treated = replace_label(self.label_treated)
         # ----------------------------------------------------------------------------------
 
     def bind_events(self):
@@ -116,6 +145,16 @@ class Stats(QWidget):
         max_head_conf = 0.0      # 人头最高置信度
         max_person_conf = 0.0    # 人体最高置信度
 
+        # 录像可选离线批量分析（不逐帧显示画面，速度更快）
+        if self.OFFLINE_BATCH_SIZE > 0:
+            reply = QMessageBox.question(
+                self, "检测模式",
+                f"是否使用离线批量分析（每批{self.OFFLINE_BATCH_SIZE}帧，不逐帧显示画面，速度更快）？"
+            )
+            if reply == QMessageBox.StandardButton.Yes:
+                self.scan_video_batched(file_path)
+                return
+
         # 打开视频文件
         self.cap = cv2.VideoCapture(file_path)
         if not self.cap.isOpened():
@@ -132,102 +171,39 @@ class Stats(QWidget):
 
             # -------------------------- 1. 原始帧显示到label_ori_video（保持不变） --------------------------
             if self.label_ori_video:
-                ori_label_size = self.label_ori_video.size()
-                if ori_label_size.width() > 0 and ori_label_size.height() > 0:
-                    frame_ori_resized = cv2.resize(frame, (ori_label_size.width(), ori_label_size.height()))
-                else:
-                    frame_ori_resized = cv2.resize(frame, (640, 480))
-
-                frame_ori_rgb = cv2.cvtColor(frame_ori_resized, cv2.COLOR_BGR2RGB)
-                h_ori, w_ori, ch_ori = frame_ori_rgb.shape
-                bytes_per_line_ori = ch_ori * w_ori
-
-                qt_img_ori = QImage(
-                    frame_ori_rgb.data, w_ori, h_ori, bytes_per_line_ori,
-                    QImage.Format.Format_RGB888
-                )
-                qt_pix_ori = QPixmap.fromImage(qt_img_ori).scaled(
-                    self.label_ori_video.size(),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.label_ori_video.setPixmap(qt_pix_ori)
+                self.label_ori_video.set_frame(frame)  # BGR帧直接上传，由显示控件缩放
             # ----------------------------------------------------------------------------------
 
-            # -------------------------- 关键修改2：双模型检测（塑料袋+头盔/人头/人体） --------------------------
-            # 1. 塑料袋检测（原逻辑不变，检测24=手提箱、26=手提包、41=购物袋）
-            bag_results = self.yolo_bag_model(frame, classes=[24,26, 41], conf=0.3)
-            # 2. 头盔/人头/人体检测（用helmet_head_person_s.pt，默认检测所有类别，conf=0.3过滤低置信度）
-            # 假设你的权重类别顺序：0=person（人体）、1=head（人头）、2=helmet（头盔）（若不同需调整）
-            helmet_results = self.yolo_helmet_model(frame, conf=0.3)
-
-            # 3. 合并检测结果：先绘制塑料袋检测框，再绘制头盔相关检测框（避免覆盖）
-            # 复制原始帧作为基础，分别叠加两个模型的检测框
-            merged_frame = frame.copy()
-            # 叠加塑料袋检测框（用默认颜色）
-            merged_frame = bag_results[0].plot(line_width=2, font_size=12, img=merged_frame)
-            # 叠加头盔相关检测框（可自定义颜色，避免与塑料袋框混淆，如头盔=绿色、人头=红色、人体=蓝色）
-            merged_frame = helmet_results[0].plot(
-                line_width=2,
-                font_size=12,
-                img=merged_frame,
-                colors=[(255,0,0), (0,0,255), (0,255,0)]  # 类别颜色：0=person(蓝)、1=head(红)、2=helmet(绿)
-            )
+            # -------------------------- 关键修改2：双模型并行检测（塑料袋+头盔/人头/人体） --------------------------
+            # 两个模型共用一次预处理、同时推理，结果合并为一个检测结果
+            # 头盔权重类别顺序：0=person（人体）、1=head（人头）、2=helmet（头盔）（若不同需调整）
+            merged = self.detector.run(frame)
             # ----------------------------------------------------------------------------------
 
             # -------------------------- 关键修改3：更新检测标记和最高置信度（双模型） --------------------------
-            # 更新塑料袋检测标记和置信度
-            if len(bag_results[0].boxes) > 0:
+            current_bag_conf = merged.max_confidence("bag")
+            if current_bag_conf > 0:
                 self.detected_plastic_bag = True
-                current_bag_conf = max(box.conf[0].item() for box in bag_results[0].boxes)
-                if current_bag_conf > max_bag_conf:
-                    max_bag_conf = current_bag_conf
-
-            # 更新头盔/人头/人体检测标记和置信度（需匹配权重的类别顺序）
-            for box in helmet_results[0].boxes:
-                cls = int(box.cls[0].item())  # 获取类别索引
-                conf = box.conf[0].item()     # 获取置信度
-                # 假设类别顺序：0=person（人体）、1=head（人头）、2=helmet（头盔）（若你的权重类别顺序不同，需修改cls对应的含义）
-                if cls == 0:  # 人体
-                    self.detected_person = True
-                    if conf > max_person_conf:
-                        max_person_conf = conf
-                elif cls == 1:  # 人头
-                    self.detected_head = True
-                    if conf > max_head_conf:
-                        max_head_conf = conf
-                elif cls == 2:  # 头盔
-                    self.detected_helmet = True
-                    if conf > max_helmet_conf:
-                        max_helmet_conf = conf
+                max_bag_conf = max(max_bag_conf, current_bag_conf)
+
+            current_person_conf = merged.max_confidence("helmet", cls=0)
+            current_head_conf = merged.max_confidence("helmet", cls=1)
+            current_helmet_conf = merged.max_confidence("helmet", cls=2)
+            if current_person_conf > 0:  # 人体
+                self.detected_person = True
+                max_person_conf = max(max_person_conf, current_person_conf)
+            if current_head_conf > 0:  # 人头
+                self.detected_head = True
+                max_head_conf = max(max_head_conf, current_head_conf)
+            if current_helmet_conf > 0:  # 头盔
+                self.detected_helmet = True
+                max_helmet_conf = max(max_helmet_conf, current_helmet_conf)
             # ----------------------------------------------------------------------------------
 
-            # -------------------------- 4. 合并检测帧显示到label_treated（用merged_frame） --------------------------
+            # -------------------------- 4. 检测结果显示到label_treated（两个模型的检测框矢量叠加，不在帧上画） --------------------------
             if self.label_treated:
-                treated_label_size = self.label_treated.size()
-                if treated_label_size.width() > 0 and treated_label_size.height() > 0:
-                    frame_treated_resized = cv2.resize(merged_frame,
-                                                       (treated_label_size.width(), treated_label_size.height()))
-                else:
-                    frame_treated_resized = cv2.resize(merged_frame, (640, 480))
-
-                frame_treated_rgb = cv2.cvtColor(frame_treated_resized, cv2.COLOR_BGR2RGB)
-                h_treated, w_treated, ch_treated = frame_treated_rgb.shape
-                bytes_per_line_treated = ch_treated * w_treated
-
-                qt_img_treated = QImage(
-                    frame_treated_rgb.data,
-                    w_treated,
-                    h_treated,
-                    bytes_per_line_treated,
-                    QImage.Format.Format_RGB888
-                )
-                qt_pix_treated = QPixmap.fromImage(qt_img_treated).scaled(
-                    self.label_treated.size(),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.label_treated.setPixmap(qt_pix_treated)
+                overlay = BoxOverlay(merged.xyxy, merged.labels(), self.detector.box_colors(merged))
+                self.label_treated.set_frame(frame, boxes=overlay)
             # ----------------------------------------------------------------------------------
 
             # 处理UI事件（避免界面卡顿，单线程视频播放必需）
@@ -236,6 +212,10 @@ class Stats(QWidget):
         # -------------------------- 关键修改4：检测结果提示（同时显示双模型结果） --------------------------
         # 释放资源
         self.cap.release()
+        if self.detector.cascades:
+            ratios = "，".join(f"{name}{cascade.refine_ratio:.0%}"
+                              for (name, _, _), cascade in zip(self.detector.models, self.detector.cascades))
+            print(f"分辨率级联：需要全分辨率复检的帧占比 {ratios}")
         # 构建结果提示文本
         result_text = f"视频《{os.path.basename(file_path)}》检测结果：\n"
         # 塑料袋结果
@@ -255,6 +235,52 @@ class Stats(QWidget):
             QMessageBox.information(self, "检测结果", result_text)
         # ----------------------------------------------------------------------------------
 
+    def scan_video_batched(self, file_path):
+        """离线批量分析：解码线程提前读帧，每OFFLINE_BATCH_SIZE帧送一次模型"""
+        def on_progress(done, total, fps):
+            if hasattr(self.ui, "label_video_name"):
+                self.ui.label_video_name.setText(f"正在分析：{os.path.basename(file_path)}（{done}/{total}帧，{fps:.1f}帧/秒）")
+            QApplication.processEvents()  # 处理UI事件（避免界面卡顿）
+
+        models = [
+            ("bag", self.yolo_bag_model, {"classes": [24, 26, 41], "conf": 0.3}),
+            ("helmet", self.yolo_helmet_model, {"conf": 0.3}),
+        ]
+        try:
+            analysis = analyze_video_batched(file_path, models, batch_size=self.OFFLINE_BATCH_SIZE, on_progress=on_progress)
+        except IOError as e:
+            QMessageBox.warning(self, "视频错误", str(e))
+            return
+        print(f"离线批量分析：{analysis.frame_count}帧，{analysis.elapsed:.1f}秒，"
+              f"{analysis.fps:.1f}帧/秒（批大小{analysis.batch_size}）")
+
+        # 汇总结果（头盔模型类别顺序：0=person（人体）、1=head（人头）、2=helmet（头盔））
+        max_bag_conf = max(analysis.max_confidence("bag").values(), default=0.0)
+        max_helmet_conf = [0.0, 0.0, 0.0]
+        for per_model in analysis.frames.values():
+            for det in per_model.get("helmet", []):
+                if det["cls"] < 3 and det["conf"] > max_helmet_conf[det["cls"]]:
+                    max_helmet_conf[det["cls"]] = det["conf"]
+        max_person_conf, max_head_conf, max_helmet_conf = max_helmet_conf
+        self.detected_plastic_bag = bool(analysis.hit_frames("bag"))
+        self.detected_person = max_person_conf > 0
+        self.detected_head = max_head_conf > 0
+        self.detected_helmet = max_helmet_conf > 0
+
+        result_text = f"视频《{os.path.basename(file_path)}》检测结果：\n"
+        if self.detected_plastic_bag:
+            result_text += f"- 塑料袋/手提包：已检测到（最高置信度：{max_bag_conf:.2f}）\n"
+        else:
+            result_text += f"- 塑料袋/手提包：未检测到\n"
+        result_text += f"- 人体：{f'已检测到（最高置信度：{max_person_conf:.2f}）' if self.detected_person else '未检测到'}\n"
+        result_text += f"- 人头：{f'已检测到（最高置信度：{max_head_conf:.2f}）' if self.detected_head else '未检测到'}\n"
+        result_text += f"- 头盔：{f'已检测到（最高置信度：{max_helmet_conf:.2f}）' if self.detected_helmet else '未检测到'}\n"
+        result_text += f"（离线批量分析：{analysis.frame_count}帧，{analysis.fps:.1f}帧/秒）\n"
+
+        if self.detected_plastic_bag:
+            QMessageBox.warning(self, "检测警告", result_text)
+        else:
+            QMessageBox.information(self, "检测结果", result_text)
 
 if __name__ == "__main__":
     # 解决Qt高DPI显示问题（避免高分屏界面模糊）
@@ -1,6 +1,6 @@
 from PyQt6 import QtWidgets, QtCore, QtGui
 from PyQt6.QtWidgets import QApplication, QWidget, QMessageBox, QMainWindow, QFileDialog
-from PyQt6.uic import loadUi
+from ui_build import setup_ui
 from PyQt6.QtCore import QThread, pyqtSignal
 import sys
 import cv2
@@ -13,6 +13,10 @@ from PyQt6.QtCore import pyqtSignal
 os.environ['YOLO_VERBOSE'] = 'False'
 from ultralytics import YOLO
 
+from pipeline import StageGraph, Stage
+from detection_events import DetectionEventEngine, ENTER
+from database import ACCOUNT_DB, get_pool
+
 
 # 共享实例类
 class SI:
@@ -29,32 +33,23 @@ class LoginThread(QThread):
         self.username = username
         self.password = password
 
-        # 数据库连接配置
-        self.db_config = {
-            "host": "localhost",
-            "port": 3306,
-            "user": "root",
-            "password": "576499183",
-            "database": "detection_system",
-            "charset": "utf8mb4"
-        }
-
     def run(self):
         print("子线程：开始执行数据库查询...")
         try:
-            # 连接数据库
-            conn = pymysql.connect(**self.db_config)
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-            # 查询SQL
-            sql = """
-                SELECT * 
-                FROM user 
-                WHERE account = %s 
-                  AND password = %s
-            """
-            cursor.execute(sql, (self.username, self.password))
-            result = cursor.fetchone()
+            # 从共享连接池借连接（登录窗口显示时已预先连接；连接配置见database.py）
+            with get_pool(ACCOUNT_DB).connection(timeout=10) as conn:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+
+                # 查询SQL
+                sql = """
+                    SELECT * 
+                    FROM user 
+                    WHERE account = %s 
+                      AND password = %s
+                """
+                cursor.execute(sql, (self.username, self.password))
+                result = cursor.fetchone()
+                cursor.close()
 
             # 验证逻辑
             if result:
@@ -62,10 +57,6 @@ class LoginThread(QThread):
             else:
                 self.result_signal.emit(False, "账号或密码错误")
 
-            # 关闭连接
-            cursor.close()
-            conn.close()
-
         except pymysql.MySQLError as e:
             print(f"子线程：数据库错误: {str(e)}")
             self.result_signal.emit(False, f"数据库错误：{str(e)}")
@@ -80,7 +71,7 @@ class Win_Login(QWidget):
         super().__init__()
         try:
             # 加载UI文件
-            self.ui = loadUi("D:/qtdesigner/jiance.ui", self)
+            self.ui = setup_ui(self, "jiance.ui")
             print("登录窗口：UI文件加载成功")
         except Exception as e:
             print(f"登录窗口：UI加载失败: {str(e)}")
@@ -96,6 +87,11 @@ class Win_Login(QWidget):
             print(f"登录窗口：控件不存在: {str(e)}")
             QMessageBox.critical(self, "错误", f"控件不存在：{str(e)}")
 
+    def showEvent(self, event):
+        """登录窗口显示时在后台预先连接数据库"""
+        super().showEvent(event)
+        get_pool(ACCOUNT_DB).prewarm()
+
     def onSignIn(self):
         print("\n登录按钮被点击，开始处理...")
         try:
@@ -143,12 +139,16 @@ class Win_Main(QWidget):
         super().__init__()
         self.update_detected_signal.connect(self.update_detected_image)
         self.update_log_signal.connect(self.append_log)
+        # 检测事件：逐帧类别去抖动成进入/离开事件，日志只在目标进入/离开时输出
+        self.event_engine = DetectionEventEngine(min_seconds=0.5, class_min_seconds={"person": 1.0},
+                                                 exit_seconds=2.0, parent=self)
+        self.event_engine.event_signal.connect(self.handleDetectionEvent)
         #待停止状态标记（避免延迟期间重复操作或继续处理帧）
         self.is_stopping = False  # False=正常运行，True=已点击停止，等待1秒后结束
         # 尝试加载UI文件，如果失败则使用代码创建UI
         self.use_designer_ui = True
         try:
-            self.ui = loadUi("D:/qtdesigner/main11111.ui", self)
+            self.ui = setup_ui(self, "main11111.ui")
             print("主窗口：UI加载成功")
             self.setupDesignerUI()
         except Exception as e:
@@ -189,6 +189,13 @@ class Win_Main(QWidget):
     def append_log(self, text):
         """主线程中添加日志（安全操作UI）"""
         self.textLog.append(text)
+
+    def handleDetectionEvent(self, event):
+        """检测事件（主线程）：目标进入/离开画面时记录日志"""
+        if event.kind == ENTER:
+            self.append_log(f"🔍 检测到：{event.describe()}")
+        else:
+            self.append_log(f"ℹ️ {event.describe()}")
     def initYOLOComponents(self):
         """初始化YOLO相关组件"""
         # 定义定时器，控制视频显示帧率
@@ -203,11 +210,8 @@ class Win_Main(QWidget):
             self.textLog.append(f"❌ YOLO模型加载失败: {str(e)}")
             QMessageBox.critical(self, "错误", f"YOLO模型加载失败：{str(e)}")
 
-        # 视频帧处理队列
-        self.frameToAnalyze = []
-
-        # 启动帧分析线程
-        Thread(target=self.frameAnalyzeThreadFunc, daemon=True).start()
+        # 帧分析流水线（推理→画框转QImage 两个阶段并行，替代原来的列表队列+单个分析线程）
+        self.pipeline = self.buildAnalyzePipeline()
 
         # 视频捕获对象
         self.cap = None
@@ -317,11 +321,11 @@ class Win_Main(QWidget):
             # 帧入队前检查是否已进入停止流程
             if self.is_stopping:
                 return  # 不加入新帧
-            if len(self.frameToAnalyze) < 2:
-                self.frameToAnalyze.append(frame_rgb)
-                self.update_log_signal.emit(f"ℹ️ 帧加入队列，当前队列长度：{len(self.frameToAnalyze)}")
+            # 非阻塞提交，流水线满了直接丢帧（保证画面实时）
+            if self.pipeline.submit(frame_rgb, block=False) is not None:
+                self.update_log_signal.emit(f"ℹ️ 帧加入队列，当前队列长度：{self.pipeline.pending}")
             else:
-                self.update_log_signal.emit(f"⚠️ 队列已满（{len(self.frameToAnalyze)}帧），丢弃当前帧")
+                self.update_log_signal.emit(f"⚠️ 队列已满（{self.pipeline.pending}帧），丢弃当前帧")
 
         except Exception as e:
             # 若已进入停止流程，不输出错误日志
@@ -331,45 +335,40 @@ class Win_Main(QWidget):
                 print(f"【帧读取异常】{err_msg}")
             self.stop()
 
-    def frameAnalyzeThreadFunc(self):
-        """帧分析线程：延迟期间不处理帧"""
-        while True:
-            # 若已进入停止流程，短暂休眠后继续循环（避免CPU占用）
-            if self.is_stopping:
-                time.sleep(0.1)
-                continue
-
-            # 原有逻辑：检查队列是否为空
-            if not self.frameToAnalyze:
-                time.sleep(0.01)
-                continue
-
-            try:
-                frame = self.frameToAnalyze.pop(0)
-                results = self.model(frame)[0]
-                img_with_boxes = results.plot(line_width=1)
-
-                # 转换为QImage并更新界面
-                q_img = QtGui.QImage(
-                    img_with_boxes.data,
-                    img_with_boxes.shape[1],
-                    img_with_boxes.shape[0],
-                    QtGui.QImage.Format.Format_RGB888
-                )
-                self.update_detected_signal.emit(q_img)
-
-                # 输出检测日志前检查是否已停止
-                if not self.is_stopping:
-                    detected_classes = [results.names[int(cls)] for cls in results.boxes.cls]
-                    if detected_classes:
-                        self.update_log_signal.emit(f"🔍 检测到：{', '.join(set(detected_classes))}")
-
-            except Exception as e:
-                # 若已进入停止流程，不输出错误日志
-                if not self.is_stopping:
-                    self.update_log_signal.emit(f"❌ 帧处理错误：{str(e)}")
-                    print(f"帧分析线程异常：{e}")
-
+    def buildAnalyzePipeline(self):
+        """创建帧分析流水线：推理阶段1个线程（共用一个模型），画框阶段2个线程，输出按帧序号排序"""
+        return StageGraph([
+            Stage("infer", self.inferFrame),
+            Stage("postprocess", self.postprocessFrame, workers=2),
+        ], on_result=self.renderFrame, queue_size=2,
+            on_error=lambda stage, seq, e: self.update_log_signal.emit(f"❌ 帧处理错误：{str(e)}")).start()
+
+    def inferFrame(self, frame):
+        """推理阶段：YOLO检测"""
+        return self.model(frame)[0]
+
+    def postprocessFrame(self, results):
+        """后处理阶段：画检测框、转QImage、提取各类别的最高置信度"""
+        img_with_boxes = results.plot(line_width=1)
+        q_img = QtGui.QImage(
+            img_with_boxes.data,
+            img_with_boxes.shape[1],
+            img_with_boxes.shape[0],
+            QtGui.QImage.Format.Format_RGB888
+        ).copy()  # 复制一份，避免numpy数组释放后QImage悬空
+        class_confs = {}
+        for cls, conf in zip(results.boxes.cls.tolist(), results.boxes.conf.tolist()):
+            name = results.names[int(cls)]
+            class_confs[name] = max(conf, class_confs.get(name, 0.0))
+        return q_img, class_confs
+
+    def renderFrame(self, seq, payload):
+        """输出阶段：通过信号交给主线程更新界面，检测结果交给检测事件（延迟停止期间不再输出）"""
+        if self.is_stopping:
+            return
+        q_img, class_confs = payload
+        self.update_detected_signal.emit(q_img)
+        self.event_engine.update(class_confs)
 
     def stop(self):
         """停止视频流和分析：延迟1秒后执行真正的资源释放"""
@@ -399,9 +398,14 @@ class Win_Main(QWidget):
         self.label_ori_video.clear()
         self.label_treated.clear()
 
-        # 清空帧队列（避免延迟期间残留的帧继续触发分析）
-        if hasattr(self, 'frameToAnalyze'):
-            self.frameToAnalyze.clear()
+        # 重建分析流水线（丢弃延迟期间残留的帧，避免继续触发分析）
+        if hasattr(self, 'pipeline'):
+            self.pipeline.stop()
+            self.pipeline = self.buildAnalyzePipeline()
+
+        # 仍在画面里的目标发出离开事件
+        self.event_engine.flush()
+        self.event_engine.reset()
 
         # 输出最终停止日志
         self.update_log_signal.emit("🛑 已停止视频处理（延迟1秒完成）")
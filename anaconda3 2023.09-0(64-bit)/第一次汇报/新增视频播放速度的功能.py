@@ -5,13 +5,22 @@ import numpy as np
 
 # 关闭YOLO调试信息
 os.environ['YOLO_VERBOSE'] = 'False'
-from ultralytics import YOLO
+from backends import DEFAULT_BACKEND
+from model_registry import get_registry
+from pipeline import StageGraph, Stage
 
 
 class MWindow(QtWidgets.QMainWindow):
+    # 推理后端：pytorch / onnx / onnx-int8 / openvino（默认取环境变量YOLO_BACKEND）
+    INFERENCE_BACKEND = DEFAULT_BACKEND
+    update_detected_signal = QtCore.pyqtSignal(QtGui.QImage)  # 检测后画面（子线程→主线程）
+    update_log_signal = QtCore.pyqtSignal(str)  # 日志文本（子线程→主线程）
 
     def __init__(self):
         super().__init__()
+        self.update_detected_signal.connect(
+            lambda q_img: self.label_treated.setPixmap(QtGui.QPixmap.fromImage(q_img)))
+        self.update_log_signal.connect(lambda text: self.textLog.append(text))
         # 设置界面
         self.setupUI()
 
@@ -31,15 +40,16 @@ class MWindow(QtWidgets.QMainWindow):
         self.timer_camera = QtCore.QTimer()
         self.timer_camera.timeout.connect(self.show_camera)
 
-        # 加载YOLO模型
-        self.model = YOLO('yolov8n.pt')
+        # 加载YOLO模型（进程级共享句柄，按设置的推理后端加载）
+        self.model = get_registry().get('yolov8n.pt', backend=self.INFERENCE_BACKEND)
 
-        # 视频帧处理队列
-        self.frameToAnalyze = []
         self.processedFrames = []  # 用于存储处理后的帧，以便保存
 
-        # 启动帧分析线程
-        Thread(target=self.frameAnalyzeThreadFunc, daemon=True).start()
+        # 帧分析流水线（推理→画框转QImage 两个阶段并行，替代原来的列表队列+单个分析线程）
+        self.pipeline = StageGraph([
+            Stage("infer", self.inferFrame),
+            Stage("postprocess", self.postprocessFrame, workers=2),
+        ], on_result=self.renderFrame, queue_size=2).start()
 
     def setupUI(self):
         self.resize(1200, 800)
@@ -220,47 +230,42 @@ class MWindow(QtWidgets.QMainWindow):
         )
         self.label_ori_video.setPixmap(QtGui.QPixmap.fromImage(q_img))
 
-        # 若队列空闲，添加帧到分析队列
-        if len(self.frameToAnalyze) < 5:  # 允许最多5帧的缓冲
-            self.frameToAnalyze.append(frame_rgb.copy())
-
-    def frameAnalyzeThreadFunc(self):
-        """帧分析线程：处理YOLO目标检测"""
-        while True:
-            if not self.frameToAnalyze:
-                time.sleep(0.01)
-                continue
-
-            # 取出帧进行分析
-            frame = self.frameToAnalyze.pop(0)
-            results = self.model(frame)[0]  # YOLO检测
-
-            # 绘制检测结果
-            img_with_boxes = results.plot(line_width=1)
-
-            # 转换为QImage并显示
-            q_img = QtGui.QImage(
-                img_with_boxes.data,
-                img_with_boxes.shape[1],
-                img_with_boxes.shape[0],
-                QtGui.QImage.Format.Format_RGB888
-            )
-            self.label_treated.setPixmap(QtGui.QPixmap.fromImage(q_img))
-
-            # 存储处理后的帧（用于保存）
-            if self.is_playing and self.current_file is not None:
-                # 转换回BGR格式用于保存
-                bgr_img = cv2.cvtColor(img_with_boxes, cv2.COLOR_RGB2BGR)
-                self.processedFrames.append(bgr_img)
-                # 限制缓存大小，防止内存溢出
-                if len(self.processedFrames) > 1000:
-                    self.processedFrames = self.processedFrames[-500:]
-
-            # 输出检测日志
-            detected_classes = [results.names[int(cls)] for cls in results.boxes.cls]
-            if detected_classes:
-                unique_classes = list(set(detected_classes))
-                self.textLog.append(f"🔍 检测到：{', '.join(unique_classes)}")
+        # 添加帧到分析流水线（流水线满了直接丢帧）
+        self.pipeline.submit(frame_rgb.copy(), block=False)
+
+    def inferFrame(self, frame):
+        """推理阶段：YOLO检测"""
+        return self.model(frame)[0]
+
+    def postprocessFrame(self, results):
+        """后处理阶段：绘制检测结果、转换为QImage、提取类别"""
+        img_with_boxes = results.plot(line_width=1)
+        q_img = QtGui.QImage(
+            img_with_boxes.data,
+            img_with_boxes.shape[1],
+            img_with_boxes.shape[0],
+            QtGui.QImage.Format.Format_RGB888
+        ).copy()  # 复制一份，避免numpy数组释放后QImage悬空
+        detected_classes = [results.names[int(cls)] for cls in results.boxes.cls]
+        return img_with_boxes, q_img, detected_classes
+
+    def renderFrame(self, seq, payload):
+        """输出阶段（按帧序号依次调用）：通过信号交给主线程显示"""
+        img_with_boxes, q_img, detected_classes = payload
+        self.update_detected_signal.emit(q_img)
+
+        # 存储处理后的帧（用于保存）
+        if self.is_playing and self.current_file is not None:
+            # 转换回BGR格式用于保存
+            bgr_img = cv2.cvtColor(img_with_boxes, cv2.COLOR_RGB2BGR)
+            self.processedFrames.append(bgr_img)
+            # 限制缓存大小，防止内存溢出
+            if len(self.processedFrames) > 1000:
+                self.processedFrames = self.processedFrames[-500:]
+
+        # 输出检测日志
+        if detected_classes:
+            self.update_log_signal.emit(f"🔍 检测到：{', '.join(set(detected_classes))}")
 
     def saveResults(self):
         """保存处理后的视频结果"""
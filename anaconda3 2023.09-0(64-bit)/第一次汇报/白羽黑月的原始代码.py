@@ -5,11 +5,18 @@ from threading import Thread
 os.environ['YOLO_VERBOSE'] = 'False'
 from ultralytics import YOLO
 
+from pipeline import StageGraph, Stage
+
 
 class MWindow(QtWidgets.QMainWindow):
+    update_detected_signal = QtCore.pyqtSignal(QtGui.QImage)  # 检测后画面（子线程→主线程）
+    update_log_signal = QtCore.pyqtSignal(str)  # 日志文本（子线程→主线程）
 
     def __init__(self):
         super().__init__()
+        self.update_detected_signal.connect(
+            lambda q_img: self.label_treated.setPixmap(QtGui.QPixmap.fromImage(q_img)))
+        self.update_log_signal.connect(lambda text: self.textLog.append(text))
         # 设置界面
         self.setupUI()
 
@@ -25,11 +32,11 @@ class MWindow(QtWidgets.QMainWindow):
         # 加载YOLO模型
         self.model = YOLO('yolov8n.pt')
 
-        # 视频帧处理队列
-        self.frameToAnalyze = []
-
-        # 启动帧分析线程
-        Thread(target=self.frameAnalyzeThreadFunc, daemon=True).start()
+        # 帧分析流水线（推理→画框转QImage 两个阶段并行，替代原来的列表队列+单个分析线程）
+        self.pipeline = StageGraph([
+            Stage("infer", self.inferFrame),
+            Stage("postprocess", self.postprocessFrame, workers=2),
+        ], on_result=self.renderFrame, queue_size=2).start()
 
     def setupUI(self):
         self.resize(1200, 800)
@@ -143,37 +150,33 @@ class MWindow(QtWidgets.QMainWindow):
         )
         self.label_ori_video.setPixmap(QtGui.QPixmap.fromImage(q_img))
 
-        # 若队列空闲，添加帧到分析队列
-        if not self.frameToAnalyze:
-            self.frameToAnalyze.append(frame_rgb)
-
-    def frameAnalyzeThreadFunc(self):
-        """帧分析线程：处理YOLO目标检测"""
-        while True:
-            if not self.frameToAnalyze:
-                time.sleep(0.01)
-                continue
-
-            # 取出帧进行分析
-            frame = self.frameToAnalyze.pop(0)
-            results = self.model(frame)[0]  # YOLO检测
-
-            # 绘制检测结果
-            img_with_boxes = results.plot(line_width=1)
-
-            # 转换为QImage并显示
-            q_img = QtGui.QImage(
-                img_with_boxes.data,
-                img_with_boxes.shape[1],
-                img_with_boxes.shape[0],
-                QtGui.QImage.Format.Format_RGB888
-            )
-            self.label_treated.setPixmap(QtGui.QPixmap.fromImage(q_img))
-
-            # 输出检测日志
-            detected_classes = [results.names[int(cls)] for cls in results.boxes.cls]
-            if detected_classes:
-                self.textLog.append(f"🔍 检测到：{', '.join(set(detected_classes))}")
+        # 非阻塞提交到分析流水线：推理和后处理可同时处理不同的帧，队列满时丢弃这一帧（画面不积压延迟）
+        self.pipeline.submit(frame_rgb, block=False)
+
+    def inferFrame(self, frame):
+        """推理阶段：YOLO检测"""
+        return self.model(frame)[0]
+
+    def postprocessFrame(self, results):
+        """后处理阶段：绘制检测结果、转换为QImage、提取类别"""
+        img_with_boxes = results.plot(line_width=1)
+        q_img = QtGui.QImage(
+            img_with_boxes.data,
+            img_with_boxes.shape[1],
+            img_with_boxes.shape[0],
+            QtGui.QImage.Format.Format_RGB888
+        ).copy()  # 复制一份，避免numpy数组释放后QImage悬空
+        detected_classes = [results.names[int(cls)] for cls in results.boxes.cls]
+        return img_with_boxes, q_img, detected_classes
+
+    def renderFrame(self, seq, payload):
+        """输出阶段（按帧序号依次调用）：通过信号交给主线程显示"""
+        img_with_boxes, q_img, detected_classes = payload
+        self.update_detected_signal.emit(q_img)
+
+        # 输出检测日志
+        if detected_classes:
+            self.update_log_signal.emit(f"🔍 检测到：{', '.join(set(detected_classes))}")
 
     def stop(self):
         """停止视频流和分析"""